@@ -3,10 +3,14 @@ import pandas as pd
 import os
 
 # Moduli locali
+from futsal_analysis.cache_registry import CATEGORIA, registra_cache_streamlit, versione_partite
 from futsal_analysis.config_supabase import get_supabase_client
 from futsal_analysis.utils_time import *
 from futsal_analysis.utils_eventi import *
+from futsal_analysis.data_access import PARTITE_HOME, leggi_partite
 from futsal_analysis.dashboard_utils import render_panoramica_stagione
+from futsal_analysis.match_index import get_indice_partite
+from futsal_analysis.match_summary import SCONFITTA, VITTORIA, carica_riepiloghi
 
 st.set_page_config(page_title="Home", page_icon="🏠", layout="wide")
 
@@ -61,13 +65,27 @@ with col_title:
 # --- SELETTORE CATEGORIA ---
 supabase = get_supabase_client()
 
-# Carica tutte le partite per ottenere le categorie disponibili
-res_all = supabase.table("partite").select("categoria").execute()
-categorie_disponibili = sorted(list(set([p.get('categoria', 'Prima Squadra') for p in res_all.data if p.get('categoria')])))
 
-# Se non ci sono categorie nel DB, usa un default
-if not categorie_disponibili:
-    categorie_disponibili = ['Prima Squadra']
+# Letture in cache per categoria (e per versione delle partite): cambiare categoria
+# non scarta i dati già pronti delle altre categorie
+@st.cache_data(ttl=600)
+def carica_partite_campionato(categoria):
+    """Partite di campionato della categoria, dalla più recente."""
+    return leggi_partite(supabase, PARTITE_HOME, categoria=categoria, competizione="Campionato")
+
+
+@st.cache_data(ttl=600)
+def carica_riepiloghi_partite(partite_ids, versioni):
+    """Riepiloghi delle partite; ``versioni`` (``versione_partite``) cambia se una partita viene modificata."""
+    return carica_riepiloghi(supabase, partite_ids)
+
+
+registra_cache_streamlit("Home:partite", carica_partite_campionato, ambito=CATEGORIA)
+registra_cache_streamlit("Home:riepiloghi", carica_riepiloghi_partite)
+
+# Categorie disponibili dall'indice condiviso: la tabella partite non viene riletta a ogni rerun
+# (se non ci sono categorie nel DB l'indice contiene solo il default)
+categorie_disponibili = list(get_indice_partite(supabase).categorie)
 
 # Inizializza la categoria in session_state se non esiste
 if 'categoria_selezionata' not in st.session_state:
@@ -84,8 +102,7 @@ categoria_scelta = st.selectbox(
 # Controlla se la categoria è cambiata
 categoria_precedente = st.session_state.get('categoria_selezionata')
 if categoria_scelta != categoria_precedente:
-    # Reset della cache quando cambia categoria
-    st.cache_data.clear()
+    # Le cache sono per categoria: non serve svuotarle
     # Reset delle variabili di sessione che potrebbero contenere dati della categoria precedente
     if 'partita_scelta' in st.session_state:
         del st.session_state['partita_scelta']
@@ -99,39 +116,25 @@ else:
 # st.markdown(f"### Panoramica Stagione - Campionato ({categoria_scelta})")
 
 # --- Carica dati del campionato FILTRATI PER CATEGORIA ---
-res = supabase.table("partite").select("*").eq("competizione", "Campionato").eq("categoria", categoria_scelta).order("data", desc=True).execute()
-partite_campionato = res.data
+partite_campionato = carica_partite_campionato(categoria_scelta)
 
 if not partite_campionato:
     st.warning("Nessuna partita di campionato trovata.")
     # st.info("Usa il menu a sinistra per navigare nell'applicazione 👈")
     st.stop()
 
-# --- Carica eventi: una query per ogni partita ---
+# --- Riepilogo per partita (gol, tiri, falli, risultato): una query, senza scaricare gli eventi ---
 partite_ids = [p['id'] for p in partite_campionato]
-eventi_totali = []
 
-with st.spinner("Caricamento eventi in corso..."):
-    for partita_id in partite_ids:
-        eventi_res = supabase.table("eventi").select("*").eq("partita_id", partita_id).order("posizione").execute()
-        if eventi_res.data:
-            eventi_totali.extend(eventi_res.data)
+with st.spinner("Caricamento partite in corso..."):
+    riepiloghi = carica_riepiloghi_partite(tuple(partite_ids), versione_partite(partite_ids))
 
-if not eventi_totali:
+if not riepiloghi['eventi'].any():
     st.warning("Nessun evento trovato per le partite di campionato.")
     st.stop()
 
-# Crea DataFrame completo
-df_all = pd.DataFrame(eventi_totali)
-df_all.columns = df_all.columns.str.strip().str.lower().str.replace(" ", "_")
-df_all = df_all.copy()
-df_all['dove'] = pd.to_numeric(df_all.get('dove', None), errors='coerce').fillna(0).astype(int)
-df_all['Periodo'] = tag_primo_secondo_tempo(df_all)
-df_all['tempoEffettivo'] = calcola_tempo_effettivo(df_all)
-df_all['tempoReale'] = calcola_tempo_reale(df_all)
-
 # --- PANORAMICA STAGIONE ---
-render_panoramica_stagione(df_all, partite_ids)
+render_panoramica_stagione(riepiloghi)
 
 # --- ULTIME PARTITE ---
 st.markdown("---")
@@ -140,16 +143,15 @@ st.subheader("📅 Ultime 5 Partite")
 ultime_5 = sorted(partite_campionato, key=lambda x: x['data'], reverse=True)[:5]
 
 for partita in ultime_5:
-    # Calcola risultato
-    df_partita = df_all[df_all['partita_id'] == partita['id']]
-    gol_fatti = len(df_partita[(df_partita['evento'] == 'Gol') & (df_partita['squadra'] == 'Noi')])
-    gol_subiti = len(df_partita[(df_partita['evento'] == 'Gol') & (df_partita['squadra'] == 'Loro')])
+    # Risultato dal riepilogo della partita
+    riepilogo = riepiloghi.loc[partita['id']]
+    gol_fatti, gol_subiti = riepilogo['gol_fatti'], riepilogo['gol_subiti']
     
     # Determina risultato
-    if gol_fatti > gol_subiti:
+    if riepilogo['risultato'] == VITTORIA:
         risultato_label = "✅ Vittoria"
         color = "#e8f5e9"
-    elif gol_fatti < gol_subiti:
+    elif riepilogo['risultato'] == SCONFITTA:
         risultato_label = "❌ Sconfitta"
         color = "#ffebee"
     else:
@@ -0,0 +1,181 @@
+"""Export massivo: i PDF di tutte le partite di una categoria in un unico archivio ZIP."""
+
+from __future__ import annotations
+
+import io
+import multiprocessing
+import os
+import re
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import pandas as pd
+
+from futsal_analysis.match_report import generate_match_pdf
+
+
+# Oltre questo numero di processi il guadagno è minimo e la memoria cresce (un interprete per processo)
+DEFAULT_MAX_WORKERS = 4
+
+
+@dataclass
+class BatchExportResult:
+    """Esito di un export massivo.
+
+    Attributes:
+        zip_bytes: Contenuto dell'archivio ZIP.
+        files: Nomi dei PDF inclusi, nell'ordine delle partite.
+        skipped: Partite senza eventi (etichetta partita).
+        errors: Errori di generazione per etichetta partita.
+    """
+
+    zip_bytes: bytes
+    files: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
+def _data_partita(partita: Mapping) -> Optional[date]:
+    try:
+        return pd.to_datetime(partita.get('data')).date()
+    except (TypeError, ValueError):
+        return None
+
+
+def filtra_partite(
+    partite: Iterable[Mapping],
+    competizioni: Optional[Sequence[str]] = None,
+    data_da: Optional[date] = None,
+    data_a: Optional[date] = None,
+) -> List[Mapping]:
+    """Partite filtrate per competizione e intervallo di date (estremi inclusi).
+
+    Un filtro a None (o una lista vuota di competizioni) non viene applicato.
+    """
+
+    selezionate = []
+    for partita in partite:
+        if competizioni and partita.get('competizione') not in competizioni:
+            continue
+        if data_da is not None or data_a is not None:
+            giorno = _data_partita(partita)
+            if giorno is None:
+                continue
+            if data_da is not None and giorno < data_da:
+                continue
+            if data_a is not None and giorno > data_a:
+                continue
+        selezionate.append(partita)
+    return selezionate
+
+
+def etichetta_partita(partita: Mapping) -> str:
+    return f"{partita['competizione'].title()} vs {partita['avversario'].title()} ({partita['data']})"
+
+
+def match_pdf_filename(partita: Mapping) -> str:
+    """Nome file del PDF di una partita, univoco nell'archivio (contiene l'id)."""
+
+    avversario = re.sub(r'[^a-z0-9]+', '_', str(partita['avversario']).lower()).strip('_')
+    return f"report_{partita['data']}_{avversario}_{partita['id']}.pdf"
+
+
+def _render_match_pdf(df: pd.DataFrame, partita: Mapping, categoria: str, encoding: Optional[str] = None) -> bytes:
+    """Worker eseguito nei processi del pool (deve essere una funzione di modulo per il pickle)."""
+
+    return generate_match_pdf(df, partita, categoria, encoding=encoding)
+
+
+def _default_workers(n_partite: int) -> int:
+    return max(1, min(DEFAULT_MAX_WORKERS, os.cpu_count() or 1, n_partite))
+
+
+def export_partite_zip(
+    partite: Sequence[Mapping],
+    carica_eventi: Callable[[object], pd.DataFrame],
+    categoria: str,
+    max_workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int, str], None]] = None,
+    encoding: Optional[str] = None,
+) -> BatchExportResult:
+    """Genera il PDF di ogni partita in processi paralleli e li raccoglie in uno ZIP.
+
+    Gli eventi vengono caricati nel processo principale (così ``carica_eventi`` può
+    essere un loader in cache) e inviati al pool appena disponibili, quindi il
+    caricamento della partita successiva si sovrappone alla generazione dei PDF.
+
+    Args:
+        partite: Righe della tabella ``partite`` da esportare.
+        carica_eventi: Funzione ``partita_id -> DataFrame`` degli eventi normalizzati.
+        categoria: Categoria delle partite (determina le sezioni del report).
+        max_workers: Processi paralleli; con 1 i PDF vengono generati nel processo corrente.
+        progress: Callback ``(completate, totale, etichetta)`` chiamata a ogni partita conclusa.
+        encoding: Nome del profilo di codifica delle immagini (vedi ``IMAGE_PROFILES``).
+    """
+
+    totale = len(partite)
+    workers = max_workers or _default_workers(totale)
+    pdf_per_partita: Dict[object, bytes] = {}
+    result = BatchExportResult(zip_bytes=b"")
+    completate = 0
+
+    def _conclusa(partita: Mapping) -> None:
+        nonlocal completate
+        completate += 1
+        if progress is not None:
+            progress(completate, totale, etichetta_partita(partita))
+
+    if workers <= 1:
+        for partita in partite:
+            df = carica_eventi(partita['id'])
+            if df.empty:
+                result.skipped.append(etichetta_partita(partita))
+            else:
+                try:
+                    pdf_per_partita[partita['id']] = _render_match_pdf(df, partita, categoria, encoding)
+                except Exception as e:
+                    result.errors[etichetta_partita(partita)] = str(e)
+            _conclusa(partita)
+    else:
+        # "spawn" evita di duplicare con fork lo stato del server Streamlit (thread, socket)
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            in_corso: Dict[Future, Mapping] = {}
+
+            def _raccogli(futures: Iterable[Future]) -> None:
+                for future in futures:
+                    partita = in_corso.pop(future)
+                    try:
+                        pdf_per_partita[partita['id']] = future.result()
+                    except Exception as e:
+                        result.errors[etichetta_partita(partita)] = str(e)
+                    _conclusa(partita)
+
+            for partita in partite:
+                df = carica_eventi(partita['id'])
+                if df.empty:
+                    result.skipped.append(etichetta_partita(partita))
+                    _conclusa(partita)
+                    continue
+                in_corso[pool.submit(_render_match_pdf, df, dict(partita), categoria, encoding)] = partita
+                # Al massimo due lavori in coda per processo: i DataFrame non si accumulano in memoria
+                if len(in_corso) >= workers * 2:
+                    finiti, _ = wait(list(in_corso), return_when=FIRST_COMPLETED)
+                    _raccogli(finiti)
+            _raccogli(list(in_corso))
+
+    # L'archivio segue l'ordine delle partite, indipendentemente dall'ordine di completamento
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archivio:
+        for partita in partite:
+            pdf_bytes = pdf_per_partita.get(partita['id'])
+            if pdf_bytes is None:
+                continue
+            nome = match_pdf_filename(partita)
+            archivio.writestr(nome, pdf_bytes)
+            result.files.append(nome)
+    result.zip_bytes = buffer.getvalue()
+    return result
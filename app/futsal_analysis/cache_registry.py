@@ -0,0 +1,125 @@
+"""Invalidazione mirata delle cache che dipendono da una partita o da una categoria.
+
+Ogni livello di cache (letture degli eventi delle pagine, report, PDF nella
+coda dei lavori, immagini renderizzate, ...) registra una funzione che scarta
+le voci di una partita e restituisce quante ne ha rimosse;
+:func:`invalida_partita` le chiama tutte e riporta il conteggio per livello.
+Allo stesso modo i livelli legati a una categoria (elenco delle partite,
+indice delle categorie) si registrano con ``ambito=CATEGORIA`` e vengono
+scartati da :func:`invalida_categoria`. Così una modifica non svuota mai le
+cache delle altre partite o categorie (come farebbe ``st.cache_data.clear()``).
+
+Le cache che raccolgono più partite insieme (es. gli eventi di una stagione)
+mettono nella chiave :func:`versione_partite`: la versione di una partita
+cambia a ogni invalidazione, quindi solo le voci che la contengono smettono
+di essere trovate.
+
+I livelli si registrano quando il loro modulo (o la pagina che definisce la
+cache) viene caricato nel processo: una cache mai creata non ha nulla da
+scartare.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+
+PARTITA = "partita"
+CATEGORIA = "categoria"
+
+Invalidatore = Callable[[Optional[str]], int]
+
+logger = logging.getLogger(__name__)
+
+_invalidatori: Dict[str, Dict[str, Invalidatore]] = {PARTITA: {}, CATEGORIA: {}}
+_versioni: Dict[str, int] = {}
+_generazione = 0
+_lock = threading.Lock()
+
+
+def registra_invalidatore(livello: str, invalidatore: Invalidatore, ambito: str = PARTITA) -> None:
+    """Registra (o sostituisce) l'invalidatore di un livello di cache.
+
+    Args:
+        livello: Nome del livello mostrato nel riepilogo (es. ``"immagini"``).
+        invalidatore: Funzione ``partita_id -> voci rimosse`` (o
+            ``categoria -> voci rimosse`` con ``ambito=CATEGORIA``); con
+            ``None`` deve scartare tutte le voci del livello.
+        ambito: ``PARTITA`` o ``CATEGORIA``.
+    """
+
+    with _lock:
+        _invalidatori[ambito][livello] = invalidatore
+
+
+def registra_cache_streamlit(livello: str, funzione_cache, ambito: Optional[str] = None) -> None:
+    """Registra una funzione ``st.cache_data`` come livello di cache.
+
+    Con ``ambito=PARTITA`` (o ``CATEGORIA``) la funzione ha come unico
+    argomento l'id della partita (o la categoria) e viene scartata solo
+    quella voce. Senza ambito la funzione non è legata a una partita (es.
+    chiave con :func:`versione_partite`) e viene svuotata tutta solo con
+    ``invalida_partita(None)``. Streamlit non dice quante voci c'erano: il
+    livello conta 1 per voce o cache svuotata.
+    """
+
+    def invalida(chiave: Optional[str]) -> int:
+        if chiave is not None and ambito is not None:
+            funzione_cache.clear(chiave)
+        elif chiave is None:
+            funzione_cache.clear()
+        else:
+            return 0
+        return 1
+
+    registra_invalidatore(livello, invalida, ambito or PARTITA)
+
+
+def livelli(ambito: str = PARTITA) -> list:
+    """Livelli di cache registrati nel processo."""
+
+    with _lock:
+        return sorted(_invalidatori[ambito])
+
+
+def versione_partite(partita_ids: Iterable[str]) -> Tuple[int, ...]:
+    """Versioni correnti delle partite, da aggiungere alla chiave delle cache di più partite."""
+
+    with _lock:
+        return (_generazione,) + tuple(_versioni.get(str(p), 0) for p in partita_ids)
+
+
+def _invalida(ambito: str, chiave: Optional[str]) -> Dict[str, int]:
+    with _lock:
+        invalidatori = dict(_invalidatori[ambito])
+    rimossi: Dict[str, int] = {}
+    for livello, invalidatore in sorted(invalidatori.items()):
+        try:
+            rimossi[livello] = int(invalidatore(chiave) or 0)
+        except Exception:
+            logger.exception("Invalidazione della cache %s non riuscita", livello)
+            rimossi[livello] = -1
+    return rimossi
+
+
+def invalida_partita(partita_id: Optional[str]) -> Dict[str, int]:
+    """Scarta da tutti i livelli le voci della partita (``None``: tutte le voci).
+
+    Un livello che fallisce non blocca gli altri: viene riportato con -1.
+    """
+
+    global _generazione
+    with _lock:
+        if partita_id is None:
+            _generazione += 1
+        else:
+            _versioni[str(partita_id)] = _versioni.get(str(partita_id), 0) + 1
+    return _invalida(PARTITA, None if partita_id is None else str(partita_id))
+
+
+def invalida_categoria(categoria: Optional[str]) -> Dict[str, int]:
+    """Scarta da tutti i livelli di ``ambito=CATEGORIA`` le voci della categoria (``None``: tutte)."""
+
+    return _invalida(CATEGORIA, categoria)
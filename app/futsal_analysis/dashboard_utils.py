@@ -5,14 +5,14 @@ import streamlit as st
 import pandas as pd
 
 
-def render_panoramica_stagione(df_all, partite_ids):
+def render_panoramica_stagione(riepiloghi):
     """
     Renderizza la panoramica stagionale con tutte le metriche aggregate.
     Usa una griglia CSS personalizzata per mantenere 3 colonne anche su mobile.
     
     Args:
-        df_all: DataFrame con tutti gli eventi delle partite
-        partite_ids: Lista degli ID delle partite da considerare
+        riepiloghi: Riepilogo per partita delle partite da considerare
+            (``match_summary.carica_riepiloghi`` o ``calcola_riepiloghi``)
     """
     st.markdown("---")
     st.subheader("📈 Panoramica Stagione")
@@ -39,72 +39,38 @@ def render_panoramica_stagione(df_all, partite_ids):
     </style>
     """, unsafe_allow_html=True)
     
-    # Calcola metriche aggregate
-    num_partite = len(partite_ids)
+    # Calcola metriche aggregate dai riepiloghi per partita
+    num_partite = len(riepiloghi)
+    totali = riepiloghi.sum(numeric_only=True)
     
     # Gol per partita
-    gol_fatti_totali = len(df_all[(df_all['evento'] == 'Gol') & (df_all['squadra'] == 'Noi')])
-    gol_subiti_totali = len(df_all[(df_all['evento'] == 'Gol') & (df_all['squadra'] == 'Loro')])
+    gol_fatti_totali = totali.get('gol_fatti', 0)
+    gol_subiti_totali = totali.get('gol_subiti', 0)
     gol_medi_fatti = gol_fatti_totali / num_partite if num_partite > 0 else 0
     gol_medi_subiti = gol_subiti_totali / num_partite if num_partite > 0 else 0
     
     # Tiri per partita
-    tiri_totali = len(df_all[(df_all['evento'].str.contains('Tiro', na=False)) & (df_all['squadra'] == 'Noi')])
+    tiri_totali = totali.get('tiri_fatti', 0)
     tiri_medi = tiri_totali / num_partite if num_partite > 0 else 0
     
-    tiri_subiti_totali = len(df_all[(df_all['evento'].str.contains('Tiro', na=False)) & (df_all['squadra'] == 'Loro')])
+    tiri_subiti_totali = totali.get('tiri_subiti', 0)
     tiri_subiti_medi = tiri_subiti_totali / num_partite if num_partite > 0 else 0
     
     # Palle perse/recuperate per partita
-    palle_perse_totali = len(df_all[(df_all['evento'].str.contains('Palla persa', na=False))])
-    palle_recuperate_totali = len(df_all[(df_all['evento'].str.contains('Palla recuperata', na=False))])
-    palle_perse_medie = palle_perse_totali / num_partite if num_partite > 0 else 0
-    palle_recuperate_medie = palle_recuperate_totali / num_partite if num_partite > 0 else 0
+    palle_perse_medie = totali.get('palle_perse', 0) / num_partite if num_partite > 0 else 0
+    palle_recuperate_medie = totali.get('palle_recuperate', 0) / num_partite if num_partite > 0 else 0
     
     # Falli per partita
-    falli_fatti_totali = len(df_all[(df_all['evento'].str.contains('Fallo', na=False)) & (df_all['squadra'] == 'Noi')])
-    falli_subiti_totali = len(df_all[(df_all['evento'].str.contains('Fallo', na=False)) & (df_all['squadra'] == 'Loro')])
-    falli_medi_fatti = falli_fatti_totali / num_partite if num_partite > 0 else 0
-    falli_medi_subiti = falli_subiti_totali / num_partite if num_partite > 0 else 0
+    falli_medi_fatti = totali.get('falli_fatti', 0) / num_partite if num_partite > 0 else 0
+    falli_medi_subiti = totali.get('falli_subiti', 0) / num_partite if num_partite > 0 else 0
     
     # Percentuale tiri in porta
-    tiri_in_porta_totali = len(df_all[(df_all['evento'].str.contains('Tiro', na=False)) & (df_all['squadra'] == 'Noi') & df_all['esito'].isin(['Parata', 'Gol', 'Palo'])])
+    tiri_in_porta_totali = totali.get('tiri_in_porta_fatti', 0)
     perc_tiri_in_porta = (tiri_in_porta_totali / tiri_totali * 100) if tiri_totali > 0 else 0
     
-    # Calcola vittorie, pareggi, sconfitte
-    risultati = {'V': 0, 'P': 0, 'S': 0}
-    for p_id in partite_ids:
-        df_partita = df_all[df_all['partita_id'] == p_id]
-        gol_fatti = len(df_partita[(df_partita['evento'] == 'Gol') & (df_partita['squadra'] == 'Noi')])
-        gol_subiti = len(df_partita[(df_partita['evento'] == 'Gol') & (df_partita['squadra'] == 'Loro')])
-        if gol_fatti > gol_subiti:
-            risultati['V'] += 1
-        elif gol_fatti < gol_subiti:
-            risultati['S'] += 1
-        else:
-            risultati['P'] += 1
-    
-    # Calcola punti (3 per vittoria, 1 per pareggio)
-    punti_totali = risultati['V'] * 3 + risultati['P']
-    
-    # Percentuale conversione tiri in gol
-    perc_conversione = (gol_fatti_totali / tiri_totali * 100) if tiri_totali > 0 else 0
-    
-    # Percentuale conversione tiri subiti in gol subiti
-    perc_conversione_subiti = (gol_subiti_totali / tiri_subiti_totali * 100) if tiri_subiti_totali > 0 else 0
-    
-    # Calcola vittorie, pareggi, sconfitte
-    risultati = {'V': 0, 'P': 0, 'S': 0}
-    for p_id in partite_ids:
-        df_partita = df_all[df_all['partita_id'] == p_id]
-        gol_fatti = len(df_partita[(df_partita['evento'] == 'Gol') & (df_partita['squadra'] == 'Noi')])
-        gol_subiti = len(df_partita[(df_partita['evento'] == 'Gol') & (df_partita['squadra'] == 'Loro')])
-        if gol_fatti > gol_subiti:
-            risultati['V'] += 1
-        elif gol_fatti < gol_subiti:
-            risultati['S'] += 1
-        else:
-            risultati['P'] += 1
+    # Vittorie, pareggi, sconfitte
+    conteggio_risultati = riepiloghi['risultato'].value_counts() if num_partite > 0 else {}
+    risultati = {r: int(conteggio_risultati.get(r, 0)) for r in ('V', 'P', 'S')}
     
     # Calcola punti (3 per vittoria, 1 per pareggio)
     punti_totali = risultati['V'] * 3 + risultati['P']
@@ -116,8 +82,8 @@ def render_panoramica_stagione(df_all, partite_ids):
     perc_conversione_subiti = (gol_subiti_totali / tiri_subiti_totali * 100) if tiri_subiti_totali > 0 else 0
     
     # Parate del portiere
-    parate_totali = len(df_all[(df_all['evento'].str.contains('Tiro', na=False)) & (df_all['squadra'] == 'Loro') & (df_all['esito'] == 'Parata')])
-    tiri_in_porta_subiti = len(df_all[(df_all['evento'].str.contains('Tiro', na=False)) & (df_all['squadra'] == 'Loro') & df_all['esito'].isin(['Parata', 'Gol', 'Palo'])])
+    parate_totali = totali.get('parate', 0)
+    tiri_in_porta_subiti = totali.get('tiri_in_porta_subiti', 0)
     perc_parate = (parate_totali / tiri_in_porta_subiti * 100) if tiri_in_porta_subiti > 0 else 0
     
     # --- VISUALIZZAZIONE METRICHE (4 COLONNE COMPATTE) ---
@@ -232,3 +198,97 @@ def render_panoramica_stagione(df_all, partite_ids):
         </div>
         """, unsafe_allow_html=True)
 
+
+
+# Secondi tra un aggiornamento e l'altro del pannello lavori mentre ci sono lavori attivi
+INTERVALLO_AGGIORNAMENTO_JOB = 2
+
+_ICONE_STATO_JOB = {
+    "in coda": "🕒",
+    "in corso": "⏳",
+    "completato": "✅",
+    "errore": "❌",
+    "interrotto": "⚠️",
+}
+
+
+def formatta_dimensione(n_bytes):
+    """Dimensione leggibile di un file (es. "1.4 MB")."""
+    if n_bytes < 1024:
+        return f"{n_bytes} B"
+    if n_bytes < 1024 * 1024:
+        return f"{n_bytes / 1024:.0f} KB"
+    return f"{n_bytes / (1024 * 1024):.1f} MB"
+
+
+def _contenuto_pannello_job(queue, owner, key_prefix, max_job):
+    lavori = queue.jobs(owner=owner)[:max_job]
+    attivi = {job.id for job in lavori if job.attivo}
+
+    # Se un lavoro seguito da questa sessione è appena terminato, si riesegue
+    # tutta la pagina così i risultati (es. minutaggi) vengono mostrati
+    stato_key = f"_job_attivi_{key_prefix}"
+    precedenti = st.session_state.get(stato_key, set())
+    st.session_state[stato_key] = attivi
+    if precedenti - attivi:
+        st.rerun(scope="app")
+
+    # Risultati già letti dal disco, solo per i lavori ancora mostrati: il
+    # pannello si riesegue ogni pochi secondi e ogni risultato va letto una volta
+    risultati_key = f"_job_risultati_{key_prefix}"
+    mostrati = {job.id for job in lavori}
+    risultati = {
+        job_id: letto for job_id, letto in st.session_state.get(risultati_key, {}).items() if job_id in mostrati
+    }
+    st.session_state[risultati_key] = risultati
+
+    st.caption(f"Lavori in esecuzione sul server: {queue.running()}/{queue.max_jobs}")
+    for job in lavori:
+        col_stato, col_azione = st.columns([3, 1])
+        with col_stato:
+            durata = f" — {job.durata:.0f}s" if job.durata is not None else ""
+            st.markdown(f"{_ICONE_STATO_JOB.get(job.stato, '')} **{job.descrizione}** ({job.stato}{durata})")
+            if job.errore:
+                st.caption(job.errore)
+        with col_azione:
+            if job.stato == "completato" and job.file_name:
+                if job.id not in risultati:
+                    try:
+                        risultati[job.id] = (queue.result(job.id), None)
+                    except FileNotFoundError:
+                        risultati[job.id] = (None, "file del risultato eliminato dal server")
+                    except Exception as e:  # es. lavoro scartato nel frattempo
+                        risultati[job.id] = (None, str(e) or e.__class__.__name__)
+                dati, errore = risultati[job.id]
+                if errore:
+                    st.caption(f"Risultato non disponibile: {errore}")
+                else:
+                    st.download_button(
+                        f"⬇️ Scarica ({formatta_dimensione(len(dati))})",
+                        data=dati,
+                        file_name=job.file_name,
+                        mime=job.mime,
+                        key=f"{key_prefix}_download_{job.id}",
+                        on_click="ignore",
+                    )
+
+
+def render_pannello_job(queue, owner, key_prefix, max_job=5):
+    """
+    Pannello con i lavori in background della sessione (export PDF, ricalcoli).
+
+    Mentre ci sono lavori attivi il pannello si aggiorna da solo ogni
+    ``INTERVALLO_AGGIORNAMENTO_JOB`` secondi senza rieseguire la pagina.
+
+    Args:
+        queue: Coda dei lavori (``get_job_queue()``)
+        owner: Id della sessione che ha richiesto i lavori
+        key_prefix: Prefisso delle chiavi dei widget (uno per pagina)
+        max_job: Numero massimo di lavori mostrati
+    """
+    lavori = queue.jobs(owner=owner)
+    if not lavori:
+        return
+    run_every = INTERVALLO_AGGIORNAMENTO_JOB if any(job.attivo for job in lavori) else None
+    with st.expander("🗂️ Lavori in background", expanded=True):
+        st.fragment(_contenuto_pannello_job, run_every=run_every)(queue, owner, key_prefix, max_job)
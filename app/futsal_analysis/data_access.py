@@ -0,0 +1,136 @@
+"""Letture di partite ed eventi per le pagine, con le sole colonne che servono.
+
+Ogni pagina (o sezione) dichiara una :class:`Vista`, cioè la tabella e le
+colonne che usa davvero; i loader passano a Supabase solo quelle invece di
+``select("*")``. Le risposte sono più piccole e la decodifica del JSON più
+veloce, soprattutto sulle letture di una stagione intera. Una colonna nuova
+usata da una pagina va aggiunta alla sua vista.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from futsal_analysis.data_quality import COLONNE_CONTROLLATE
+from futsal_analysis.ingestion import COLONNE_EVENTI, carica_eventi, tempi_salvati
+from futsal_analysis.utils_time import COLONNE_TEMPI
+
+
+@dataclass(frozen=True)
+class Vista:
+    """Colonne di una tabella lette da una pagina.
+
+    Attributes:
+        tabella: Tabella Supabase (``"partite"`` o ``"eventi"``).
+        colonne: Colonne da leggere.
+    """
+
+    tabella: str
+    colonne: Tuple[str, ...]
+
+    @property
+    def select(self) -> str:
+        """Argomento di ``select`` (es. ``"id,data,avversario"``)."""
+
+        return ",".join(self.colonne)
+
+
+# --- Partite ---
+# Scheda completa: pagine Partite e Stats (intestazioni, export, link video)
+PARTITE_SCHEDA = Vista("partite", ("id", "data", "avversario", "competizione", "categoria", "yt_link"))
+# Home: elenco delle ultime partite (i numeri arrivano dai riepiloghi)
+PARTITE_HOME = Vista("partite", ("id", "data", "avversario"))
+# Galleria video
+PARTITE_VIDEO = Vista("partite", ("id", "data", "avversario", "competizione", "yt_link"))
+# Menu di scelta della partita in Admin
+PARTITE_ADMIN = Vista("partite", ("id", "data", "avversario", "categoria"))
+
+# --- Eventi ---
+# Analisi di partita e stagione: colonne salvate al caricamento, senza id e metadati
+EVENTI_ANALISI = Vista("eventi", tuple(COLONNE_EVENTI) + tuple(COLONNE_TEMPI))
+# Riepilogo per partita (match_summary)
+EVENTI_RIEPILOGO = Vista("eventi", ("partita_id", "evento", "squadra", "esito"))
+# Controlli di qualità (data_quality)
+EVENTI_QUALITA = Vista("eventi", tuple(COLONNE_CONTROLLATE))
+
+
+def _filtra_partite(query, categoria, competizione, data_da, data_a, ordine="data.desc"):
+    if categoria is not None:
+        query = query.eq("categoria", categoria)
+    if competizione is not None:
+        query = query.eq("competizione", competizione)
+    if data_da is not None:
+        query = query.gte("data", data_da.isoformat())
+    if data_a is not None:
+        query = query.lte("data", data_a.isoformat())
+    # ``ordine`` in un solo parametro (es. "data.desc,id"): PostgREST non combina più ``order``
+    return query.order(ordine)
+
+
+def leggi_partite(
+    client,
+    vista: Vista,
+    categoria: Optional[str] = None,
+    competizione: Optional[str] = None,
+    data_da: Optional[date] = None,
+    data_a: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """Partite (dalla più recente) con le colonne della vista, filtrate per categoria, competizione e date (incluse)."""
+
+    query = client.table(vista.tabella).select(vista.select)
+    return _filtra_partite(query, categoria, competizione, data_da, data_a).execute().data or []
+
+
+def leggi_pagina_partite(
+    client,
+    vista: Vista,
+    pagina: int,
+    per_pagina: int,
+    categoria: Optional[str] = None,
+    competizione: Optional[str] = None,
+    data_da: Optional[date] = None,
+    data_a: Optional[date] = None,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Una pagina delle partite di :func:`leggi_partite`, con filtri e paginazione fatti da Supabase.
+
+    Args:
+        pagina: Indice della pagina, da 0.
+        per_pagina: Partite per pagina.
+
+    Returns:
+        Le partite della pagina e il numero totale di partite che rispettano i filtri.
+    """
+
+    inizio = pagina * per_pagina
+    query = client.table(vista.tabella).select(vista.select, count="exact")
+    risposta = (
+        # "id" dopo la data: ordine stabile tra le pagine a parità di data
+        _filtra_partite(query, categoria, competizione, data_da, data_a, ordine="data.desc,id")
+        .range(inizio, inizio + per_pagina - 1)
+        .execute()
+    )
+    righe = risposta.data or []
+    totale = risposta.count if risposta.count is not None else inizio + len(righe)
+    return righe, totale
+
+
+def leggi_eventi(client, vista: Vista, partita_ids: Iterable[str]) -> pd.DataFrame:
+    """Eventi delle partite indicate con le colonne della vista (una lettura a pagine per partita).
+
+    Le partite senza eventi non compaiono; se nessuna ha eventi il DataFrame è vuoto.
+    Le colonne ``COLONNE_TEMPI`` vengono omesse se la tabella non le ha ancora:
+    ``utils_time.aggiungi_tempi`` ricalcola allora i tempi.
+    """
+
+    colonne = vista.colonne
+    if set(colonne) & set(COLONNE_TEMPI) and not tempi_salvati(client):
+        colonne = tuple(c for c in colonne if c not in COLONNE_TEMPI)
+    frames = [carica_eventi(client, partita_id, colonne=",".join(colonne)) for partita_id in partita_ids]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
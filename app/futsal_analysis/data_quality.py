@@ -0,0 +1,288 @@
+"""Controlli di qualità sugli eventi di una partita (file caricato o partita salvata).
+
+Gli errori nei dati (posizioni scritte male, "Fine primo tempo" mancante,
+quartetti incompleti) non fanno fallire le pagine: finiscono nei fallback di
+``utils_time`` e ``utils_minutaggi`` e diventano zeri o minutaggi sbagliati.
+:func:`valida_partita` li segnala prima, con operazioni vettoriali su tutta la
+partita (pochi millisecondi), e restituisce un :class:`RapportoQualita`
+mostrato nel pannello Admin.
+
+Il DataFrame atteso è quello di ``ingestion.preprocess_eventi`` (colonne
+minuscole); per un file caricato conviene passarlo con ``ordina=False``, così
+il controllo di monotonia vede l'ordine originale delle righe.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from futsal_analysis.ingestion import CATEGORIE_CSV_SEMPLIFICATO
+
+
+ERRORE = "errore"
+AVVISO = "avviso"
+
+FINE_PRIMO_TEMPO = "Fine primo tempo"
+INIZIO_SECONDO_TEMPO = "Inizio secondo tempo"
+FINE_PARTITA = "Fine partita"
+MARCATORI_PERIODO = (FINE_PRIMO_TEMPO, INIZIO_SECONDO_TEMPO, FINE_PARTITA)
+
+# Eventi riconosciuti dalle analisi (che confrontano sottostringhe: "Tiro libero" contiene "Tiro")
+EVENTI_NOTI = (
+    "Tiro", "Gol", "Laterale", "Angolo", "Rigore", "Palla persa", "Palla recuperata",
+    "Ripartenza", "Fallo", "Ammonizione", "Espulsione", "Integrazione portier", "Lancio",
+    "Parata",
+) + MARCATORI_PERIODO
+ESITI_NOTI = ("", "Parata", "Gol", "Palo", "Fuori", "Ribattuto", "Ripartenza", "Costruzione", "Intercetto", "OK")
+# Esiti delle ripartenze (superiorità numerica: 1v1, 2v1, 3v2, ...)
+PATTERN_ESITO_RIPARTENZA = r"\dv\d"
+
+FORMATO_POSIZIONE = r"^\d{1,2}:\d{2}:\d{2}(?:\.\d+)?$"
+ZONE_VALIDE = (1, 2, 3)
+LATI_VALIDI = ("", "Sx", "Dx")
+
+COLONNE_QUARTETTO = ["quartetto", "quartetto_1", "quartetto_2", "quartetto_3", "quartetto_4"]
+# Giocatori di movimento ammessi: 4 (con portiere), 3 (inferiorità), 5 senza portiere (portiere di movimento)
+MOVIMENTO_VALIDO = (3, 4, 5)
+
+MAX_ESEMPI = 5
+
+# Valore da mostrare negli esempi: colonna o funzione riga -> testo (calcolata solo per gli esempi)
+Valori = Union[pd.Series, Callable[[int], str]]
+
+COLONNE_CONTROLLATE = ["posizione", "evento", "esito", "squadra", "dove", "lato", "portiere"] + COLONNE_QUARTETTO
+
+
+@dataclass
+class Problema:
+    """Un controllo non superato.
+
+    Attributes:
+        livello: ``ERRORE`` (i calcoli saranno sbagliati) o ``AVVISO`` (da verificare).
+        controllo: Nome breve del controllo.
+        messaggio: Descrizione per l'utente.
+        righe: Righe coinvolte.
+        esempi: Alcune righe coinvolte (numero di riga, posizione ed evento).
+    """
+
+    livello: str
+    controllo: str
+    messaggio: str
+    righe: int = 0
+    esempi: List[str] = field(default_factory=list)
+
+
+@dataclass
+class RapportoQualita:
+    """Esito dei controlli su una partita."""
+
+    eventi: int = 0
+    problemi: List[Problema] = field(default_factory=list)
+
+    @property
+    def errori(self) -> List[Problema]:
+        return [p for p in self.problemi if p.livello == ERRORE]
+
+    @property
+    def ok(self) -> bool:
+        return not self.errori
+
+    def to_frame(self) -> pd.DataFrame:
+        """Tabella dei problemi, errori per primi."""
+
+        righe = [
+            {
+                "Livello": "❌ Errore" if p.livello == ERRORE else "⚠️ Avviso",
+                "Controllo": p.controllo,
+                "Problema": p.messaggio,
+                "Righe": p.righe,
+                "Esempi": "; ".join(p.esempi),
+            }
+            for p in sorted(self.problemi, key=lambda p: p.livello != ERRORE)
+        ]
+        return pd.DataFrame(righe, columns=["Livello", "Controllo", "Problema", "Righe", "Esempi"])
+
+
+def testo_eventi(df: pd.DataFrame) -> pd.DataFrame:
+    """Colonne controllate come testo senza spazi ('' per valori mancanti), indice 0..n-1."""
+
+    return pd.DataFrame({
+        col: df[col].fillna("").astype(str).str.strip().to_numpy() if col in df.columns else ""
+        for col in COLONNE_CONTROLLATE
+    }, index=pd.RangeIndex(len(df)))
+
+
+def _esempi(t: pd.DataFrame, mask: np.ndarray, valori: Optional[Valori] = None) -> List[str]:
+    posizioni = np.flatnonzero(mask)[:MAX_ESEMPI]
+    esempi = []
+    for i in posizioni:
+        if valori is None:
+            dettaglio = t["evento"].iloc[i]
+        else:
+            dettaglio = valori(i) if callable(valori) else valori.iloc[i]
+        esempi.append(f"riga {i + 1} ({t['posizione'].iloc[i]}): {dettaglio}")
+    return esempi
+
+
+def _aggiungi(rapporto: RapportoQualita, t: pd.DataFrame, mask: np.ndarray, livello: str,
+              controllo: str, messaggio: str, valori: Optional[Valori] = None) -> None:
+    n = int(mask.sum())
+    if n:
+        rapporto.problemi.append(Problema(livello, controllo, messaggio, n, _esempi(t, mask, valori)))
+
+
+def controlla_tempi(t: pd.DataFrame, rapporto: RapportoQualita) -> np.ndarray:
+    """Formato di ``posizione`` e monotonia nell'ordine delle righe; restituisce i secondi."""
+
+    posizione = t["posizione"]
+    formato_ok = posizione.str.match(FORMATO_POSIZIONE).to_numpy(dtype=bool)
+    _aggiungi(rapporto, t, ~formato_ok, ERRORE, "Formato posizione",
+              "Posizione non nel formato HH:MM:SS: l'evento viene contato a tempo 00:00", posizione)
+
+    # Formato già verificato: ore, minuti e secondi si leggono direttamente
+    secondi = np.full(len(t), np.nan)
+    if formato_ok.any():
+        hms = posizione[formato_ok].str.split(":", n=2, expand=True).astype("float64").to_numpy()
+        secondi[formato_ok] = hms[:, 0] * 3600 + hms[:, 1] * 60 + hms[:, 2]
+    # Confronto con l'ultima posizione valida precedente (le righe non valide sono già segnalate)
+    precedente = pd.Series(secondi).ffill().shift(1).to_numpy()
+    indietro = np.nan_to_num(secondi - precedente, nan=0.0) < 0
+    _aggiungi(rapporto, t, indietro, ERRORE, "Monotonia tempi",
+              "Posizione precedente a quella della riga prima: tempi e minutaggi non tornano", posizione)
+    return secondi
+
+
+def controlla_periodi(t: pd.DataFrame, rapporto: RapportoQualita) -> None:
+    """Marcatori di fine primo tempo, inizio secondo tempo e fine partita."""
+
+    evento = t["evento"].to_numpy(dtype=object)
+    n = len(evento)
+    indici = {marcatore: np.flatnonzero(evento == marcatore) for marcatore in MARCATORI_PERIODO}
+
+    fine_primo = indici[FINE_PRIMO_TEMPO]
+    if len(fine_primo) == 0:
+        rapporto.problemi.append(Problema(
+            ERRORE, "Marcatori periodo",
+            f"Manca '{FINE_PRIMO_TEMPO}': tutti gli eventi finiscono nel primo tempo e il tempo effettivo resta vuoto",
+        ))
+    fine_partita = indici[FINE_PARTITA]
+    if len(fine_partita) == 0:
+        rapporto.problemi.append(Problema(
+            AVVISO, "Marcatori periodo",
+            f"Manca '{FINE_PARTITA}': la durata del secondo tempo viene presa dall'ultimo evento",
+        ))
+    for marcatore, posizioni in indici.items():
+        if len(posizioni) > 1:
+            mask = np.zeros(n, dtype=bool)
+            mask[posizioni[1:]] = True
+            _aggiungi(rapporto, t, mask, AVVISO, "Marcatori periodo",
+                      f"'{marcatore}' ripetuto: vale solo il primo")
+
+    if len(fine_primo):
+        inizio_secondo = indici[INIZIO_SECONDO_TEMPO]
+        if len(inizio_secondo) and inizio_secondo[0] <= fine_primo[0]:
+            mask = np.zeros(n, dtype=bool)
+            mask[inizio_secondo[0]] = True
+            _aggiungi(rapporto, t, mask, ERRORE, "Marcatori periodo",
+                      f"'{INIZIO_SECONDO_TEMPO}' prima di '{FINE_PRIMO_TEMPO}'")
+        if len(fine_partita) and fine_partita[0] < fine_primo[0]:
+            mask = np.zeros(n, dtype=bool)
+            mask[fine_partita[0]] = True
+            _aggiungi(rapporto, t, mask, ERRORE, "Marcatori periodo",
+                      f"'{FINE_PARTITA}' prima di '{FINE_PRIMO_TEMPO}'")
+    if len(fine_partita):
+        dopo_fine = np.arange(n) > fine_partita[0]
+        _aggiungi(rapporto, t, dopo_fine, AVVISO, "Marcatori periodo",
+                  f"Eventi dopo '{FINE_PARTITA}'")
+
+
+def controlla_quartetti(t: pd.DataFrame, rapporto: RapportoQualita, categoria: Optional[str] = None) -> None:
+    """Numero di giocatori di movimento (e doppioni) per riga, dove la categoria traccia i quartetti."""
+
+    if categoria and categoria.lower() in CATEGORIE_CSV_SEMPLIFICATO:
+        return
+    giocatori = np.column_stack([t[col].to_numpy(dtype=object) for col in COLONNE_QUARTETTO])
+    if giocatori.size == 0:
+        return
+    ordinati = np.sort(giocatori.astype(str), axis=1)
+    presenti = ordinati != ""
+    # Righe ordinate: un doppione è uguale al giocatore accanto
+    ripetuti = presenti[:, 1:] & (ordinati[:, 1:] == ordinati[:, :-1])
+    doppioni = ripetuti.any(axis=1)
+    n_movimento = presenti.sum(axis=1) - ripetuti.sum(axis=1)
+    portiere = (t["portiere"] != "").to_numpy()
+    marcatore = t["evento"].isin(MARCATORI_PERIODO).to_numpy()
+
+    def quartetto(i: int) -> str:
+        return ", ".join(g for g in ordinati[i] if g)
+
+    _aggiungi(rapporto, t, doppioni & ~marcatore, ERRORE, "Quartetto",
+              "Giocatore ripetuto nel quartetto", quartetto)
+    vuoto = (n_movimento == 0) & ~marcatore
+    _aggiungi(rapporto, t, vuoto, AVVISO, "Quartetto",
+              "Nessun giocatore di movimento: il tempo fino all'evento successivo non entra nei minutaggi")
+    cardinalita = ~np.isin(n_movimento, MOVIMENTO_VALIDO) & (n_movimento > 0) & ~marcatore
+    _aggiungi(rapporto, t, cardinalita, ERRORE, "Quartetto",
+              f"Numero di giocatori di movimento diverso da {'/'.join(map(str, MOVIMENTO_VALIDO))}", quartetto)
+    cinque_con_portiere = (n_movimento == 5) & portiere & ~marcatore
+    _aggiungi(rapporto, t, cinque_con_portiere, AVVISO, "Quartetto",
+              "5 giocatori di movimento con il portiere indicato: la riga non entra nei minutaggi di formazione",
+              quartetto)
+
+
+def controlla_vocabolario(t: pd.DataFrame, rapporto: RapportoQualita) -> None:
+    """Eventi ed esiti non riconosciuti dalle analisi."""
+
+    evento = t["evento"]
+    noto = evento.str.contains("|".join(EVENTI_NOTI), regex=True).to_numpy()
+    _aggiungi(rapporto, t, ~noto, AVVISO, "Vocabolario",
+              "Evento sconosciuto: non viene contato in nessuna statistica", evento)
+
+    esito = t["esito"]
+    esito_noto = (esito.isin(ESITI_NOTI) | esito.str.contains(PATTERN_ESITO_RIPARTENZA, regex=True)).to_numpy()
+    _aggiungi(rapporto, t, ~esito_noto, AVVISO, "Vocabolario",
+              "Esito sconosciuto: l'evento conta nei totali ma in nessuna suddivisione per esito", esito)
+
+    squadra = t["squadra"]
+    squadra_ok = (squadra.isin(["Noi", "Loro"]) | evento.isin(MARCATORI_PERIODO)).to_numpy()
+    _aggiungi(rapporto, t, ~squadra_ok, ERRORE, "Vocabolario",
+              "Squadra diversa da 'Noi'/'Loro': l'evento non viene attribuito", squadra)
+
+
+def controlla_zone(t: pd.DataFrame, rapporto: RapportoQualita) -> None:
+    """Zona (``dove``) tra 1 e 3 e lato Sx/Dx, quando indicati."""
+
+    dove = t["dove"]
+    zona = pd.to_numeric(dove, errors="coerce")
+    fuori = ((dove != "") & ~zona.isin(ZONE_VALIDE)).to_numpy()
+    _aggiungi(rapporto, t, fuori, ERRORE, "Zona",
+              f"Zona fuori intervallo ({ZONE_VALIDE[0]}-{ZONE_VALIDE[-1]}): l'evento sparisce dalle analisi per zona",
+              dove)
+    lato = t["lato"]
+    _aggiungi(rapporto, t, ~lato.isin(LATI_VALIDI).to_numpy(), AVVISO, "Zona",
+              "Lato diverso da Sx/Dx: viene diviso a metà tra i due lati", lato)
+
+
+def valida_partita(df: pd.DataFrame, categoria: Optional[str] = None) -> RapportoQualita:
+    """Esegue tutti i controlli sugli eventi di una partita.
+
+    Args:
+        df: Eventi della partita (colonne di ``preprocess_eventi``), nell'ordine da verificare.
+        categoria: Categoria della partita; per u15/u17 i quartetti non vengono controllati.
+    """
+
+    rapporto = RapportoQualita(eventi=len(df))
+    if df.empty:
+        rapporto.problemi.append(Problema(ERRORE, "Eventi", "Nessun evento"))
+        return rapporto
+    t = testo_eventi(df)
+    controlla_tempi(t, rapporto)
+    controlla_periodi(t, rapporto)
+    controlla_quartetti(t, rapporto, categoria)
+    controlla_vocabolario(t, rapporto)
+    controlla_zone(t, rapporto)
+    return rapporto
@@ -0,0 +1,292 @@
+"""Cache delle immagini renderizzate (zone e tiri) condivisa tra tab e PDF."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, Iterator, Optional, Sequence, Tuple, Union
+
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+from futsal_analysis.cache_registry import registra_invalidatore
+from futsal_analysis.pitch_drawer import FutsalPitch
+from futsal_analysis.utils_pdf import ImageEncoding, figure_to_image_bytes, get_image_profile
+from futsal_analysis.zone_analysis import draw_player_metric_per_zone, draw_team_metric_per_zone
+
+
+# Limiti di default: ~64 MB di immagini oppure 512 voci, quello che arriva prima.
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 512
+
+# Partite dei dati che si stanno disegnando (vedi ambito_partite)
+_ambito: ContextVar[FrozenSet[str]] = ContextVar("futsal_image_scope", default=frozenset())
+
+
+@contextmanager
+def ambito_partite(partita_ids: Iterable[Any]) -> Iterator[None]:
+    """Le immagini messe in cache nel blocco vengono associate a queste partite.
+
+    Serve solo all'invalidazione (vedi :meth:`RenderedImageCache.invalidate_partita`):
+    le chiavi restano basate sul contenuto, quindi un'immagine identica per due
+    partite è condivisa e associata a entrambe.
+    """
+
+    token = _ambito.set(frozenset(str(p) for p in partita_ids))
+    try:
+        yield
+    finally:
+        _ambito.reset(token)
+
+
+@dataclass(frozen=True)
+class ImageKey:
+    """Chiave di una immagine renderizzata.
+
+    Identifica in modo univoco l'output di una funzione di disegno: se la
+    porzione di report usata e tutti i parametri grafici coincidono, l'immagine
+    è la stessa e può essere riutilizzata.
+    """
+
+    draw_fn: str
+    metric_keys: Tuple[str, ...]
+    per_side: bool
+    cmap: Optional[str]
+    dpi: int
+    data_hash: str
+    title: Optional[str] = None
+    figsize: Optional[Tuple[float, float]] = None
+    fmt: str = "png"
+
+
+class RenderedImageCache:
+    """Cache LRU thread-safe di immagini già codificate, limitata in byte e in numero di voci."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._partite: Dict[Hashable, FrozenSet[str]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._associa(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: Hashable, data: bytes) -> None:
+        # Un'immagine più grande dell'intera cache non viene memorizzata.
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = data
+            self._size += len(data)
+            self._associa(key)
+            self._evict()
+
+    def get_or_render(self, key: Hashable, render: Callable[[], bytes]) -> bytes:
+        """Restituisce l'immagine in cache oppure la genera con ``render`` e la memorizza."""
+
+        data = self.get(key)
+        if data is None:
+            data = render()
+            self.put(key, data)
+        return data
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Rimuove le voci la cui chiave soddisfa ``predicate``. Restituisce quante ne ha rimosse."""
+
+        with self._lock:
+            to_remove = [key for key in self._entries if predicate(key)]
+            for key in to_remove:
+                self._size -= len(self._entries.pop(key))
+                self._partite.pop(key, None)
+            return len(to_remove)
+
+    def invalidate_partita(self, partita_id: Optional[str]) -> int:
+        """Rimuove le immagini disegnate per la partita (tutte con ``None``)."""
+
+        if partita_id is None:
+            with self._lock:
+                n = len(self._entries)
+            self.clear()
+            return n
+        partita_id = str(partita_id)
+        return self.invalidate(lambda key: partita_id in self._partite.get(key, ()))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._partite.clear()
+            self._size = 0
+
+    def _associa(self, key: Hashable) -> None:
+        ambito = _ambito.get()
+        if ambito:
+            self._partite[key] = self._partite.get(key, frozenset()) | ambito
+
+    def _evict(self) -> None:
+        while self._entries and (self._size > self.max_bytes or len(self._entries) > self.max_entries):
+            key, data = self._entries.popitem(last=False)
+            self._partite.pop(key, None)
+            self._size -= len(data)
+
+
+_image_cache = RenderedImageCache()
+_PYPLOT_LOCK = threading.Lock()
+
+
+def get_image_cache() -> RenderedImageCache:
+    """Cache di processo condivisa da tutte le sessioni e da tutte le pagine."""
+
+    return _image_cache
+
+
+registra_invalidatore("immagini", _image_cache.invalidate_partita)
+
+
+def hash_report_slice(data: object) -> str:
+    """Hash stabile di una porzione di report (dict annidati di numeri/stringhe)."""
+
+    payload = json.dumps(data, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _cmap_name(cmap) -> Optional[str]:
+    if cmap is None:
+        return None
+    return getattr(cmap, "name", str(cmap))
+
+
+def _encoding_token(encoding: Union[str, ImageEncoding, None]) -> str:
+    """Parte della chiave che distingue le codifiche (il PNG standard resta "png")."""
+
+    profile = get_image_profile(encoding)
+    if profile == get_image_profile(None):
+        return "png"
+    return repr(profile)
+
+
+def render_figure_bytes(
+    draw: Callable[[], Tuple[Figure, object]],
+    key: ImageKey,
+    cache: Optional[RenderedImageCache] = None,
+    encoding: Union[str, ImageEncoding, None] = None,
+) -> bytes:
+    """Disegna la figura solo se non è già in cache, la codifica e la chiude.
+
+    Args:
+        draw: Funzione senza argomenti che restituisce ``(fig, ax)``.
+        key: Chiave completa dell'immagine (``fmt`` deve identificare ``encoding``).
+        cache: Cache da usare (default: cache di processo).
+        encoding: Profilo di codifica (default: PNG standard).
+    """
+
+    cache = cache or get_image_cache()
+
+    def render() -> bytes:
+        # pyplot non è thread-safe e i grafici possono essere disegnati anche dai lavori in background
+        with _PYPLOT_LOCK:
+            fig, _ = draw()
+            try:
+                if key.figsize:
+                    fig.set_size_inches(*key.figsize)
+                return figure_to_image_bytes(fig, encoding, dpi=key.dpi)
+            finally:
+                plt.close(fig)
+
+    return cache.get_or_render(key, render)
+
+
+def team_zone_image(
+    report_zona: dict,
+    metric_keys: Sequence[str],
+    team_key: str,
+    cmap=None,
+    title: Optional[str] = None,
+    per_side: bool = True,
+    dpi: int = 150,
+    figsize: Optional[Tuple[float, float]] = None,
+    encoding: Union[str, ImageEncoding, None] = None,
+) -> bytes:
+    """Immagine di ``draw_team_metric_per_zone`` (PNG o profilo ``encoding``), riutilizzata se la sezione di squadra non è cambiata."""
+
+    key = ImageKey(
+        draw_fn=f"draw_team_metric_per_zone:{team_key}",
+        metric_keys=tuple(metric_keys),
+        per_side=per_side,
+        cmap=_cmap_name(cmap),
+        dpi=dpi,
+        data_hash=hash_report_slice(report_zona['squadra'][team_key]),
+        title=title,
+        figsize=tuple(figsize) if figsize else None,
+        fmt=_encoding_token(encoding),
+    )
+    return render_figure_bytes(
+        lambda: draw_team_metric_per_zone(
+            report_zona, FutsalPitch(), list(metric_keys),
+            team_key=team_key, cmap=cmap, title=title, per_side=per_side,
+        ),
+        key,
+        encoding=encoding,
+    )
+
+
+def player_zone_image(
+    report_individuali: dict,
+    metric_keys: Sequence[str],
+    chi: str,
+    cmap=None,
+    title: Optional[str] = None,
+    per_side: bool = True,
+    dpi: int = 150,
+    figsize: Optional[Tuple[float, float]] = None,
+    encoding: Union[str, ImageEncoding, None] = None,
+) -> bytes:
+    """Immagine di ``draw_player_metric_per_zone`` (PNG o profilo ``encoding``), riutilizzata se le stats del giocatore non sono cambiate."""
+
+    # Solo le zone presenti e le stats del giocatore influenzano il disegno.
+    player_slice = {str(zona): stats.get(chi) for zona, stats in report_individuali.items()}
+    key = ImageKey(
+        draw_fn=f"draw_player_metric_per_zone:{chi}",
+        metric_keys=tuple(metric_keys),
+        per_side=per_side,
+        cmap=_cmap_name(cmap),
+        dpi=dpi,
+        data_hash=hash_report_slice(player_slice),
+        title=title,
+        figsize=tuple(figsize) if figsize else None,
+        fmt=_encoding_token(encoding),
+    )
+    return render_figure_bytes(
+        lambda: draw_player_metric_per_zone(
+            report_individuali, FutsalPitch(), list(metric_keys),
+            chi=chi, cmap=cmap, title=title, per_side=per_side,
+        ),
+        key,
+        encoding=encoding,
+    )
@@ -0,0 +1,626 @@
+"""Caricamento degli eventi da CSV: lettura a blocchi e inserimenti in parallelo.
+
+Il CSV viene letto ``chunksize`` righe alla volta e ogni blocco viene
+normalizzato con :func:`preprocess_eventi` (operazioni vettoriali di pandas);
+i record pronti vengono inseriti su Supabase in lotti, con un numero limitato
+di inserimenti contemporanei e nuovi tentativi con attesa crescente in caso di
+errore. Così la memoria resta proporzionale al blocco e la lettura del file si
+sovrappone agli inserimenti.
+
+Il caricamento è idempotente: ogni evento ha una chiave naturale (partita,
+posizione, evento, giocatore, squadra) e un'impronta del contenuto, così
+ricaricare lo stesso CSV non duplica gli eventi, le righe modificate vengono
+sostituite e quelle che non compaiono più nel file eliminate (vedi
+:func:`sincronizza_eventi`).
+
+Periodo e tempi di ogni evento (vedi ``utils_time.COLONNE_TEMPI``) vengono
+calcolati qui una volta per tutte e salvati con l'evento, così le pagine non
+li ricalcolano a ogni lettura. Dipendono dall'ordine per posizione e dagli
+eventi di inizio e fine dei tempi dell'intera partita: una prima lettura del
+file tiene solo posizione ed evento di ogni riga (:func:`calcola_tempi_csv`),
+poi i blocchi completi vengono letti e scritti come sopra. Colonne da
+aggiungere alla tabella ``eventi``::
+
+    ALTER TABLE eventi
+        ADD COLUMN periodo_cod smallint,
+        ADD COLUMN tempo_effettivo_sec double precision,
+        ADD COLUMN tempo_reale_sec integer;
+
+Le partite caricate prima si migrano con :func:`backfill_tempi` (bottone in
+Admin o ``python -m futsal_analysis.ingestion backfill-tempi`` dalla cartella
+``app``); vedi anche ISTRUZIONI_CATEGORIA.md. Finché le colonne non esistono
+(:func:`tempi_salvati` restituisce False) gli eventi vengono letti e scritti
+senza, e le pagine ricalcolano i tempi a ogni lettura.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from futsal_analysis.utils_time import COLONNE_TEMPI, calcola_tempi_numerici
+
+
+# Le colonne problematiche restano stringhe per evitare errori PyArrow
+DTYPE_CSV_EVENTI = {
+    'Dove': str,
+    'Field Position': str,
+    'Posizione': str,
+    'Position': str,
+    'Chi': str,
+    'Esito': str,
+    'Piede': str,
+    'Squadra': str,
+    'Lato': str
+}
+
+RINOMINA_COLONNE = {
+    "Posizione": "posizione",
+    "Position": "posizione",
+    "Data": "data",
+    "Evento": "evento",
+    "Portiere": "portiere",
+    "Quartetto": "quartetto",
+    "Chi": "chi",
+    "Esito": "esito",
+    "Field Position": "dove",
+    "Piede": "piede",
+    "Squadra": "squadra",
+    "Dove": "dove",
+    "Lato": "lato",
+}
+
+COLONNE_EVENTI = [
+    "posizione", "data", "evento", "chi", "esito", "dove", "lato", "piede",
+    "portiere",
+    "quartetto",
+    "quartetto_1", "quartetto_2", "quartetto_3", "quartetto_4",
+    "squadra",
+    "partita_id"
+]
+
+CATEGORIE_CSV_SEMPLIFICATO = ('u15', 'u17')
+
+# Identificano un evento della partita; le altre colonne sono il suo contenuto
+CHIAVE_NATURALE = ("partita_id", "posizione", "evento", "chi", "squadra")
+
+DEFAULT_CHUNKSIZE = 2000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+
+# Codice PostgreSQL di "colonna inesistente" (restituito da PostgREST)
+_COLONNA_INESISTENTE = "42703"
+
+
+def to_id_partita(data, avversario) -> str:
+    return f"{data}_{avversario}".replace(" ", "_").replace("/", "-")
+
+
+def parse_data_sicura(data_str):
+    try:
+        return pd.to_datetime(data_str, format="%d/%m/%Y", errors="raise")
+    except Exception:
+        try:
+            return pd.to_datetime(data_str, errors="raise")
+        except Exception:
+            return pd.NaT
+
+
+def preprocess_eventi(
+    df: pd.DataFrame, partita_id: str, categoria: Optional[str] = None, ordina: bool = True
+) -> pd.DataFrame:
+    df = df.rename(columns=RINOMINA_COLONNE)
+
+    df["partita_id"] = partita_id
+
+    # Gestione diversa per categorie u15/u17 (CSV semplificato)
+    if categoria and categoria.lower() in CATEGORIE_CSV_SEMPLIFICATO:
+        # Per u15/u17, le colonne mancanti vengono impostate a stringa vuota
+        colonne_manche = ["portiere", "quartetto", "chi", "esito", "piede"]
+        for col in colonne_manche:
+            if col not in df.columns:
+                df[col] = ""
+
+        # Non processare quartetto per u15/u17
+        split_cols = None
+    else:
+        # Gestione normale per Prima Squadra e U19
+        split_cols = None
+        if "quartetto" in df.columns:
+            # splitto in massimo 5 colonne (0–4)
+            split_cols = df["quartetto"].fillna("").astype(str).str.split(";", expand=True)
+
+            # sostituisco la colonna originale col primo giocatore
+            df["quartetto"] = split_cols[0].str.strip()
+
+        # creo le altre colonne (dal 2° giocatore in poi)
+        for i in range(1, 5):  # dal secondo fino al quinto
+            col_name = f"quartetto_{i}"
+            if split_cols is not None and i < split_cols.shape[1]:
+                df[col_name] = split_cols[i].str.strip()
+            else:
+                df[col_name] = None  # oppure "" se vuoi stringa vuota
+
+    # Conversione data → YYYY-MM-DD
+    if "data" in df.columns:
+        df["data"] = pd.to_datetime(df["data"], format="%d/%m/%Y", errors="coerce").dt.strftime("%Y-%m-%d")
+
+    # 🔑 Qui NON converto più Position a numerico: la tengo come stringa
+    if "posizione" in df.columns:
+        df["posizione"] = df["posizione"].fillna("").astype(str).str.strip()
+
+    for col in COLONNE_EVENTI:
+        if col not in df.columns:
+            df[col] = ""
+
+    df = df[COLONNE_EVENTI]
+    df = df.fillna("")
+
+    # Sostituisci anche le stringhe 'nan' con stringhe vuote
+    df = df.replace('nan', '')
+
+    # ✅ ORDINAMENTO per posizione prima del salvataggio
+    # (stabile: eventi con la stessa posizione restano nell'ordine del file;
+    # ordina=False tiene l'ordine del file, per i controlli di qualità)
+    if ordina:
+        df = df.sort_values("posizione", kind="stable")
+
+    return df
+
+
+def read_eventi_csv(file, chunksize: int = DEFAULT_CHUNKSIZE, nrows: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """Blocchi grezzi del CSV eventi (``file`` è un percorso o un file aperto)."""
+
+    if hasattr(file, "seek"):
+        file.seek(0)
+    yield from pd.read_csv(file, dtype=DTYPE_CSV_EVENTI, chunksize=chunksize, nrows=nrows)
+
+
+def iter_eventi_csv(
+    file,
+    partita_id: str,
+    categoria: Optional[str] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> Iterator[pd.DataFrame]:
+    """Blocchi del CSV già preprocessati (stesse regole di :func:`preprocess_eventi`)."""
+
+    for chunk in read_eventi_csv(file, chunksize=chunksize):
+        yield preprocess_eventi(chunk, partita_id, categoria)
+
+
+@dataclass
+class IngestionResult:
+    """Esito di un caricamento.
+
+    Attributes:
+        rows: Righe scritte (inserite o aggiornate).
+        inserted: Eventi nuovi.
+        updated: Eventi già presenti con contenuto diverso, sostituiti.
+        skipped: Eventi già presenti e invariati, non riscritti.
+        removed: Eventi salvati che non compaiono più nel file, eliminati.
+        batches: Lotti inviati.
+        retries: Nuovi tentativi dopo un errore.
+        seconds: Durata complessiva (lettura, preprocessing e inserimenti).
+        errors: Errori definitivi, uno per lotto fallito.
+    """
+
+    rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    removed: int = 0
+    batches: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def _with_retry(
+    fn: Callable[[], Any],
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+    on_retry: Optional[Callable[[], None]] = None,
+) -> Any:
+    """Esegue ``fn`` ritentando dopo ``backoff``, ``2*backoff``, ... secondi."""
+
+    for tentativo in range(max_retries + 1):
+        try:
+            return fn()
+        except Exception:
+            if tentativo == max_retries:
+                raise
+            if on_retry is not None:
+                on_retry()
+            time.sleep(backoff * (2 ** tentativo))
+
+
+def _batches(records: Iterable[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    lotto: List[Dict[str, Any]] = []
+    for record in records:
+        lotto.append(record)
+        if len(lotto) >= batch_size:
+            yield lotto
+            lotto = []
+    if lotto:
+        yield lotto
+
+
+def _records(frames: Iterable[pd.DataFrame]) -> Iterator[Dict[str, Any]]:
+    for frame in frames:
+        # Valori mancanti come null (NaN e pd.NA non sono JSON validi)
+        yield from frame.astype(object).where(frame.notna(), None).to_dict(orient="records")
+
+
+def insert_batches(
+    client,
+    table: str,
+    frames: Iterable[pd.DataFrame],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+    progress: Optional[Callable[[IngestionResult], None]] = None,
+    on_conflict: Optional[str] = None,
+    result: Optional[IngestionResult] = None,
+) -> IngestionResult:
+    """Inserisce i record dei DataFrame in lotti, con al più ``max_workers`` lotti in volo.
+
+    Args:
+        client: Client Supabase.
+        table: Tabella di destinazione.
+        frames: DataFrame (es. i blocchi di :func:`iter_eventi_csv`), consumati man mano.
+        batch_size: Righe per inserimento.
+        max_workers: Inserimenti contemporanei.
+        max_retries: Nuovi tentativi per lotto prima di considerarlo fallito.
+        backoff: Attesa iniziale tra i tentativi (raddoppia a ogni tentativo).
+        progress: Callback chiamata con il risultato parziale a ogni lotto concluso.
+        on_conflict: Colonna di conflitto: se indicata i lotti sono scritti con ``upsert``.
+        result: Risultato da aggiornare (per sommare più scritture in un unico esito).
+    """
+
+    lotti = ((lotto, on_conflict) for lotto in _batches(_records(frames), batch_size))
+    return _scrivi_lotti(client, table, lotti, max_workers, max_retries, backoff, progress, result)
+
+
+def _scrivi_lotti(
+    client,
+    table: str,
+    lotti: Iterable[Tuple[List[Dict[str, Any]], Optional[str]]],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+    progress: Optional[Callable[[IngestionResult], None]] = None,
+    result: Optional[IngestionResult] = None,
+) -> IngestionResult:
+    """Scrive i lotti ``(record, on_conflict)`` man mano che vengono prodotti (vedi :func:`insert_batches`).
+
+    I lotti con ``on_conflict`` sono upsert e contano come ``updated``, gli altri come ``inserted``.
+    """
+
+    def write(lotto: List[Dict[str, Any]], on_conflict: Optional[str]) -> Any:
+        if on_conflict:
+            return client.table(table).upsert(lotto, on_conflict=on_conflict).execute()
+        return client.table(table).insert(lotto).execute()
+
+    result = result if result is not None else IngestionResult()
+    inizio = time.perf_counter() - result.seconds
+    lock_retry = threading.Lock()
+
+    def _conta_retry() -> None:
+        with lock_retry:
+            result.retries += 1
+
+    def _raccogli(futures: Iterable[Future]) -> None:
+        for future in futures:
+            n_righe, on_conflict = in_volo.pop(future)
+            try:
+                future.result()
+                result.rows += n_righe
+                if on_conflict:
+                    result.updated += n_righe
+                else:
+                    result.inserted += n_righe
+            except Exception as e:
+                result.errors.append(str(e) or e.__class__.__name__)
+            result.seconds = time.perf_counter() - inizio
+            if progress is not None:
+                progress(result)
+
+    in_volo: Dict[Future, Tuple[int, Optional[str]]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="futsal-ingest") as pool:
+        for lotto, on_conflict in lotti:
+            future = pool.submit(
+                _with_retry,
+                lambda lotto=lotto, on_conflict=on_conflict: write(lotto, on_conflict),
+                max_retries, backoff, _conta_retry,
+            )
+            in_volo[future] = (len(lotto), on_conflict)
+            result.batches += 1
+            # Lotti in volo limitati: il file non viene letto tutto in anticipo
+            if len(in_volo) >= max(1, max_workers):
+                finiti, _ = wait(list(in_volo), return_when=FIRST_COMPLETED)
+                _raccogli(finiti)
+        _raccogli(list(in_volo))
+
+    result.seconds = time.perf_counter() - inizio
+    return result
+
+
+class ChiaviEventi:
+    """Chiave naturale e impronta del contenuto degli eventi, calcolate blocco per blocco.
+
+    La chiave è l'hash delle colonne di ``CHIAVE_NATURALE`` più il numero di
+    occorrenza (due eventi identici nella stessa posizione restano distinti);
+    le occorrenze si contano sull'intera partita, anche tra un blocco e l'altro.
+    """
+
+    def __init__(self) -> None:
+        self._occorrenze: Counter = Counter()
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        """DataFrame con colonne ``chiave`` e ``impronta`` (stesso indice di ``df``)."""
+
+        testo = df.reindex(columns=COLONNE_EVENTI).fillna("").astype(str)
+        base = pd.util.hash_pandas_object(testo[list(CHIAVE_NATURALE)], index=False)
+        # I tempi entrano nell'impronta come numeri (interi e decimali letti dal DB coincidono)
+        tempi = df.reindex(columns=COLONNE_TEMPI).apply(pd.to_numeric, errors="coerce").astype("float64")
+        testo = pd.concat([testo, tempi.astype(str)], axis=1)
+        occorrenza = base.groupby(base.to_numpy()).cumcount().to_numpy()
+        offset = base.map(self._occorrenze).fillna(0).astype("int64").to_numpy()
+        self._occorrenze.update(base.value_counts().to_dict())
+        chiave = [f"{b:016x}:{n}" for b, n in zip(base.to_numpy(), occorrenza + offset)]
+        impronta = pd.util.hash_pandas_object(testo, index=False).to_numpy()
+        return pd.DataFrame({"chiave": chiave, "impronta": impronta}, index=df.index)
+
+
+def tempi_salvati(client) -> bool:
+    """True se la tabella ``eventi`` ha le colonne ``COLONNE_TEMPI`` (migrazione fatta).
+
+    Legge una sola riga delle sole colonne dei tempi. Gli altri errori (es. rete)
+    non vengono interpretati come colonne mancanti: si ripresenteranno alla
+    lettura o scrittura vera e propria.
+    """
+
+    try:
+        client.table("eventi").select(",".join(COLONNE_TEMPI)).limit(1).execute()
+    except Exception as e:
+        if getattr(e, "code", None) == _COLONNA_INESISTENTE or "does not exist" in str(e):
+            return False
+    return True
+
+
+def carica_chiavi_esistenti(client, partita_id: str, con_tempi: bool = True) -> Dict[str, tuple]:
+    """Eventi già salvati della partita: chiave -> (id, impronta).
+
+    Con ``con_tempi=False`` le colonne dei tempi non vengono lette (tabella non migrata).
+    """
+
+    # Solo id e colonne di chiave e impronta
+    colonne = ["id", *COLONNE_EVENTI, *(COLONNE_TEMPI if con_tempi else [])]
+    df = carica_eventi(client, partita_id, colonne=",".join(colonne))
+    if df.empty:
+        return {}
+    chiavi = ChiaviEventi()(df)
+    return dict(zip(chiavi["chiave"], zip(df["id"], chiavi["impronta"])))
+
+
+def sincronizza_eventi(
+    client,
+    frames: Iterable[pd.DataFrame],
+    partita_id: str,
+    **insert_kwargs: Any,
+) -> IngestionResult:
+    """Scrive gli eventi di una partita senza duplicarli.
+
+    Gli eventi nuovi vengono inseriti, quelli già presenti con contenuto
+    diverso sostituiti (upsert sull'``id`` esistente) e quelli invariati
+    saltati. Il file è la partita completa: gli eventi salvati che non vi
+    compaiono più (es. con ``chi`` corretto, che fa parte della chiave) vengono
+    eliminati, così una correzione non lascia la riga vecchia accanto alla nuova.
+    Un file senza eventi non elimina nulla.
+    Se la tabella non ha ancora le colonne dei tempi (:func:`tempi_salvati`)
+    gli eventi vengono scritti senza.
+
+    Args:
+        client: Client Supabase.
+        frames: Blocchi preprocessati della partita (es. :func:`iter_eventi_csv`).
+        partita_id: Partita a cui appartengono gli eventi.
+        **insert_kwargs: Opzioni di :func:`insert_batches` (tranne ``on_conflict`` e ``result``).
+    """
+
+    con_tempi = tempi_salvati(client)
+    esistenti = carica_chiavi_esistenti(client, partita_id, con_tempi=con_tempi)
+    calcola_chiavi = ChiaviEventi()
+    batch_size = insert_kwargs.pop("batch_size", DEFAULT_BATCH_SIZE)
+    result = IngestionResult()
+    visti: Set[str] = set()
+
+    def lotti() -> Iterator[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        # Ogni blocco viene classificato e i suoi lotti scritti mentre si legge il successivo;
+        # restano in memoria solo i record che non riempiono ancora un lotto
+        nuovi: List[Dict[str, Any]] = []
+        modificati: List[Dict[str, Any]] = []
+        for frame in frames:
+            if not con_tempi:
+                frame = frame.drop(columns=COLONNE_TEMPI, errors="ignore")
+            chiavi = calcola_chiavi(frame)
+            visti.update(chiavi["chiave"])
+            trovati = chiavi["chiave"].map(esistenti)
+            presente = trovati.notna()
+            impronta_salvata = trovati[presente].map(lambda v: v[1])
+            invariato = pd.Series(False, index=frame.index)
+            invariato[presente] = impronta_salvata.to_numpy() == chiavi.loc[presente, "impronta"].to_numpy()
+            result.skipped += int(invariato.sum())
+            nuovi.extend(_records([frame[~presente]]))
+            da_aggiornare = presente & ~invariato
+            if da_aggiornare.any():
+                modificati.extend(_records([frame[da_aggiornare].assign(id=trovati[da_aggiornare].map(lambda v: v[0]))]))
+            for pendenti, on_conflict in ((nuovi, None), (modificati, "id")):
+                while len(pendenti) >= batch_size:
+                    yield pendenti[:batch_size], on_conflict
+                    del pendenti[:batch_size]
+        if nuovi:
+            yield nuovi, None
+        if modificati:
+            yield modificati, "id"
+
+    _scrivi_lotti(client, "eventi", lotti(), result=result, **insert_kwargs)
+
+    if visti:
+        da_eliminare = [id_evento for chiave, (id_evento, _) in esistenti.items() if chiave not in visti]
+        inizio = time.perf_counter() - result.seconds
+        for lotto in _batches(da_eliminare, batch_size):
+            try:
+                _with_retry(
+                    lambda lotto=lotto: client.table("eventi").delete().in_("id", lotto).execute(),
+                    insert_kwargs.get("max_retries", DEFAULT_MAX_RETRIES),
+                    insert_kwargs.get("backoff", DEFAULT_BACKOFF),
+                )
+                result.removed += len(lotto)
+            except Exception as e:
+                result.errors.append(f"Eventi non più nel file non eliminati: {e}")
+        result.seconds = time.perf_counter() - inizio
+    return result
+
+
+def aggiungi_colonne_tempi(df: pd.DataFrame) -> pd.DataFrame:
+    """Ordina gli eventi per posizione e aggiunge le colonne ``COLONNE_TEMPI``."""
+
+    df = df.drop(columns=COLONNE_TEMPI, errors="ignore").sort_values("posizione", kind="stable")
+    return df.join(calcola_tempi_numerici(df))
+
+
+def calcola_tempi_csv(file, chunksize: int = DEFAULT_CHUNKSIZE) -> pd.DataFrame:
+    """``COLONNE_TEMPI`` di ogni riga del CSV, indicizzate per numero di riga nel file.
+
+    Legge solo le colonne posizione ed evento (normalizzate come in
+    :func:`preprocess_eventi`), quindi i blocchi di :func:`iter_eventi_csv`
+    dello stesso file si completano con ``frame.join(tempi)``.
+    """
+
+    if hasattr(file, "seek"):
+        file.seek(0)
+    parti = []
+    lettore = pd.read_csv(
+        file,
+        dtype=DTYPE_CSV_EVENTI,
+        usecols=lambda colonna: RINOMINA_COLONNE.get(colonna) in ("posizione", "evento"),
+        chunksize=chunksize,
+    )
+    for chunk in lettore:
+        chunk = chunk.rename(columns=RINOMINA_COLONNE).reindex(columns=["posizione", "evento"])
+        chunk["posizione"] = chunk["posizione"].fillna("").astype(str).str.strip().replace("nan", "")
+        parti.append(chunk)
+    if not parti:
+        return pd.DataFrame(columns=COLONNE_TEMPI)
+    df = pd.concat(parti).sort_values("posizione", kind="stable")
+    return calcola_tempi_numerici(df)
+
+
+def ingest_eventi_csv(
+    client,
+    file,
+    partita_id: str,
+    categoria: Optional[str] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    **insert_kwargs: Any,
+) -> IngestionResult:
+    """Legge e preprocessa un CSV a blocchi e lo sincronizza con ``eventi`` (vedi :func:`sincronizza_eventi`).
+
+    Il file viene letto due volte: prima solo posizione ed evento per i tempi
+    (:func:`calcola_tempi_csv`), poi a blocchi completi, scritti man mano.
+    """
+
+    tempi = calcola_tempi_csv(file, chunksize=chunksize)
+    frames = (frame.join(tempi) for frame in iter_eventi_csv(file, partita_id, categoria, chunksize=chunksize))
+    return sincronizza_eventi(client, frames, partita_id, **insert_kwargs)
+
+
+def carica_eventi(client, partita_id: str, page_size: int = 1000, colonne: str = "*") -> pd.DataFrame:
+    """Tutti gli eventi salvati della partita, in ordine di posizione (a pagine).
+
+    ``colonne`` limita le colonne lette (sintassi di ``select``, es. ``"evento,squadra"``).
+    """
+
+    righe: List[Dict[str, Any]] = []
+    inizio = 0
+    while True:
+        # Un solo parametro ``order`` con entrambe le colonne: PostgREST non combina più ``order``
+        pagina = (
+            client.table("eventi").select(colonne).eq("partita_id", partita_id)
+            .order("posizione,id").range(inizio, inizio + page_size - 1).execute().data or []
+        )
+        righe.extend(pagina)
+        if len(pagina) < page_size:
+            break
+        inizio += page_size
+    return pd.DataFrame(righe)
+
+
+def backfill_tempi(
+    client,
+    partita_ids: Optional[Iterable[str]] = None,
+    solo_mancanti: bool = True,
+    progress: Optional[Callable[[str, IngestionResult], None]] = None,
+    **insert_kwargs: Any,
+) -> Dict[str, IngestionResult]:
+    """Calcola e salva ``COLONNE_TEMPI`` per le partite già caricate.
+
+    Args:
+        client: Client Supabase.
+        partita_ids: Partite da migrare (default: tutte quelle della tabella ``partite``).
+        solo_mancanti: Salta le partite che hanno già i tempi su tutti gli eventi.
+        progress: Callback ``(partita_id, esito)`` chiamata a ogni partita conclusa.
+        **insert_kwargs: Opzioni di :func:`insert_batches`.
+
+    Returns:
+        Esito per partita (``rows`` = eventi aggiornati, ``skipped`` = già migrati).
+    """
+
+    if not tempi_salvati(client):
+        raise RuntimeError("La tabella eventi non ha le colonne dei tempi: aggiungile prima (vedi ISTRUZIONI_CATEGORIA.md)")
+    if partita_ids is None:
+        partita_ids = [p["id"] for p in client.table("partite").select("id").execute().data or []]
+
+    esiti: Dict[str, IngestionResult] = {}
+    for partita_id in partita_ids:
+        df = carica_eventi(client, partita_id)
+        if df.empty or (
+            solo_mancanti and "periodo_cod" in df.columns and df["periodo_cod"].notna().all()
+        ):
+            esiti[partita_id] = IngestionResult(skipped=len(df))
+        else:
+            # Righe complete: l'upsert sull'id non deve toccare le altre colonne
+            esiti[partita_id] = insert_batches(
+                client, "eventi", [aggiungi_colonne_tempi(df)], on_conflict="id", **insert_kwargs
+            )
+        if progress is not None:
+            progress(partita_id, esiti[partita_id])
+    return esiti
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:2] != ["backfill-tempi"]:
+        sys.exit("uso: python -m futsal_analysis.ingestion backfill-tempi [partita_id ...]")
+
+    from futsal_analysis.config_supabase import get_supabase_client
+
+    backfill_tempi(
+        get_supabase_client(),
+        sys.argv[2:] or None,
+        progress=lambda pid, esito: print(f"{pid}: {esito.updated} aggiornati, {esito.skipped} già migrati"),
+    )
@@ -0,0 +1,377 @@
+"""Coda locale di lavori in background (export PDF, ricalcoli di stagione).
+
+I lavori pesanti vengono eseguiti da un pool di thread condiviso dal processo
+Streamlit, con un numero limitato di lavori contemporanei: la sessione che li
+richiede non resta bloccata e più utenti non si rallentano a vicenda oltre il
+limite fissato. Lo stato di ogni lavoro (e il risultato) è salvato su disco,
+così sopravvive ai rerun e alla chiusura della pagina.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+from futsal_analysis.cache_registry import registra_invalidatore
+
+
+# Lavori eseguiti contemporaneamente; gli altri restano in coda
+DEFAULT_MAX_JOBS = 2
+# I lavori conclusi (e i loro risultati) vengono eliminati dopo un giorno
+DEFAULT_RETENTION_SECONDS = 24 * 60 * 60
+
+IN_CODA = "in coda"
+IN_CORSO = "in corso"
+COMPLETATO = "completato"
+ERRORE = "errore"
+INTERROTTO = "interrotto"
+STATI_ATTIVI = (IN_CODA, IN_CORSO)
+
+
+@dataclass
+class Job:
+    """Stato di un lavoro (è ciò che viene salvato su disco).
+
+    Attributes:
+        id: Identificativo univoco.
+        tipo: Tipo di lavoro (es. ``"pdf_partita"``, ``"minutaggi"``).
+        descrizione: Testo mostrato all'utente.
+        owner: Sessione che ha richiesto il lavoro.
+        key: Chiave di deduplicazione (stesso lavoro sugli stessi dati).
+        stato: Uno tra in coda, in corso, completato, errore, interrotto.
+        errore: Messaggio di errore se il lavoro è fallito.
+        file_name: Nome suggerito per scaricare il risultato.
+        mime: Tipo MIME del risultato scaricabile.
+        partite: Partite da cui deriva il risultato (per scartarlo se cambiano).
+    """
+
+    id: str
+    tipo: str
+    descrizione: str
+    owner: Optional[str] = None
+    key: Optional[str] = None
+    stato: str = IN_CODA
+    creato: float = 0.0
+    avviato: Optional[float] = None
+    concluso: Optional[float] = None
+    errore: Optional[str] = None
+    file_name: Optional[str] = None
+    mime: Optional[str] = None
+    partite: Optional[List[str]] = None
+
+    @property
+    def attivo(self) -> bool:
+        return self.stato in STATI_ATTIVI
+
+    @property
+    def durata(self) -> Optional[float]:
+        if self.avviato is None:
+            return None
+        return (self.concluso or time.time()) - self.avviato
+
+
+class JobQueue:
+    """Pool di thread con stato dei lavori persistito in ``state_dir``.
+
+    Esempio:
+        queue = get_job_queue()
+        job_id = queue.submit("pdf", "Report stagione", genera_pdf, file_name="report.pdf")
+        queue.status(job_id).stato   # "in coda" / "in corso" / "completato" / ...
+        pdf_bytes = queue.result(job_id)
+    """
+
+    def __init__(
+        self,
+        state_dir: Optional[str] = None,
+        max_jobs: int = DEFAULT_MAX_JOBS,
+        retention_seconds: float = DEFAULT_RETENTION_SECONDS,
+    ) -> None:
+        self.state_dir = state_dir or os.path.join(tempfile.gettempdir(), "futsal_jobs")
+        self.max_jobs = max_jobs
+        self.retention_seconds = retention_seconds
+        os.makedirs(self.state_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="futsal-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._futures: Dict[str, Future] = {}
+        self._carica_stato()
+
+    # --- API ---
+
+    def submit(
+        self,
+        tipo: str,
+        descrizione: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        owner: Optional[str] = None,
+        key: Optional[Hashable] = None,
+        file_name: Optional[str] = None,
+        mime: Optional[str] = None,
+        partite: Optional[Sequence[Any]] = None,
+        **kwargs: Any,
+    ) -> str:
+        """Mette in coda ``fn(*args, **kwargs)`` e restituisce l'id del lavoro.
+
+        Se è indicata una ``key`` e un lavoro della stessa sessione (``owner``)
+        con la stessa chiave è in coda, in corso o già completato, viene
+        restituito quello invece di crearne uno nuovo. Le altre sessioni hanno
+        i loro lavori: il pannello di ognuna elenca solo quelli del suo owner.
+        """
+
+        key_str = None if key is None else str(key)
+        with self._lock:
+            self._elimina_scaduti()
+            if key_str is not None:
+                for job in self._jobs.values():
+                    if job.key == key_str and job.owner == owner and (job.attivo or job.stato == COMPLETATO):
+                        return job.id
+            job = Job(
+                id=uuid.uuid4().hex,
+                tipo=tipo,
+                descrizione=descrizione,
+                owner=owner,
+                key=key_str,
+                creato=time.time(),
+                file_name=file_name,
+                mime=mime,
+                partite=[str(p) for p in partite] if partite is not None else None,
+            )
+            self._jobs[job.id] = job
+            self._salva(job)
+            self._futures[job.id] = self._executor.submit(self._esegui, job.id, fn, args, kwargs)
+        return job.id
+
+    def status(self, job_id: str) -> Optional[Job]:
+        """Stato corrente del lavoro (None se non esiste o è stato eliminato)."""
+
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def result(self, job_id: str, timeout: Optional[float] = 0) -> Any:
+        """Risultato di un lavoro completato.
+
+        Args:
+            job_id: Id restituito da :meth:`submit`.
+            timeout: Secondi di attesa se il lavoro non è concluso (None = senza limite).
+
+        Raises:
+            KeyError: Lavoro inesistente.
+            TimeoutError: Lavoro non concluso entro ``timeout``.
+            RuntimeError: Lavoro fallito o interrotto.
+        """
+
+        job = self.status(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job.attivo:
+            future = self._futures.get(job_id)
+            if future is None or timeout == 0:
+                raise TimeoutError(f"Il lavoro {job_id} non è ancora concluso")
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+            job = self.status(job_id)
+            if job is None:
+                raise KeyError(job_id)
+            if job.attivo:
+                raise TimeoutError(f"Il lavoro {job_id} non è ancora concluso")
+        if job.stato != COMPLETATO:
+            raise RuntimeError(job.errore or f"Lavoro {job.stato}")
+        with open(self._path(job_id, "result"), "rb") as f:
+            return pickle.load(f)
+
+    def jobs(self, owner: Optional[str] = None) -> List[Job]:
+        """Lavori (dell'``owner`` indicato, o tutti) dal più recente."""
+
+        with self._lock:
+            selezionati = [j for j in self._jobs.values() if owner is None or j.owner == owner]
+        return sorted(selezionati, key=lambda j: j.creato, reverse=True)
+
+    def running(self) -> int:
+        """Numero di lavori attualmente in esecuzione (di tutte le sessioni)."""
+
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if j.stato == IN_CORSO)
+
+    def discard(self, job_id: str) -> None:
+        """Elimina un lavoro concluso e il suo risultato (i lavori in coda vengono annullati)."""
+
+        with self._lock:
+            future = self._futures.get(job_id)
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if job.stato == IN_CORSO:
+                return
+            if future is not None:
+                future.cancel()
+            self._rimuovi(job_id)
+
+    def scarta_partita(self, partita_id: Optional[str]) -> int:
+        """Elimina i lavori conclusi derivati dalla partita (tutti con ``None``); restituisce quanti."""
+
+        with self._lock:
+            da_scartare = [
+                job.id for job in self._jobs.values()
+                if not job.attivo and (partita_id is None or str(partita_id) in (job.partite or ()))
+            ]
+            for job_id in da_scartare:
+                self._rimuovi(job_id)
+            return len(da_scartare)
+
+    # --- Esecuzione ---
+
+    def _esegui(self, job_id: str, fn: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.stato = IN_CORSO
+            job.avviato = time.time()
+            self._salva(job)
+        try:
+            risultato = fn(*args, **kwargs)
+            # Scrittura atomica: un risultato parziale non viene mai letto
+            tmp_path = self._path(job_id, "result.tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(risultato, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(job_id, "result"))
+            stato, errore = COMPLETATO, None
+        except Exception as e:
+            traceback.print_exc()
+            stato, errore = ERRORE, str(e) or e.__class__.__name__
+        with self._lock:
+            self._futures.pop(job_id, None)
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.stato = stato
+            job.errore = errore
+            job.concluso = time.time()
+            self._salva(job)
+
+    # --- Persistenza ---
+
+    def _path(self, job_id: str, suffix: str) -> str:
+        return os.path.join(self.state_dir, f"{job_id}.{suffix}")
+
+    def _salva(self, job: Job) -> None:
+        tmp_path = self._path(job.id, "json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(job), f)
+        os.replace(tmp_path, self._path(job.id, "json"))
+
+    def _carica_stato(self) -> None:
+        """Ricarica i lavori salvati; quelli rimasti attivi in un processo precedente sono interrotti."""
+
+        for nome in os.listdir(self.state_dir):
+            if not nome.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.state_dir, nome), encoding="utf-8") as f:
+                    job = Job(**json.load(f))
+            except (OSError, ValueError, TypeError):
+                continue
+            if job.attivo:
+                job.stato = INTERROTTO
+                job.errore = "Il server è stato riavviato prima della fine del lavoro"
+                job.concluso = time.time()
+                self._salva(job)
+            self._jobs[job.id] = job
+        with self._lock:
+            self._elimina_scaduti()
+
+    def _elimina_scaduti(self) -> None:
+        limite = time.time() - self.retention_seconds
+        for job in list(self._jobs.values()):
+            if not job.attivo and (job.concluso or job.creato) < limite:
+                self._rimuovi(job.id)
+
+    def _rimuovi(self, job_id: str) -> None:
+        self._jobs.pop(job_id, None)
+        self._futures.pop(job_id, None)
+        for suffix in ("json", "result"):
+            try:
+                os.remove(self._path(job_id, suffix))
+            except FileNotFoundError:
+                pass
+
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Coda di processo condivisa da tutte le sessioni (creata al primo utilizzo).
+
+    La cartella di stato e il numero di lavori contemporanei si possono
+    impostare con le variabili d'ambiente ``FUTSAL_JOBS_DIR`` e ``FUTSAL_MAX_JOBS``.
+    """
+
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                state_dir=os.environ.get("FUTSAL_JOBS_DIR"),
+                max_jobs=int(os.environ.get("FUTSAL_MAX_JOBS", DEFAULT_MAX_JOBS)),
+            )
+        return _job_queue
+
+
+# I PDF già generati per una partita eliminata o ricaricata non vanno più riproposti
+registra_invalidatore("lavori", lambda partita_id: get_job_queue().scarta_partita(partita_id))
+
+
+def session_owner(state) -> str:
+    """Id stabile della sessione Streamlit, usato come ``owner`` dei lavori."""
+
+    return state.setdefault("_job_owner", uuid.uuid4().hex)
+
+
+def report_in_background(
+    queue: JobQueue,
+    reports,
+    name: str,
+    descrizione: str,
+    owner: Optional[str] = None,
+) -> bool:
+    """Calcola un report di ``LazyReports`` nella coda invece che nello script.
+
+    Restituisce True se il report è già disponibile; altrimenti mette in coda il
+    calcolo (una sola volta per impronta dei dati) e restituisce False. Il
+    thread del lavoro esegue solo la funzione di calcolo: il valore viene
+    memorizzato nel contenitore della sessione dallo script, al primo rerun
+    dopo la fine del lavoro.
+    """
+
+    if reports.is_computed(name):
+        return True
+    job_id = queue.submit(
+        "report",
+        descrizione,
+        reports.builder(name),
+        owner=owner,
+        key=("report", name, reports.fingerprint, id(reports)),
+        partite=sorted(reports.partite),
+    )
+    job = queue.status(job_id)
+    if job is None or job.attivo:
+        return False
+    if job.stato == COMPLETATO:
+        reports.store(name, queue.result(job_id))
+    else:
+        # Calcolo fallito: lo si ripete nello script, così l'errore viene mostrato nella pagina
+        queue.discard(job_id)
+        reports[name]
+    return reports.is_computed(name)
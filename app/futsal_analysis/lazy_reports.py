@@ -0,0 +1,155 @@
+"""Contenitore lazy dei report: ogni report viene calcolato solo al primo accesso."""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import weakref
+from typing import Any, Callable, Dict, Iterable, MutableMapping, Optional
+
+import pandas as pd
+
+from futsal_analysis.cache_registry import registra_invalidatore
+
+
+_SESSION_KEY = "_lazy_reports"
+
+
+class LazyReports:
+    """Raccolta di report calcolati su richiesta e memorizzati.
+
+    Ogni report è descritto da una funzione senza argomenti (``builders``);
+    la funzione viene eseguita solo la prima volta che il report è richiesto.
+    Se il calcolo solleva un'eccezione il risultato non viene memorizzato.
+
+    Esempio:
+        reports = LazyReports({"eventi": lambda: calcola_report_completo(df)})
+        reports["eventi"]  # calcolato qui
+        reports["eventi"]  # riutilizzato
+    """
+
+    def __init__(
+        self,
+        builders: Dict[str, Callable[[], Any]],
+        fingerprint: str = "",
+        partite: Iterable[Any] = (),
+    ) -> None:
+        self._builders = dict(builders)
+        self._values: Dict[str, Any] = {}
+        self.fingerprint = fingerprint
+        self.partite = frozenset(str(p) for p in partite)
+        with _contenitori_lock:
+            _contenitori.add(self)
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._values:
+            if name not in self._builders:
+                raise KeyError(name)
+            self._values[name] = self._builders[name]()
+        return self._values[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._builders
+
+    def get(self, name: str, default: Any = None) -> Any:
+        if name not in self._builders:
+            return default
+        return self[name]
+
+    def builder(self, name: str) -> Callable[[], Any]:
+        """Funzione di calcolo del report, per eseguirla altrove (es. nella coda dei lavori)."""
+        return self._builders[name]
+
+    def store(self, name: str, value: Any) -> None:
+        """Memorizza un report calcolato altrove con :meth:`builder`."""
+        if name not in self._builders:
+            raise KeyError(name)
+        self._values[name] = value
+
+    def is_computed(self, name: str) -> bool:
+        return name in self._values
+
+    def computed(self) -> list[str]:
+        """Nomi dei report già calcolati."""
+        return list(self._values)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Scarta un report (o tutti) così che venga ricalcolato al prossimo accesso."""
+        if name is None:
+            self._values.clear()
+        else:
+            self._values.pop(name, None)
+
+
+# Contenitori vivi di tutte le sessioni, per scartare i report di una partita eliminata
+_contenitori: "weakref.WeakSet[LazyReports]" = weakref.WeakSet()
+_contenitori_lock = threading.Lock()
+
+
+def invalida_report_partita(partita_id: Optional[str]) -> int:
+    """Scarta i report calcolati (di ogni sessione) che includono la partita; restituisce quanti."""
+
+    with _contenitori_lock:
+        contenitori = list(_contenitori)
+    scartati = 0
+    for reports in contenitori:
+        if partita_id is None or str(partita_id) in reports.partite:
+            scartati += len(reports.computed())
+            reports.invalidate()
+    return scartati
+
+
+registra_invalidatore("report", invalida_report_partita)
+
+
+def fingerprint_dataframe(df: pd.DataFrame, *extra: object) -> str:
+    """Impronta del contenuto di un DataFrame (più eventuali valori aggiuntivi)."""
+
+    digest = hashlib.sha1()
+    for value in extra:
+        digest.update(repr(value).encode("utf-8"))
+    digest.update(repr(list(df.columns)).encode("utf-8"))
+    if not df.empty:
+        digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def get_session_reports(
+    state: MutableMapping,
+    namespace: str,
+    fingerprint: str,
+    builders: Dict[str, Callable[[], Any]],
+    partite: Iterable[Any] = (),
+) -> LazyReports:
+    """Restituisce il contenitore memorizzato nella sessione per ``namespace``.
+
+    Il contenitore viene riutilizzato finché l'impronta dei dati non cambia;
+    altrimenti viene sostituito, così per ogni pagina resta in memoria un solo
+    insieme di report.
+
+    Args:
+        state: Mapping della sessione (tipicamente ``st.session_state``).
+        namespace: Nome logico della pagina/vista (es. ``"partita"``).
+        fingerprint: Impronta dei dati da cui derivano i report.
+        builders: Funzioni di calcolo per nome di report.
+        partite: Partite da cui derivano i report (per invalidarli se cambiano).
+    """
+
+    containers = state.setdefault(_SESSION_KEY, {})
+    reports = containers.get(namespace)
+    if reports is None or reports.fingerprint != fingerprint:
+        reports = LazyReports(builders, fingerprint=fingerprint, partite=partite)
+        containers[namespace] = reports
+    return reports
+
+
+def keep_widget_state(state: MutableMapping, keys: Iterable[str]) -> None:
+    """Mantiene il valore dei widget anche nelle esecuzioni in cui non vengono disegnati.
+
+    Con i tab lazy i widget dei tab nascosti non vengono creati e Streamlit
+    ne cancellerebbe lo stato; riassegnare il valore lo rende persistente.
+    """
+
+    for key in keys:
+        if key in state:
+            state[key] = state[key]
@@ -0,0 +1,474 @@
+"""Statistiche live incrementali: ogni evento aggiorna i contatori in tempo costante.
+
+Gli accumulatori riproducono le statistiche di squadra di ``utils_eventi``
+(``calcola_attacco``, ``calcola_difesa``, ``calcola_falli``) e i contatori di
+palle perse/recuperate della pagina Live, divisi in Totale/1T/2T come
+``_with_split``, e i minutaggi di ``calcola_minutaggi``. A ogni aggiornamento
+si elaborano solo gli eventi nuovi, invece di rifiltrare tutto il DataFrame
+della partita.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from futsal_analysis.utils_minutaggi import chiavi_minutaggio, estrai_mov_portiere, minutaggi_to_frames
+from futsal_analysis.utils_time import format_mmss, to_seconds
+
+from futsal_analysis.utils_eventi import (
+    calcola_attacco,
+    calcola_difesa,
+    calcola_falli,
+    calcola_palle_recuperate_perse,
+    calcola_ripartenze,
+)
+
+
+PERIODI = ('Totale', '1T', '2T')
+PERIODO_PER_NOME = {'Primo tempo': '1T', 'Secondo tempo': '2T'}
+ESITI_IN_PORTA = ('Parata', 'Gol', 'Palo')
+PERIODO_MINUTAGGI = {'Primo tempo': 'primo_tempo', 'Secondo tempo': 'secondo_tempo'}
+# Falli di squadra per tempo: al 5° si avvisa, dal 6° ogni fallo concede un tiro libero
+SOGLIA_AVVISO_FALLI = 5
+SOGLIA_TIRO_LIBERO = 6
+AVVISO = 'avviso'
+TIRO_LIBERO = 'tiro libero'
+COLONNE_IN_CAMPO = ('quartetto', 'quartetto_1', 'quartetto_2', 'quartetto_3', 'quartetto_4', 'portiere')
+
+
+def _testo(valore: Any) -> str:
+    # Come str.contains(na=False): valori mancanti o non testuali non corrispondono
+    return valore if isinstance(valore, str) else ''
+
+
+class StatsAccumulator:
+    """Contatori Totale/1T/2T aggiornati un evento alla volta.
+
+    Le sottoclassi definiscono ``KEYS`` (nello stesso ordine della funzione
+    batch corrispondente) e :meth:`_chiavi`, che restituisce le statistiche
+    incrementate da un evento.
+    """
+
+    KEYS: Tuple[str, ...] = ()
+
+    def __init__(self) -> None:
+        self._stats: Dict[str, Dict[str, int]] = {p: dict.fromkeys(self.KEYS, 0) for p in PERIODI}
+
+    def _chiavi(self, evento: str, squadra: str, esito: str) -> Iterable[str]:
+        raise NotImplementedError
+
+    def add(self, evento: Any, squadra: Any, esito: Any, periodo: Any = None) -> None:
+        """Conta un evento (``periodo`` è il valore della colonna ``Periodo``)."""
+
+        chiavi = list(self._chiavi(_testo(evento), _testo(squadra), _testo(esito)))
+        if not chiavi:
+            return
+        split = PERIODO_PER_NOME.get(periodo) if isinstance(periodo, str) else None
+        for nome in ('Totale', split) if split else ('Totale',):
+            stats = self._stats[nome]
+            for chiave in chiavi:
+                stats[chiave] += 1
+
+    def as_dict(self) -> Dict[str, Dict[str, int]]:
+        """Copia dei contatori nel formato di ``_with_split``."""
+
+        return {p: dict(stats) for p, stats in self._stats.items()}
+
+
+class AttaccoAccumulator(StatsAccumulator):
+    """Equivalente incrementale di ``calcola_attacco(df)``."""
+
+    KEYS = (
+        'gol_fatti', 'tiri_totali', 'tiri_in_porta', 'tiri_fuori', 'tiri_ribattuti',
+        'palo_traversa', 'angoli', 'laterali', 'rigori', 'tiri_liberi',
+    )
+
+    def _chiavi(self, evento, squadra, esito):
+        if squadra != 'Noi':
+            return
+        if 'Gol' in evento:
+            yield 'gol_fatti'
+        if 'Tiro' in evento:
+            yield 'tiri_totali'
+            if esito in ESITI_IN_PORTA:
+                yield 'tiri_in_porta'
+            if esito == 'Fuori':
+                yield 'tiri_fuori'
+            if esito == 'Ribattuto':
+                yield 'tiri_ribattuti'
+            if esito == 'Palo':
+                yield 'palo_traversa'
+        if 'Angolo' in evento:
+            yield 'angoli'
+        if 'Laterale' in evento:
+            yield 'laterali'
+        if 'Rigore' in evento:
+            yield 'rigori'
+        if 'Tiro libero' in evento:
+            yield 'tiri_liberi'
+
+
+class DifesaAccumulator(StatsAccumulator):
+    """Equivalente incrementale di ``calcola_difesa(df)``."""
+
+    KEYS = (
+        'gol_subiti', 'tiri_subiti', 'tiri_in_porta_subiti', 'tiri_fuori_subiti',
+        'tiri_loro_ribattuti_da_noi', 'tiri_loro_palo_traversa', 'angoli_subiti',
+        'laterali_subiti', 'rigori_subiti', 'tiri_liberi_subiti',
+    )
+
+    def _chiavi(self, evento, squadra, esito):
+        if squadra != 'Loro':
+            return
+        if 'Gol' in evento:
+            yield 'gol_subiti'
+        if 'Tiro' in evento:
+            yield 'tiri_subiti'
+            if esito in ESITI_IN_PORTA:
+                yield 'tiri_in_porta_subiti'
+            if esito == 'Fuori':
+                yield 'tiri_fuori_subiti'
+            if esito == 'Ribattuto':
+                yield 'tiri_loro_ribattuti_da_noi'
+            if esito == 'Palo':
+                yield 'tiri_loro_palo_traversa'
+        if 'Angolo' in evento:
+            yield 'angoli_subiti'
+        if 'Laterale' in evento:
+            yield 'laterali_subiti'
+        if 'Rigore' in evento:
+            yield 'rigori_subiti'
+        if 'Tiro libero' in evento:
+            yield 'tiri_liberi_subiti'
+
+
+class FalliAccumulator(StatsAccumulator):
+    """Equivalente incrementale di ``calcola_falli(df)``."""
+
+    KEYS = ('falli', 'falli_subiti', 'ammonizioni', 'espulsioni', 'ammonizioni_loro', 'espulsioni_loro')
+
+    def _chiavi(self, evento, squadra, esito):
+        if squadra == 'Noi':
+            suffisso = ''
+        elif squadra == 'Loro':
+            suffisso = '_loro'
+        else:
+            return
+        if 'Fallo' in evento:
+            yield 'falli' if squadra == 'Noi' else 'falli_subiti'
+        if 'Ammonizione' in evento:
+            yield 'ammonizioni' + suffisso
+        if 'Espulsione' in evento:
+            yield 'espulsioni' + suffisso
+
+
+class PalleAccumulator(StatsAccumulator):
+    """Palle perse/recuperate e ripartenze (sezione Perse/Recuperate della pagina Live).
+
+    Come ``calcola_palle_recuperate_perse``, perse e recuperate sono contate per
+    entrambe le squadre; le ripartenze come in ``calcola_ripartenze``.
+    """
+
+    KEYS = ('palle_perse', 'ripartenze', 'palle_recuperate', 'ripartenze_loro')
+
+    def _chiavi(self, evento, squadra, esito):
+        if 'Palla persa' in evento:
+            yield 'palle_perse'
+        if 'Ripartenza' in evento:
+            if squadra == 'Noi':
+                yield 'ripartenze'
+            elif squadra == 'Loro':
+                yield 'ripartenze_loro'
+        if 'Palla recuperata' in evento:
+            yield 'palle_recuperate'
+
+
+class MinutaggiAccumulator:
+    """Minutaggi live con le stesse regole di ``calcola_minutaggi`` e cronometri in campo.
+
+    Il tempo tra due eventi consecutivi dello stesso periodo (tempo reale, dal
+    primo evento del periodo) viene attribuito ai giocatori in campo
+    nell'evento successivo, come nel calcolo batch. Oltre ai totali per
+    categoria tiene il quartetto in campo e da quanto ciascun giocatore è
+    entrato (il turno riparte al cambio di periodo).
+    """
+
+    PERIODI = ('totale', 'primo_tempo', 'secondo_tempo')
+
+    def __init__(self) -> None:
+        self._secondi: Dict[str, Dict[Tuple[str, tuple], float]] = {p: defaultdict(float) for p in self.PERIODI}
+        self._durata: Dict[str, float] = dict.fromkeys(self.PERIODI, 0.0)
+        self._periodo: Optional[str] = None
+        self._inizio_periodo: Optional[float] = None
+        self._ultimo_tempo: Optional[int] = None
+        self._turni: Dict[str, float] = {}
+        self._cache: Dict[Tuple[str, Optional[tuple]], Dict[str, pd.DataFrame]] = {}
+        self.in_campo: Optional[Tuple[Optional[str], Tuple[str, ...]]] = None
+        self.in_campo_da: float = 0.0
+
+    def add(self, posizione: Any, periodo: Any, movimento: Sequence[str], portiere: Optional[str]) -> None:
+        """Conta un evento (``movimento`` e ``portiere`` come da ``estrai_mov_portiere``)."""
+
+        try:
+            secondi = to_seconds(posizione) if isinstance(posizione, str) else None
+        except ValueError:
+            secondi = None
+        if secondi is None or pd.isna(secondi) or not isinstance(periodo, str):
+            return
+        if periodo != self._periodo:
+            self._periodo = periodo
+            self._inizio_periodo = secondi
+            self._ultimo_tempo = None
+            self._turni = {}
+            self.in_campo = None
+            self.in_campo_da = 0.0
+
+        # Come tempoReale: secondi interi dall'inizio del periodo
+        tempo = int(secondi - self._inizio_periodo)
+        ultimo, self._ultimo_tempo = self._ultimo_tempo, tempo
+        if ultimo is None or tempo <= ultimo:
+            return
+        delta = float(tempo - ultimo)
+        periodi = ('totale', PERIODO_MINUTAGGI[periodo]) if periodo in PERIODO_MINUTAGGI else ('totale',)
+        for nome in periodi:
+            self._durata[nome] += delta
+            # Solo i periodi toccati vanno ricostruiti
+            for chiave_cache in [k for k in self._cache if k[0] == nome]:
+                del self._cache[chiave_cache]
+        if not movimento:
+            return
+
+        chiavi = chiavi_minutaggio(movimento, portiere)
+        for nome in periodi:
+            secondi_periodo = self._secondi[nome]
+            for chiave in chiavi:
+                secondi_periodo[chiave] += delta
+
+        in_campo = (portiere, tuple(movimento))
+        if in_campo != self.in_campo:
+            self.in_campo = in_campo
+            self.in_campo_da = 0.0
+        self.in_campo_da += delta
+        giocatori = [portiere, *movimento] if portiere else list(movimento)
+        self._turni = {g: self._turni.get(g, 0.0) + delta for g in giocatori}
+
+    def as_minutaggi(self, categorie: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, pd.DataFrame]]:
+        """Minutaggi nel formato di ``calcola_minutaggi``.
+
+        I DataFrame di un periodo vengono ricostruiti solo se nel periodo sono
+        arrivati eventi; ``categorie`` limita la costruzione a quelle mostrate.
+        """
+
+        filtro = None if categorie is None else tuple(categorie)
+        risultato = {}
+        for periodo in self.PERIODI:
+            chiave_cache = (periodo, filtro)
+            if chiave_cache not in self._cache:
+                secondi = self._secondi[periodo]
+                if filtro is not None:
+                    secondi = {k: v for k, v in secondi.items() if k[0] in filtro}
+                self._cache[chiave_cache] = minutaggi_to_frames(secondi, self._durata[periodo])
+            risultato[periodo] = self._cache[chiave_cache]
+        return risultato
+
+    def cronometri(self) -> pd.DataFrame:
+        """Giocatori in campo: da quanto sono entrati e minuti totali della partita."""
+
+        totali = self._secondi['totale']
+        righe = []
+        for giocatore, turno in self._turni.items():
+            portiere = self.in_campo is not None and giocatore == self.in_campo[0]
+            categoria = 'mov4_portieri' if portiere else 'mov4_singoli'
+            righe.append({
+                'Giocatore': giocatore,
+                'Ruolo': 'Portiere' if portiere else 'Movimento',
+                'In_campo_da': format_mmss(turno),
+                'Minuti_giocati': format_mmss(totali.get((categoria, (giocatore,)), 0.0)),
+            })
+        return pd.DataFrame(righe, columns=['Giocatore', 'Ruolo', 'In_campo_da', 'Minuti_giocati'])
+
+
+@dataclass(frozen=True)
+class AllarmeFalli:
+    """Soglia di falli di squadra raggiunta in un tempo.
+
+    Attributes:
+        squadra: ``'Noi'`` o ``'Loro'``.
+        periodo: ``'1T'`` o ``'2T'``.
+        numero: Falli accumulati dalla squadra nel tempo, compreso questo.
+        livello: ``AVVISO`` (5° fallo) o ``TIRO_LIBERO`` (dal 6°).
+        posizione: Posizione (tempo video) del fallo, se nota.
+    """
+
+    squadra: str
+    periodo: str
+    numero: int
+    livello: str
+    posizione: Optional[str] = None
+
+    @property
+    def messaggio(self) -> str:
+        chi = 'Noi' if self.squadra == 'Noi' else 'Avversari'
+        if self.livello == TIRO_LIBERO:
+            return f"{chi}: {self.numero}° fallo nel {self.periodo} → tiro libero"
+        return f"{chi}: {self.numero}° fallo nel {self.periodo}, il prossimo è tiro libero"
+
+
+class FalliSquadraAccumulator:
+    """Falli di squadra accumulati per tempo (stessa regola di ``calcola_falli``) con allarmi.
+
+    I falli si azzerano a ogni tempo; al 5° fallo di una squadra viene generato
+    un avviso e dal 6° un allarme di tiro libero per ogni fallo.
+    """
+
+    SQUADRE = ('Noi', 'Loro')
+
+    def __init__(self) -> None:
+        self._falli: Dict[str, Dict[str, int]] = {p: dict.fromkeys(self.SQUADRE, 0) for p in ('1T', '2T')}
+        self.allarmi: List[AllarmeFalli] = []
+        self.periodo: Optional[str] = None
+
+    def add(self, evento: Any, squadra: Any, periodo: Any, posizione: Any = None) -> Optional[AllarmeFalli]:
+        """Conta un evento; restituisce l'allarme generato, se c'è."""
+
+        split = PERIODO_PER_NOME.get(periodo) if isinstance(periodo, str) else None
+        if split is None:
+            return None
+        self.periodo = split
+        if 'Fallo' not in _testo(evento) or squadra not in self.SQUADRE:
+            return None
+        numero = self._falli[split][squadra] + 1
+        self._falli[split][squadra] = numero
+        if numero < SOGLIA_AVVISO_FALLI:
+            return None
+        livello = TIRO_LIBERO if numero >= SOGLIA_TIRO_LIBERO else AVVISO
+        allarme = AllarmeFalli(squadra, split, numero, livello, posizione if isinstance(posizione, str) else None)
+        self.allarmi.append(allarme)
+        return allarme
+
+    def falli(self, periodo: Optional[str] = None) -> Dict[str, int]:
+        """Falli accumulati per squadra nel tempo indicato (default: quello in corso)."""
+
+        periodo = periodo or self.periodo or '1T'
+        return dict(self._falli[periodo])
+
+    def stato(self, squadra: str, periodo: Optional[str] = None) -> Optional[str]:
+        """``AVVISO``, ``TIRO_LIBERO`` o None per la squadra nel tempo indicato."""
+
+        numero = self.falli(periodo)[squadra]
+        if numero >= SOGLIA_TIRO_LIBERO - 1:
+            # Con 5 falli il prossimo è già tiro libero
+            return TIRO_LIBERO if numero >= SOGLIA_TIRO_LIBERO else AVVISO
+        return None
+
+
+class LiveAccumulators:
+    """Tutti gli accumulatori della pagina Live, aggiornati insieme.
+
+    Esempio:
+        acc = LiveAccumulators()
+        acc.add_events(nuovi_eventi)      # solo le righe arrivate
+        acc.as_report()['attacco']['1T']  # -> {'gol_fatti': ..., ...}
+    """
+
+    def __init__(self) -> None:
+        self.attacco = AttaccoAccumulator()
+        self.difesa = DifesaAccumulator()
+        self.falli = FalliAccumulator()
+        self.palle = PalleAccumulator()
+        self.minutaggi = MinutaggiAccumulator()
+        self.falli_squadra = FalliSquadraAccumulator()
+        self.n_eventi = 0
+
+    @property
+    def _accumulatori(self) -> Dict[str, StatsAccumulator]:
+        return {'attacco': self.attacco, 'difesa': self.difesa, 'falli': self.falli, 'palle': self.palle}
+
+    def add_event(self, evento: Mapping[str, Any]) -> None:
+        """Conta un singolo evento (riga con ``evento``, ``squadra``, ``esito``, ``Periodo``)."""
+
+        valori = (evento.get('evento'), evento.get('squadra'), evento.get('esito'), evento.get('Periodo'))
+        for acc in self._accumulatori.values():
+            acc.add(*valori)
+        self.minutaggi.add(evento.get('posizione'), evento.get('Periodo'), *estrai_mov_portiere(evento))
+        self.falli_squadra.add(evento.get('evento'), evento.get('squadra'), evento.get('Periodo'), evento.get('posizione'))
+        self.n_eventi += 1
+
+    def add_events(self, df: pd.DataFrame) -> None:
+        """Conta, in ordine, gli eventi di un blocco già preprocessato."""
+
+        if df.empty:
+            return
+
+        def _colonna(nome: str) -> list:
+            return df[nome].tolist() if nome in df.columns else [None] * len(df)
+
+        colonne = [_colonna(c) for c in ('evento', 'squadra', 'esito', 'Periodo')]
+        accumulatori = list(self._accumulatori.values())
+        posizioni = _colonna('posizione')
+        for valori, posizione in zip(zip(*colonne), posizioni):
+            for acc in accumulatori:
+                acc.add(*valori)
+            evento, squadra, _, periodo = valori
+            self.falli_squadra.add(evento, squadra, periodo, posizione)
+
+        in_campo = [_colonna(c) for c in COLONNE_IN_CAMPO]
+        for posizione, periodo, *giocatori in zip(posizioni, colonne[3], *in_campo):
+            riga = dict(zip(COLONNE_IN_CAMPO, giocatori))
+            self.minutaggi.add(posizione, periodo, *estrai_mov_portiere(riga))
+        self.n_eventi += len(df)
+
+    def as_report(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Statistiche correnti: sezione -> periodo -> statistica -> conteggio."""
+
+        return {nome: acc.as_dict() for nome, acc in self._accumulatori.items()}
+
+
+def _palle_batch(df: pd.DataFrame) -> Dict[str, int]:
+    palle = calcola_palle_recuperate_perse(df)
+    ripartenze = calcola_ripartenze(df)
+    return {
+        'palle_perse': palle['palla_persa'],
+        'ripartenze': ripartenze['ripartenze'],
+        'palle_recuperate': palle['palla_recuperata'],
+        'ripartenze_loro': ripartenze['ripartenze_loro'],
+    }
+
+
+def verifica_accumulatori(acc: LiveAccumulators, df: pd.DataFrame) -> List[str]:
+    """Confronta gli accumulatori con le funzioni batch sullo stesso DataFrame.
+
+    Serve come controllo di coerenza (es. dopo modifiche alle regole di
+    ``utils_eventi``): ricalcola tutto, quindi non va usata a ogni aggiornamento.
+
+    Returns:
+        Differenze trovate, come ``"sezione/periodo/statistica: accumulato != batch"``
+        (lista vuota se i risultati coincidono).
+    """
+
+    batch_fns = {
+        'attacco': calcola_attacco,
+        'difesa': calcola_difesa,
+        'falli': calcola_falli,
+        'palle': _palle_batch,
+    }
+    split: Dict[str, pd.DataFrame] = {'Totale': df}
+    for nome, periodo in (('1T', 'Primo tempo'), ('2T', 'Secondo tempo')):
+        split[nome] = df[df['Periodo'] == periodo] if 'Periodo' in df.columns else df.iloc[0:0]
+
+    report = acc.as_report()
+    differenze = []
+    for sezione, fn in batch_fns.items():
+        for periodo, df_periodo in split.items():
+            attesi = fn(df_periodo)
+            calcolati = report[sezione][periodo]
+            for chiave in dict.fromkeys([*attesi, *calcolati]):
+                if calcolati.get(chiave) != attesi.get(chiave):
+                    differenze.append(
+                        f"{sezione}/{periodo}/{chiave}: {calcolati.get(chiave)} != {attesi.get(chiave)}"
+                    )
+    return differenze
@@ -0,0 +1,325 @@
+"""Notifiche di inserimento sulla tabella ``live`` (modalità push della pagina Live).
+
+Invece di rileggere la tabella a intervalli, la pagina si iscrive a un
+*change feed* che notifica ogni nuova riga: la pagina viene rieseguita solo
+quando arriva davvero qualcosa.
+
+Sono disponibili due feed con la stessa interfaccia:
+
+- :class:`SupabaseChangeFeed`: Realtime di Supabase (websocket), per la
+  partita vera;
+- :class:`LocalChangeFeed`: emulatore in-process, per sviluppare e provare la
+  modalità push senza il servizio (gli eventi si pubblicano a mano o si
+  riproducono da un CSV).
+
+La modalità si sceglie con la variabile d'ambiente ``FUTSAL_LIVE_FEED``
+(``supabase`` o ``local``; se assente la pagina legge a intervalli come prima).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+
+FEED_SUPABASE = "supabase"
+FEED_LOCAL = "local"
+
+INSERT = "INSERT"
+
+# Ogni quanto (secondi) la pagina controlla se sono arrivate notifiche (nessuna lettura sul DB)
+INTERVALLO_CONTROLLO = 1.0
+# Con Supabase, rilettura incrementale di sicurezza per le notifiche perse (es. riconnessioni)
+INTERVALLO_VERIFICA = 60.0
+
+Callback = Callable[[Dict[str, Any]], None]
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeFeed:
+    """Registro degli iscritti e smistamento delle notifiche di inserimento.
+
+    Le sottoclassi ricevono le righe nuove dalla loro sorgente e chiamano
+    :meth:`_notify`; le callback vengono eseguite nel thread del feed, quindi
+    devono solo registrare la riga (vedi :class:`LiveSubscriber`).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._callbacks: Dict[str, List[Callback]] = defaultdict(list)
+
+    def subscribe(self, table: str, callback: Callback, since_id: Optional[Any] = None) -> Callable[[], None]:
+        """Iscrive ``callback(record)`` agli inserimenti su ``table``.
+
+        Args:
+            table: Nome della tabella.
+            callback: Chiamata con la riga inserita (dizionario colonna -> valore).
+            since_id: Ultimo id già noto all'iscritto; i feed che conservano lo
+                storico (l'emulatore) reinviano le righe successive.
+
+        Returns:
+            Funzione che annulla l'iscrizione.
+        """
+
+        with self._lock:
+            self._callbacks[table].append(callback)
+
+        return self._unsubscriber(table, callback)
+
+    def _unsubscriber(self, table: str, callback: Callback) -> Callable[[], None]:
+        def unsubscribe() -> None:
+            with self._lock:
+                if callback in self._callbacks[table]:
+                    self._callbacks[table].remove(callback)
+
+        return unsubscribe
+
+    def _notify(self, table: str, record: Dict[str, Any]) -> None:
+        with self._lock:
+            callbacks = list(self._callbacks.get(table, ()))
+        for callback in callbacks:
+            try:
+                callback(record)
+            except Exception:
+                logger.exception("Errore in una callback del change feed")
+
+
+class LocalChangeFeed(ChangeFeed):
+    """Emulatore locale del change feed (nessun servizio esterno).
+
+    Le righe pubblicate vengono conservate per tabella, con un ``id`` crescente
+    assegnato se manca, e notificate subito agli iscritti; chi si iscrive dopo
+    riceve lo storico successivo al proprio ``since_id``.
+
+    Esempio:
+        feed = LocalChangeFeed()
+        feed.publish("live", {"evento": "Tiro", "squadra": "Noi", "esito": "Gol"})
+        feed.replay("live", pd.read_csv("partita.csv"), interval=2.0)
+    """
+
+    def __init__(self, id_column: str = "id") -> None:
+        super().__init__()
+        self.id_column = id_column
+        self._rows: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._next_id: Dict[str, int] = defaultdict(lambda: 1)
+        self._replay_stop = threading.Event()
+
+    def publish(self, table: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Inserisce una riga (come un INSERT sulla tabella) e la notifica."""
+
+        with self._lock:
+            record = dict(record)
+            if record.get(self.id_column) is None:
+                record[self.id_column] = self._next_id[table]
+            self._next_id[table] = max(self._next_id[table], int(record[self.id_column]) + 1)
+            self._rows[table].append(record)
+        self._notify(table, record)
+        return record
+
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        """Righe pubblicate finora sulla tabella."""
+
+        with self._lock:
+            return list(self._rows.get(table, ()))
+
+    def subscribe(self, table: str, callback: Callback, since_id: Optional[Any] = None) -> Callable[[], None]:
+        # Storico e iscrizione sotto lo stesso lock: nessuna riga persa (gli eventuali
+        # doppioni vengono scartati dal watermark della sessione)
+        with self._lock:
+            storico = [
+                r for r in self._rows.get(table, ())
+                if since_id is None or r[self.id_column] > since_id
+            ]
+            self._callbacks[table].append(callback)
+            for record in storico:
+                callback(record)
+
+        return self._unsubscriber(table, callback)
+
+    def replay(self, table: str, df: pd.DataFrame, interval: float = 1.0) -> threading.Thread:
+        """Pubblica le righe di ``df`` una alla volta ogni ``interval`` secondi (in un thread).
+
+        Simula una partita registrata dal vivo a partire da un export CSV.
+        """
+
+        records = df.astype(object).where(df.notna(), None).to_dict("records")
+
+        def _run() -> None:
+            for record in records:
+                if self._replay_stop.wait(interval):
+                    return
+                self.publish(table, record)
+
+        thread = threading.Thread(target=_run, name="futsal-live-replay", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        """Interrompe le riproduzioni in corso."""
+
+        self._replay_stop.set()
+
+
+class SupabaseChangeFeed(ChangeFeed):
+    """Inserimenti ricevuti da Supabase Realtime (un websocket per processo).
+
+    La connessione gira in un thread con il proprio event loop e si
+    riconnette da sola; alla riconnessione eventuali inserimenti persi vengono
+    recuperati dalla lettura incrementale della sessione (watermark sull'id).
+    """
+
+    def __init__(self, url: str, key: str, schema: str = "public") -> None:
+        super().__init__()
+        host = url.split("://", 1)[-1].rstrip("/")
+        self.ws_url = f"wss://{host}/realtime/v1/websocket?apikey={key}&vsn=1.0.0"
+        self.schema = schema
+        self._socket = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._channels: Dict[str, Any] = {}
+        self._ready = threading.Event()
+
+    def subscribe(self, table: str, callback: Callback, since_id: Optional[Any] = None) -> Callable[[], None]:
+        unsubscribe = super().subscribe(table, callback, since_id)
+        self._start()
+        self._ready.wait(timeout=10)
+        if self._loop is not None and table not in self._channels:
+            asyncio.run_coroutine_threadsafe(self._join(table), self._loop).result(timeout=10)
+        return unsubscribe
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run, name="futsal-live-feed", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        from realtime.connection import Socket
+
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._socket = Socket(self.ws_url, auto_reconnect=True)
+        try:
+            self._socket.connect()
+        except Exception:
+            logger.exception("Connessione a Supabase Realtime non riuscita")
+            # La prossima iscrizione ritenta; intanto resta la verifica periodica
+            self._loop = None
+            with self._lock:
+                self._thread = None
+            self._ready.set()
+            return
+        self._ready.set()
+        self._socket.listen()
+
+    async def _join(self, table: str) -> None:
+        # Eseguita nel loop del feed: le join sono serializzate
+        if table in self._channels:
+            return
+        channel = self._socket.set_channel(f"realtime:{self.schema}:{table}")
+        channel.on(INSERT, lambda payload, t=table: self._on_insert(t, payload))
+        self._channels[table] = channel
+        await channel._join()
+
+    def _on_insert(self, table: str, payload: Dict[str, Any]) -> None:
+        record = payload.get("record") if isinstance(payload, dict) else None
+        if record:
+            self._notify(table, record)
+
+
+class LiveSubscriber:
+    """Iscrizione di una sessione Streamlit: accumula le righe notificate.
+
+    La callback del feed si limita ad accodare la riga (solo quelle della
+    partita indicata da ``filters``); lo script le preleva con :meth:`drain`
+    al rerun. :meth:`pending` non fa letture sul database, quindi può essere
+    controllato spesso da un fragment.
+    """
+
+    def __init__(
+        self,
+        feed: ChangeFeed,
+        table: str = "live",
+        since_id: Optional[Any] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.filters = dict(filters or {})
+        self._lock = threading.Lock()
+        self._buffer: List[Dict[str, Any]] = []
+        self.received = 0
+        self.last_received: Optional[float] = None
+        self._unsubscribe = feed.subscribe(table, self._on_record, since_id=since_id)
+
+    def _on_record(self, record: Dict[str, Any]) -> None:
+        # Le righe di altre partite non svegliano la sessione
+        if any(record.get(colonna) != valore for colonna, valore in self.filters.items()):
+            return
+        with self._lock:
+            self._buffer.append(record)
+            self.received += 1
+            self.last_received = time.time()
+
+    def pending(self) -> int:
+        """Numero di righe arrivate e non ancora prelevate."""
+
+        with self._lock:
+            return len(self._buffer)
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Preleva le righe arrivate dall'ultima chiamata."""
+
+        with self._lock:
+            righe, self._buffer = self._buffer, []
+        return righe
+
+    def close(self) -> None:
+        self._unsubscribe()
+
+
+_feed: Optional[ChangeFeed] = None
+_feed_lock = threading.Lock()
+
+
+def live_feed_mode() -> Optional[str]:
+    """Modalità push configurata (``FUTSAL_LIVE_FEED``), None per la lettura a intervalli."""
+
+    mode = os.environ.get("FUTSAL_LIVE_FEED", "").strip().lower()
+    return mode if mode in (FEED_SUPABASE, FEED_LOCAL) else None
+
+
+def get_change_feed() -> Optional[ChangeFeed]:
+    """Feed di processo condiviso da tutte le sessioni (None se la modalità push è spenta).
+
+    Con ``FUTSAL_LIVE_FEED=local`` e ``FUTSAL_LIVE_REPLAY=<file.csv>`` l'emulatore
+    riproduce il CSV sulla tabella ``live``, una riga ogni
+    ``FUTSAL_LIVE_REPLAY_INTERVAL`` secondi (default 2).
+    """
+
+    global _feed
+    mode = live_feed_mode()
+    if mode is None:
+        return None
+    with _feed_lock:
+        if _feed is None:
+            if mode == FEED_SUPABASE:
+                from futsal_analysis.config_supabase import SUPABASE_KEY, SUPABASE_URL
+
+                _feed = SupabaseChangeFeed(SUPABASE_URL, SUPABASE_KEY)
+            else:
+                feed = LocalChangeFeed()
+                replay_path = os.environ.get("FUTSAL_LIVE_REPLAY")
+                if replay_path:
+                    interval = float(os.environ.get("FUTSAL_LIVE_REPLAY_INTERVAL", 2))
+                    feed.replay("live", pd.read_csv(replay_path), interval=interval)
+                _feed = feed
+        return _feed
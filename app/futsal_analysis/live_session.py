@@ -0,0 +1,270 @@
+"""Sessioni live: lettura incrementale della tabella ``live`` con watermark sull'id.
+
+Ogni partita seguita ha la propria :class:`LiveSession`, filtrata sulla colonna
+``LIVE_KEY_COLUMN`` (la categoria): più partite contemporanee non si mescolano
+e l'aggiornamento di una non legge le righe delle altre.
+
+La colonna va aggiunta alla tabella ``live`` (vedi ISTRUZIONI_CATEGORIA.md);
+il default fa sì che gli eventi scritti senza categoria restino della prima
+squadra::
+
+    ALTER TABLE live ADD COLUMN categoria TEXT DEFAULT 'Prima Squadra';
+    UPDATE live SET categoria = 'Prima Squadra' WHERE categoria IS NULL;
+    CREATE INDEX IF NOT EXISTS live_categoria_id_idx ON live (categoria, id);
+
+Finché la colonna non esiste (:func:`live_key_column` restituisce None) si
+segue una sola partita leggendo tutta la tabella, come prima delle categorie.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from futsal_analysis.live_accumulators import LiveAccumulators, verifica_accumulatori
+
+
+PERIODO_PRIMO = 'Primo tempo'
+PERIODO_SECONDO = 'Secondo tempo'
+
+# Colonna della tabella live che identifica la partita (una partita live per categoria)
+LIVE_KEY_COLUMN = 'categoria'
+
+# Codice PostgreSQL di "colonna inesistente" (restituito da PostgREST)
+_COLONNA_INESISTENTE = '42703'
+
+
+def live_key_column(client, table: str = "live", column: str = LIVE_KEY_COLUMN) -> Optional[str]:
+    """``column`` se esiste nella tabella live, None se la migrazione non è ancora stata fatta.
+
+    Legge una sola riga della sola colonna. Gli altri errori (es. rete) non
+    vengono interpretati come colonna mancante: la colonna viene restituita e
+    l'errore si ripresenterà (e verrà mostrato) al primo aggiornamento.
+    """
+
+    try:
+        client.table(table).select(column).limit(1).execute()
+    except Exception as e:
+        codice = getattr(e, "code", None)
+        messaggio = str(e)
+        if codice == _COLONNA_INESISTENTE or (column in messaggio and "does not exist" in messaggio):
+            return None
+    return column
+
+
+def _mask_fine_primo_tempo(df: pd.DataFrame) -> pd.Series:
+    if 'evento' not in df.columns:
+        return pd.Series(False, index=df.index)
+    return df['evento'].str.contains('fine primo tempo', case=False, na=False)
+
+
+def preprocess_live_data(df: pd.DataFrame, secondo_tempo: bool = False) -> pd.DataFrame:
+    """
+    Prepara gli eventi live nel formato atteso da calcola_report_completo.
+    Assegna il Periodo in base all'evento 'fine primo tempo'; le colonne dei
+    giocatori in campo (quartetto, portiere) restano per i minutaggi live.
+
+    Args:
+        df: Eventi live (tutti, oppure solo quelli nuovi di un aggiornamento).
+        secondo_tempo: True se la 'fine primo tempo' è già stata vista in un
+            blocco precedente: tutti gli eventi sono allora del secondo tempo.
+    """
+    if df.empty:
+        return df
+
+    df_processed = df.copy()
+
+    if secondo_tempo:
+        df_processed['Periodo'] = PERIODO_SECONDO
+        return df_processed
+
+    # Tutti gli eventi prima di 'fine primo tempo' (inclusa) sono del primo tempo,
+    # quelli successivi del secondo
+    df_processed['Periodo'] = PERIODO_PRIMO
+    fine_primo_mask = _mask_fine_primo_tempo(df_processed).to_numpy()
+    if fine_primo_mask.any():
+        posizione_fine = int(fine_primo_mask.argmax())
+        df_processed.iloc[posizione_fine + 1:, df_processed.columns.get_loc('Periodo')] = PERIODO_SECONDO
+
+    return df_processed
+
+
+@dataclass
+class LiveSession:
+    """Eventi live accumulati nella sessione e aggiornati solo con le righe nuove.
+
+    Ogni :meth:`poll` chiede a Supabase solo gli eventi con ``id`` maggiore
+    dell'ultimo già letto (watermark) e li accoda al DataFrame della sessione,
+    già preprocessati: il costo di un aggiornamento dipende dagli eventi nuovi,
+    non dalla durata della partita.
+
+    I blocchi letti restano separati e vengono uniti solo quando si accede a
+    :attr:`df` (una volta per versione), così accodare non ricopia gli eventi
+    già presenti. Le statistiche di squadra sono tenute in :attr:`stats` e
+    aggiornate evento per evento, senza ricalcolarle sull'intera partita.
+
+    Attributes:
+        last_id: Watermark: id dell'ultimo evento letto.
+        version: Incrementato a ogni aggiornamento che porta eventi nuovi
+            (utile come impronta per i report calcolati sugli eventi).
+        secondo_tempo: True dopo aver visto l'evento 'fine primo tempo'.
+        last_poll: Istante (``time.time()``) dell'ultima lettura.
+        stats: Accumulatori incrementali (attacco, difesa, falli, palle, minutaggi).
+        filters: Filtri di uguaglianza (colonna -> valore) che selezionano la
+            partita nella tabella live; vuoto = tutta la tabella.
+    """
+
+    table: str = "live"
+    id_column: str = "id"
+    min_interval: float = 5.0
+    filters: Dict[str, Any] = field(default_factory=dict)
+    last_id: Optional[Any] = None
+    version: int = 0
+    secondo_tempo: bool = False
+    last_poll: Optional[float] = None
+    last_new_rows: int = 0
+    stats: LiveAccumulators = field(default_factory=LiveAccumulators, repr=False)
+    _chunks: List[pd.DataFrame] = field(default_factory=list, repr=False)
+    _df: Optional[pd.DataFrame] = field(default=None, repr=False)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """Eventi preprocessati (con ``Periodo``), in ordine di id."""
+
+        if self._df is None:
+            if not self._chunks:
+                self._df = pd.DataFrame()
+            elif len(self._chunks) == 1:
+                self._df = self._chunks[0]
+            else:
+                self._df = pd.concat(self._chunks, ignore_index=True)
+                # Un solo blocco da qui in avanti: la prossima unione parte da questo
+                self._chunks = [self._df]
+        return self._df
+
+    def __len__(self) -> int:
+        return sum(len(chunk) for chunk in self._chunks)
+
+    def reset(self) -> None:
+        """Dimentica gli eventi letti: il prossimo poll rilegge tutta la tabella."""
+
+        self._chunks = []
+        self._df = None
+        self.last_id = None
+        self.secondo_tempo = False
+        self.last_poll = None
+        self.last_new_rows = 0
+        self.stats = LiveAccumulators()
+        self.version += 1
+
+    def verifica(self) -> List[str]:
+        """Differenze tra gli accumulatori e il ricalcolo batch (vedi ``verifica_accumulatori``)."""
+
+        return verifica_accumulatori(self.stats, self.df)
+
+    def poll(self, client, force: bool = False) -> int:
+        """Legge gli eventi nuovi e li accoda. Restituisce quanti ne sono arrivati.
+
+        Args:
+            client: Client Supabase.
+            force: Ignora ``min_interval`` (es. pulsante di aggiornamento).
+        """
+
+        now = time.time()
+        if not force and self.last_poll is not None and now - self.last_poll < self.min_interval:
+            return 0
+        self.last_poll = now
+
+        query = client.table(self.table).select("*")
+        for colonna, valore in self.filters.items():
+            query = query.eq(colonna, valore)
+        if self.last_id is not None:
+            query = query.gt(self.id_column, self.last_id)
+        rows = query.order(self.id_column).execute().data or []
+        self.last_new_rows = self._append(rows)
+        return self.last_new_rows
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        """True se la riga appartiene alla partita della sessione."""
+
+        return all(row.get(colonna) == valore for colonna, valore in self.filters.items())
+
+    def ingest(self, rows: List[dict]) -> int:
+        """Accoda righe ricevute da un change feed (modalità push), senza leggere la tabella.
+
+        Le righe di altre partite e quelle con id già coperto dal watermark (es. notifiche duplicate o
+        già lette da un :meth:`poll`) vengono ignorate.
+        """
+
+        nuove = {}
+        for row in rows:
+            if not self.matches(row):
+                continue
+            row_id = row.get(self.id_column)
+            if row_id is None or (self.last_id is not None and row_id <= self.last_id):
+                continue
+            nuove[row_id] = row
+        self.last_new_rows = self._append(list(nuove.values()))
+        return self.last_new_rows
+
+    def _append(self, rows: List[dict]) -> int:
+        if not rows:
+            return 0
+        nuovi = pd.DataFrame(rows)
+        nuovi = nuovi.sort_values(self.id_column, kind="stable").reset_index(drop=True)
+        nuovi = preprocess_live_data(nuovi, secondo_tempo=self.secondo_tempo)
+        if not self.secondo_tempo and _mask_fine_primo_tempo(nuovi).any():
+            self.secondo_tempo = True
+
+        self.stats.add_events(nuovi)
+        self._chunks.append(nuovi)
+        self._df = None
+        self.last_id = nuovi[self.id_column].iloc[-1]
+        self.version += 1
+        return len(nuovi)
+
+
+class LiveSessions:
+    """Sessioni live di una sessione Streamlit, una per partita seguita.
+
+    Esempio:
+        sessioni = LiveSessions()
+        sessioni.get("U17").poll(client)   # solo le righe live con categoria = U17
+        sessioni.keep(["U17", "U19"])      # smette di seguire le altre
+
+    Con ``key_column=None`` (tabella senza colonna della partita) le sessioni
+    non filtrano: tutte leggono l'intera tabella, quindi va seguita una sola partita.
+    """
+
+    def __init__(self, key_column: Optional[str] = LIVE_KEY_COLUMN, **session_kwargs: Any) -> None:
+        self.key_column = key_column
+        self.session_kwargs = session_kwargs
+        self._sessions: Dict[Any, LiveSession] = {}
+
+    def get(self, key: Any) -> LiveSession:
+        """Sessione della partita ``key`` (creata al primo accesso)."""
+
+        if key not in self._sessions:
+            filters = {self.key_column: key} if self.key_column is not None else {}
+            self._sessions[key] = LiveSession(filters=filters, **self.session_kwargs)
+        return self._sessions[key]
+
+    def keep(self, keys: List[Any]) -> List[Any]:
+        """Elimina le sessioni non più seguite e ne restituisce le chiavi."""
+
+        rimosse = [key for key in self._sessions if key not in keys]
+        for key in rimosse:
+            del self._sessions[key]
+        return rimosse
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._sessions
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(list(self._sessions))
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,143 @@
+"""Eliminazione di una partita: eventi a lotti e pulizia delle cache collegate.
+
+Gli eventi vengono cancellati ``batch_size`` alla volta (id letti e poi
+eliminati con ``in``), così nessuna richiesta a Supabase lavora su tutta la
+partita e un errore a metà lascia la cancellazione ripetibile: gli eventi
+rimasti si eliminano rilanciando l'operazione. Alla fine vengono scartate le
+voci della partita da tutti i livelli di cache registrati in
+:mod:`futsal_analysis.cache_registry` (letture delle pagine, report, lavori,
+immagini renderizzate; con la partita anche quelle della sua categoria) e l'esito dice cosa è stato rimosso. Anche il
+riepilogo salvato della partita (:mod:`futsal_analysis.match_summary`) viene
+aggiornato o tolto.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from futsal_analysis.cache_registry import invalida_categoria, invalida_partita
+from futsal_analysis.ingestion import DEFAULT_BACKOFF, DEFAULT_BATCH_SIZE, DEFAULT_MAX_RETRIES, _with_retry
+from futsal_analysis.match_summary import aggiorna_riepilogo, elimina_riepilogo
+
+
+PARTITA_ELIMINATA = "eliminata"
+PARTITA_MANTENUTA = "mantenuta"
+
+
+@dataclass
+class EsitoEliminazione:
+    """Esito dell'eliminazione di una partita.
+
+    Attributes:
+        partita_id: Partita trattata.
+        eventi: Eventi eliminati.
+        lotti: Richieste di cancellazione eseguite.
+        partita: ``"eliminata"`` se è stata tolta anche la riga in ``partite``,
+            ``"mantenuta"`` altrimenti.
+        cache: Voci scartate per livello di cache (-1 se il livello è fallito).
+        errori: Messaggi degli errori, vuoto se tutto è riuscito.
+        seconds: Durata complessiva.
+    """
+
+    partita_id: str
+    eventi: int = 0
+    lotti: int = 0
+    partita: str = PARTITA_MANTENUTA
+    cache: Dict[str, int] = field(default_factory=dict)
+    errori: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errori
+
+
+def conta_eventi(client, partita_id: str) -> int:
+    """Numero di eventi salvati per la partita."""
+
+    res = client.table("eventi").select("id", count="exact").eq("partita_id", partita_id).limit(1).execute()
+    return res.count or 0
+
+
+def elimina_partita(
+    client,
+    partita_id: str,
+    anche_partita: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+    progress: Optional[Callable[[EsitoEliminazione], None]] = None,
+) -> EsitoEliminazione:
+    """Elimina gli eventi di una partita a lotti e ne scarta le cache.
+
+    Args:
+        client: Client Supabase.
+        partita_id: Partita da eliminare.
+        anche_partita: Se True toglie anche la riga della partita (solo se
+            tutti gli eventi sono stati eliminati); altrimenti la partita resta
+            nel sistema senza eventi e si può ricaricare il CSV.
+        batch_size: Eventi cancellati per richiesta.
+        max_retries: Nuovi tentativi per lotto prima di fermarsi.
+        backoff: Attesa iniziale tra i tentativi (raddoppia a ogni tentativo).
+        progress: Chiamata dopo ogni lotto con l'esito parziale.
+
+    Returns:
+        Esito con eventi eliminati, stato della partita e voci di cache scartate.
+    """
+
+    inizio = time.perf_counter()
+    esito = EsitoEliminazione(partita_id=str(partita_id))
+    tabella = client.table
+
+    try:
+        while True:
+            ids = [
+                r["id"]
+                for r in _with_retry(
+                    lambda: tabella("eventi").select("id").eq("partita_id", partita_id).order("id").limit(batch_size).execute(),
+                    max_retries, backoff,
+                ).data
+            ]
+            if not ids:
+                break
+            eliminati = _with_retry(
+                lambda: tabella("eventi").delete().in_("id", ids).execute(),
+                max_retries, backoff,
+            ).data
+            if not eliminati:
+                # Nessuna riga tolta (es. permessi): rileggere darebbe sempre lo stesso lotto
+                esito.errori.append(f"Eventi non eliminati (lotto da {len(ids)} eventi)")
+                break
+            esito.eventi += len(eliminati)
+            esito.lotti += 1
+            if progress is not None:
+                progress(esito)
+    except Exception as e:
+        esito.errori.append(f"Eliminazione eventi interrotta dopo {esito.eventi} eventi: {e}")
+
+    categoria = None
+    if anche_partita and esito.ok:
+        try:
+            rimosse = _with_retry(lambda: tabella("partite").delete().eq("id", partita_id).execute(), max_retries, backoff).data
+            categoria = next((r.get("categoria") for r in rimosse or [] if r.get("categoria")), None)
+            esito.partita = PARTITA_ELIMINATA
+        except Exception as e:
+            esito.errori.append(f"Partita non eliminata: {e}")
+
+    # Il riepilogo segue gli eventi rimasti (o sparisce con la partita)
+    if esito.partita == PARTITA_ELIMINATA:
+        riepilogo_ok = elimina_riepilogo(client, partita_id)
+    else:
+        riepilogo_ok = aggiorna_riepilogo(client, partita_id) is not None
+    if not riepilogo_ok:
+        esito.errori.append("Riepilogo della partita non aggiornato")
+
+    # Anche un'eliminazione parziale cambia i dati: le cache vanno scartate comunque
+    esito.cache = invalida_partita(esito.partita_id)
+    if categoria is not None:
+        # Senza la partita cambiano l'elenco delle partite e l'indice della sua categoria
+        esito.cache.update(invalida_categoria(categoria))
+    esito.seconds = time.perf_counter() - inizio
+    return esito
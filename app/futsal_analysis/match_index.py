@@ -0,0 +1,112 @@
+"""Indice di categorie e competizioni delle partite, condiviso da tutte le pagine.
+
+Le pagine usano le categorie (e le competizioni di ogni categoria) solo per
+riempire i menu: invece di rileggere la colonna da tutta la tabella
+``partite`` a ogni rerun, l'indice viene letto una volta per processo e
+tenuto in memoria finché l'Admin non crea, modifica o elimina una partita
+(:func:`invalida_indice`, chiamata anche da ``invalida_categoria`` di
+:mod:`futsal_analysis.cache_registry`).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from futsal_analysis.cache_registry import CATEGORIA, registra_invalidatore
+
+
+CATEGORIA_DEFAULT = "Prima Squadra"
+
+# Rilettura di sicurezza per le modifiche fatte fuori dall'Admin (es. direttamente sul DB)
+DEFAULT_TTL = 3600.0
+
+
+@dataclass(frozen=True)
+class IndicePartite:
+    """Categorie e competizioni presenti nella tabella ``partite``.
+
+    Attributes:
+        categorie: Categorie in ordine alfabetico (almeno ``CATEGORIA_DEFAULT``).
+        competizioni: Competizioni di ogni categoria, in ordine alfabetico.
+        partite: Numero di partite per categoria.
+    """
+
+    categorie: Tuple[str, ...] = (CATEGORIA_DEFAULT,)
+    competizioni: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    partite: Dict[str, int] = field(default_factory=dict)
+
+    def competizioni_di(self, categoria: str) -> Tuple[str, ...]:
+        return self.competizioni.get(categoria, ())
+
+    def categoria_default(self, preferita: Optional[str] = None) -> str:
+        """``preferita`` se esiste nell'indice, altrimenti la prima categoria."""
+
+        return preferita if preferita in self.categorie else self.categorie[0]
+
+
+def leggi_indice(client) -> IndicePartite:
+    """Legge dalla tabella ``partite`` solo categoria e competizione di ogni partita."""
+
+    competizioni: Dict[str, set] = {}
+    partite: Dict[str, int] = {}
+    for riga in client.table("partite").select("categoria,competizione").execute().data or []:
+        categoria = riga.get("categoria")
+        if not categoria:
+            continue
+        partite[categoria] = partite.get(categoria, 0) + 1
+        gruppo = competizioni.setdefault(categoria, set())
+        if riga.get("competizione"):
+            gruppo.add(riga["competizione"])
+    return IndicePartite(
+        categorie=tuple(sorted(competizioni)) or (CATEGORIA_DEFAULT,),
+        competizioni={categoria: tuple(sorted(valori)) for categoria, valori in competizioni.items()},
+        partite=partite,
+    )
+
+
+class CacheIndice:
+    """Indice letto al primo utilizzo e tenuto finché non viene invalidato (o scade ``ttl``)."""
+
+    def __init__(self, ttl: Optional[float] = DEFAULT_TTL) -> None:
+        self.ttl = ttl
+        self._indice: Optional[IndicePartite] = None
+        self._letto_il = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, client) -> IndicePartite:
+        with self._lock:
+            scaduto = self.ttl is not None and time.monotonic() - self._letto_il > self.ttl
+            if self._indice is None or scaduto:
+                self._indice = leggi_indice(client)
+                self._letto_il = time.monotonic()
+            return self._indice
+
+    def invalida(self) -> int:
+        """Scarta l'indice; restituisce 1 se c'era un indice da scartare."""
+
+        with self._lock:
+            presente = self._indice is not None
+            self._indice = None
+            return int(presente)
+
+
+_cache_indice = CacheIndice()
+
+
+def get_indice_partite(client) -> IndicePartite:
+    """Indice di processo condiviso da tutte le sessioni e da tutte le pagine."""
+
+    return _cache_indice.get(client)
+
+
+def invalida_indice() -> int:
+    """Da chiamare dopo aver creato, modificato o eliminato partite."""
+
+    return _cache_indice.invalida()
+
+
+# Creare o eliminare una partita può aggiungere o togliere una categoria o una competizione
+registra_invalidatore("indice", lambda categoria: invalida_indice(), ambito=CATEGORIA)
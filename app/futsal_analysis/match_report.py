@@ -0,0 +1,630 @@
+"""Report di una singola partita: tabelle e grafici del PDF, senza dipendenze da Streamlit.
+
+Le funzioni di questo modulo sono usate sia dalla pagina ``1_partite.py`` sia
+dall'export massivo (``batch_export``), così il PDF di una partita è lo stesso
+indipendentemente da dove viene generato.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Tuple, Union
+
+import pandas as pd
+from matplotlib import cm
+
+from futsal_analysis.image_cache import ambito_partite, player_zone_image, team_zone_image
+from futsal_analysis.lazy_reports import LazyReports
+from futsal_analysis.utils_eventi import (
+    calcola_report_completo,
+    calcola_report_quartetti_completo,
+    calcola_report_quinto_uomo_completo,
+)
+from futsal_analysis.utils_minutaggi import calcola_minutaggi
+from futsal_analysis.utils_pdf import ImageEncoding, PdfImageSection, PdfTableSection, generate_pdf_report
+from futsal_analysis.utils_time import calcola_durate, filtra_per_tempo
+from futsal_analysis.zone_analysis import calcola_report_zona
+
+
+# Categorie senza dati dei singoli giocatori: solo stats di squadra e zone di squadra
+CATEGORIE_SOLO_SQUADRA = ('u15', 'u17')
+
+QUARTETTI_COLUMNS_TO_DROP = [
+    'angoli',
+    'laterali',
+    'angoli_subiti',
+    'laterali_subiti',
+    'ammonizioni',
+    'espulsioni',
+]
+
+# Formato: (chiave_statistica, 'Nome Visualizzato', è_calcolata)
+# Se è_calcolata=True, la statistica viene calcolata invece di essere letta direttamente
+TOP5_STATS = [
+    ('gol_fatti', 'Gol', False),
+    ('tiri_totali', 'Tiri', False),
+    ('tiri_in_porta_totali', 'Tiri in Porta', False),
+    ('precisione_tiri', 'Precisione Tiri (%)', True),  # Calcolata: tiri_in_porta / tiri_totali * 100
+    ('tiri_fuori', 'Tiri Fuori', False),
+    ('tiri_ribattuti', 'Tiri Ribattuti', False),
+    ('palo_traversa', 'Palo/Traversa', False),
+    ('palle_perse', 'Palle Perse', False),
+    ('palle_recuperate', 'Palle Recuperate', False),
+    ('tiri_ribattuti_noi', 'Tiri Ribattuti da Noi', False),
+    ('falli_fatti', 'Falli Fatti', False),
+    ('falli_subiti', 'Falli Subiti', False),
+    # ('ammonizioni', 'Ammonizioni', False),
+    # ('espulsioni', 'Espulsioni', False),
+]
+
+# Categorie di minutaggio mostrate, con titoli parlanti
+MINUTAGGI_CATEGORIE_VISTE = [
+    ("mov4_portieri", "Portieri"),
+    ("mov4_singoli", "Singoli"),
+    # ("mov4_coppie", "Coppie di movimento"),  # COMMENTATO - mantenere solo singoli e quartetti
+    ("mov4_quartetto", "Quartetti"),
+    ("mov5_senza_portiere", "Quinto uomo (5 giocatori di movimento)")
+]
+
+MINUTAGGI_LABEL_TO_TITLE = {
+    "totale": "Totale",
+    "primo_tempo": "Primo tempo",
+    "secondo_tempo": "Secondo tempo",
+}
+
+TEAM_ATT_METRICS = ['gol_fatti', 'tiri_totali', 'tiri_in_porta_totali', 'tiri_ribattuti', 'tiri_fuori', 'palo_traversa', 'laterali', 'palle_perse']
+TEAM_DIF_METRICS = ['gol_subiti', 'tiri_totali_subiti', 'tiri_in_porta_totali_subiti', 'tiri_ribattuti_da_noi', 'tiri_fuori_loro', 'palo_traversa_loro', 'laterale_loro', 'palle_recuperate']
+PLAYER_ATT_METRICS = ['gol_fatti', 'tiri_totali', 'tiri_in_porta_totali', 'tiri_ribattuti', 'tiri_fuori', 'palo_traversa', 'palle_perse']
+PLAYER_DIF_METRICS = ['tiri_ribattuti_noi', 'palle_recuperate', 'falli_subiti']
+
+
+# ---------------------------------------------------------------------------
+# Formattazione tabelle
+# ---------------------------------------------------------------------------
+
+def format_column_names(df):
+    """Formatta i nomi delle colonne rimuovendo underscore e capitalizzando"""
+    new_columns = {}
+    for col in df.columns:
+        # Rimuovi underscore e capitalizza ogni parola
+        if isinstance(col, str):
+            formatted = col.replace('_', ' ').title().replace(' Per Partita', ' x P')
+        else:
+            formatted = str(col)
+        new_columns[col] = formatted
+    return df.rename(columns=new_columns)
+
+
+def format_index_names(df):
+    """Formatta i nomi delle righe rimuovendo underscore e capitalizzando"""
+    new_index = {}
+    for idx in df.index:
+        if isinstance(idx, tuple):
+            # Mantieni tuple per sfruttare la visualizzazione "chip" di Streamlit
+            formatted = tuple(part.replace('_', ' ').title().replace(' Per Partita', ' x P') for part in idx)
+            new_index[idx] = formatted
+        elif isinstance(idx, str):
+            if ';' in idx:
+                parts = [p.strip().replace('_', ' ').title().replace(' Per Partita', ' x P') for p in idx.split(';')]
+                formatted = tuple(parts)
+                new_index[idx] = formatted
+            else:
+                formatted = idx.replace('_', ' ').title().replace(' Per Partita', ' x P')
+                new_index[idx] = formatted
+        else:
+            new_index[idx] = str(idx)
+    return df.rename(index=new_index)
+
+
+def stats_table(data_dict) -> pd.DataFrame:
+    """Tabella di una sezione di stats ({periodo: {metrica: valore}}) con nomi formattati."""
+    try:
+        df_sec = pd.DataFrame(data_dict).fillna(0).astype(int)
+    except Exception:
+        df_sec = pd.DataFrame(data_dict).fillna(0)
+
+    # Formatta nomi colonne e righe
+    df_sec = format_column_names(df_sec)
+    df_sec = format_index_names(df_sec)
+    return df_sec
+
+
+def remove_portiere_integrazione_stats(data_dict):
+    """Rimuove integrazione_portiere (totale/ok/ko) da un dict stats per periodo."""
+    if not isinstance(data_dict, dict):
+        return data_dict
+    cleaned = {}
+    for periodo, values in data_dict.items():
+        if isinstance(values, dict):
+            cleaned[periodo] = {
+                k: v for k, v in values.items()
+                if not str(k).startswith('integrazione_portiere')
+            }
+        else:
+            cleaned[periodo] = values
+    return cleaned
+
+
+def reorder_columns_gol(df):
+    """Riordina le colonne per mettere gol_subiti subito dopo gol_fatti"""
+    if df.empty:
+        return df
+    cols = list(df.columns)
+    if 'gol_fatti' in cols and 'gol_subiti' in cols:
+        # Trova l'indice di gol_fatti
+        idx_gol_fatti = cols.index('gol_fatti')
+        # Rimuovi gol_subiti dalla sua posizione attuale
+        cols.remove('gol_subiti')
+        # Inserisci gol_subiti subito dopo gol_fatti
+        cols.insert(idx_gol_fatti + 1, 'gol_subiti')
+        return df[cols]
+    return df
+
+
+def prepare_portieri_table(df_portieri):
+    """Prepara la tabella portieri: aggiunge ordine colonne e rimuove integrazione."""
+    if df_portieri.empty:
+        return df_portieri
+    cols_da_rimuovere = [c for c in df_portieri.columns if c.startswith('integrazione_portiere')]
+    df_portieri = df_portieri.drop(columns=cols_da_rimuovere, errors='ignore')
+    ordered_cols = ['gol_subiti', 'parate', 'percentuale_parate']
+    first_cols = [c for c in ordered_cols if c in df_portieri.columns]
+    other_cols = [c for c in df_portieri.columns if c not in first_cols]
+    return df_portieri[first_cols + other_cols]
+
+
+def clean_quartetti_columns(df_input: pd.DataFrame) -> pd.DataFrame:
+    if df_input.empty:
+        return df_input
+    cols_to_drop = [col for col in QUARTETTI_COLUMNS_TO_DROP if col in df_input.columns]
+    if cols_to_drop:
+        df_input = df_input.drop(columns=cols_to_drop)
+    return df_input
+
+
+def individuali_table(stats: dict) -> pd.DataFrame:
+    """Tabella stats individuali giocatori ({giocatore: {metrica: valore}})."""
+    df_ind = pd.DataFrame(stats).T
+    df_ind = reorder_columns_gol(df_ind)
+    df_ind = format_column_names(df_ind)
+    return format_index_names(df_ind)
+
+
+def portieri_table(stats: dict) -> pd.DataFrame:
+    """Tabella stats individuali portieri ({portiere: {metrica: valore}})."""
+    df_port = pd.DataFrame(stats).T
+    df_port = prepare_portieri_table(df_port)
+    df_port = format_column_names(df_port)
+    return format_index_names(df_port)
+
+
+def quartetti_table(stats: dict, split_index: bool = True) -> pd.DataFrame:
+    """Tabella stats quartetti/quinto uomo; gli indici "a;b;c;d" diventano tuple."""
+    df_q = pd.DataFrame(stats).T
+    if split_index:
+        # Converti gli indici da stringhe con punti e virgola a tuple
+        df_q.index = [tuple(idx.split(';')) if ';' in str(idx) else idx for idx in df_q.index]
+    df_q = clean_quartetti_columns(df_q)
+    df_q = format_column_names(df_q)
+    return format_index_names(df_q)
+
+
+# ---------------------------------------------------------------------------
+# Tabelle calcolate dagli eventi
+# ---------------------------------------------------------------------------
+
+def risultato_table(df: pd.DataFrame, avversario: str) -> Tuple[int, int, pd.DataFrame]:
+    """Gol fatti, gol subiti e tabella del risultato."""
+    gol_fatti = len(df[(df['evento'] == 'Gol') & (df['squadra'] == 'Noi')])
+    gol_subiti = len(df[(df['evento'] == 'Gol') & (df['squadra'] == 'Loro')])
+    score_pdf_table = pd.DataFrame({
+        "FMP": [gol_fatti],
+        avversario.title(): [gol_subiti],
+    }, index=["Gol"])
+    return gol_fatti, gol_subiti, score_pdf_table
+
+
+def gol_timeline(df: pd.DataFrame) -> pd.DataFrame:
+    """Gol e autogol in ordine cronologico, con colonne Minuto, Squadra e Marcatore."""
+    gol_df = df[(df['evento'] == 'Gol') | (df['evento'] == 'Autogol')].copy()
+    if gol_df.empty:
+        return gol_df
+    gol_df['Minuto'] = gol_df['tempoEffettivo']  # Usa tempoEffettivo invece di tempoReale
+    gol_df['Marcatore'] = gol_df['chi'].fillna('').str.title()
+    gol_df['Squadra'] = gol_df['squadra']
+    # Ordina per minuto crescente (MM:SS) usando timedelta per evitare ordinamenti lessicografici
+    try:
+        gol_df['_minuto_td'] = pd.to_timedelta(gol_df['Minuto'].astype(str))
+        gol_df = gol_df.sort_values('_minuto_td').drop(columns=['_minuto_td']).reset_index(drop=True)
+    except Exception:
+        gol_df = gol_df.sort_values('Minuto').reset_index(drop=True)
+    return gol_df
+
+
+def calcola_palle_stats(df: pd.DataFrame, periodi) -> Dict[str, Dict[str, int]]:
+    """Palle perse/recuperate e ripartenze per periodo ('Totale', '1T', '2T')."""
+    palle_stats = {}
+    for periodo in periodi:
+        # Calcola le statistiche per questo periodo
+        if periodo == 'Totale':
+            df_periodo = df
+        elif periodo == '1T':
+            df_periodo = df[df['Periodo'] == 'Primo tempo']
+        elif periodo == '2T':
+            df_periodo = df[df['Periodo'] == 'Secondo tempo']
+        else:
+            df_periodo = df
+
+        # Calcola palle perse e ripartenze per la nostra squadra
+        palle_perse = len(df_periodo[(df_periodo['evento'].str.contains('Palla persa', na=False))])
+        ripartenze = len(df_periodo[(df_periodo['evento'].str.contains('Ripartenza', na=False)) & (df_periodo['squadra'] == 'Noi')])
+        palle_recuperate = len(df_periodo[(df_periodo['evento'].str.contains('Palla recuperata', na=False))])
+        ripartenze_loro = len(df_periodo[(df_periodo['evento'].str.contains('Ripartenza', na=False)) & (df_periodo['squadra'] == 'Loro')])
+
+        palle_stats[periodo] = {
+            'palle_perse': palle_perse,
+            'ripartenze': ripartenze,
+            'palle_recuperate': palle_recuperate,
+            'ripartenze_loro': ripartenze_loro
+        }
+    return palle_stats
+
+
+def calcola_top5_tables(stats_individuali: dict) -> List[Tuple[str, pd.DataFrame]]:
+    """Una tabella Top 5 (Posizione, Giocatore, valore) per ogni statistica di ``TOP5_STATS``."""
+    tabelle = []
+    for stat_key, stat_label, is_calculated in TOP5_STATS:
+        # Raccogli i valori per tutti i giocatori per questa statistica
+        giocatori_stats = []
+        for giocatore, stats in stats_individuali.items():
+            if is_calculated:
+                # Calcola la precisione di tiri
+                if stat_key == 'precisione_tiri':
+                    tiri_totali = stats.get('tiri_totali', 0)
+                    tiri_in_porta = stats.get('tiri_in_porta_totali', 0)
+                    if tiri_totali > 0:
+                        precisione = round((tiri_in_porta / tiri_totali) * 100, 1)
+                        giocatori_stats.append({
+                            'Giocatore': giocatore.title(),
+                            stat_label: precisione
+                        })
+            else:
+                # Statistica diretta
+                if stat_key in stats:
+                    valore = stats[stat_key]
+                    if pd.notna(valore) and valore > 0:  # Solo giocatori con valore > 0
+                        giocatori_stats.append({
+                            'Giocatore': giocatore.title(),
+                            stat_label: int(valore)
+                        })
+
+        # Se ci sono dati, crea la tabella Top 5
+        if giocatori_stats:
+            df_top5 = pd.DataFrame(giocatori_stats)
+            # Ordina per valore decrescente e prendi i top 5
+            df_top5 = df_top5.sort_values(by=stat_label, ascending=False).head(5).reset_index(drop=True)
+            # Aggiungi colonna Posizione
+            df_top5.insert(0, 'Posizione', range(1, len(df_top5) + 1))
+            tabelle.append((stat_label, df_top5))
+    return tabelle
+
+
+def zone_metrics(report_zona: dict, categoria: str) -> dict:
+    """Metriche zonali disponibili per squadra e giocatori (tutte quelle presenti nel report)."""
+    context = {"team_att_metrics": [], "team_dif_metrics": [], "players": [], "player_metrics": {}}
+
+    zone_attacco = report_zona['squadra']['attacco']
+    if zone_attacco:
+        first_zone = next(iter(zone_attacco.values()))
+        context["team_att_metrics"] = [m for m in TEAM_ATT_METRICS if m in first_zone]
+    zone_difesa = report_zona['squadra']['difesa']
+    if zone_difesa:
+        first_zone = next(iter(zone_difesa.values()))
+        context["team_dif_metrics"] = [m for m in TEAM_DIF_METRICS if m in first_zone]
+
+    # Per u15/u17 non c'è l'analisi zonale individuale (non abbiamo dati dei singoli giocatori)
+    if categoria.lower() in CATEGORIE_SOLO_SQUADRA:
+        return context
+
+    giocatori = sorted({
+        g for zona in report_zona['individuali'].values()
+        for g in zona.keys() if g.strip()
+    })
+    context["players"] = giocatori
+
+    player_metrics_map = {}
+    for giocatore in giocatori:
+        sample_stats = None
+        for zona in report_zona['individuali'].values():
+            if giocatore in zona:
+                sample_stats = zona[giocatore]
+                break
+        if sample_stats:
+            att_metrics = [m for m in PLAYER_ATT_METRICS if m in sample_stats]
+            dif_metrics = [m for m in PLAYER_DIF_METRICS if m in sample_stats]
+        else:
+            att_metrics = []
+            dif_metrics = []
+        player_metrics_map[giocatore] = {"attacco": att_metrics, "difesa": dif_metrics}
+    context["player_metrics"] = player_metrics_map
+    return context
+
+
+# ---------------------------------------------------------------------------
+# Report completo
+# ---------------------------------------------------------------------------
+
+def match_report_builders(df: pd.DataFrame) -> Dict[str, Callable[[], object]]:
+    """Funzioni di calcolo dei report di una partita, da usare con ``LazyReports``."""
+    return {
+        "eventi": lambda: calcola_report_completo(df),
+        "quartetti": lambda: calcola_report_quartetti_completo(df),
+        "quinto_uomo": lambda: calcola_report_quinto_uomo_completo(df),
+        "zona": lambda: calcola_report_zona(df),
+        "durate": lambda: calcola_durate(df),
+        "minutaggi": lambda: calcola_minutaggi(df, filtra_per_tempo(df, 'Primo tempo'), filtra_per_tempo(df, 'Secondo tempo')),
+    }
+
+
+def match_report_title(partita_info: Mapping) -> str:
+    return f"Report Partita - {partita_info['competizione'].title()} vs {partita_info['avversario'].title()} ({partita_info['data']})"
+
+
+def _metric_label(name: str) -> str:
+    return name.replace('_', ' ').title()
+
+
+def iter_zone_image_sections(
+    zone_context: Mapping,
+    encoding: Union[str, ImageEncoding, None] = None,
+    team_per_side: bool = True,
+    player_per_side: bool = True,
+) -> Iterator[PdfImageSection]:
+    """Grafici zonali del PDF (una metrica per immagine) a partire dal contesto delle zone.
+
+    Le immagini vengono prodotte una alla volta, così chi impagina in streaming
+    (``StreamingPdfReport``) non le tiene mai tutte in memoria.
+
+    Args:
+        zone_context: Report zonale e metriche disponibili (vedi ``zone_metrics``).
+        encoding: Profilo di codifica delle immagini (default: PNG standard).
+        team_per_side: Split per lato (Sx/Dx) nei grafici di squadra.
+        player_per_side: Split per lato (Sx/Dx) nei grafici dei giocatori.
+    """
+
+    zona_report = zone_context.get("report_zona", {})
+
+    # Sezioni squadra - attacco
+    for metric in zone_context.get("team_att_metrics", []):
+        try:
+            section = PdfImageSection(
+                f"Zone Squadra Attacco - {_metric_label(metric)}",
+                team_zone_image(
+                    zona_report,
+                    [metric],
+                    team_key="attacco",
+                    title=f"Attacco - {_metric_label(metric)}",
+                    cmap=cm.Reds,
+                    per_side=team_per_side,
+                    figsize=(4.0, 3.0),
+                    encoding=encoding,
+                ),
+                max_width=320,
+            )
+        except Exception:
+            continue
+        yield section
+
+    # Sezioni squadra - difesa
+    for metric in zone_context.get("team_dif_metrics", []):
+        try:
+            section = PdfImageSection(
+                f"Zone Squadra Difesa - {_metric_label(metric)}",
+                team_zone_image(
+                    zona_report,
+                    [metric],
+                    team_key="difesa",
+                    title=f"Difesa - {_metric_label(metric)}",
+                    cmap=cm.Blues,
+                    per_side=team_per_side,
+                    figsize=(4.0, 3.0),
+                    encoding=encoding,
+                ),
+                max_width=320,
+            )
+        except Exception:
+            continue
+        yield section
+
+    # Sezioni individuali
+    zona_individuali = zona_report.get('individuali', {})
+    for giocatore, metriche in zone_context.get("player_metrics", {}).items():
+        for metric in metriche.get("attacco", []):
+            try:
+                section = PdfImageSection(
+                    f"Zone {giocatore} Attacco - {_metric_label(metric)}",
+                    player_zone_image(
+                        zona_individuali,
+                        [metric],
+                        chi=giocatore,
+                        title=f"{giocatore} - Attacco {_metric_label(metric)}",
+                        cmap=cm.OrRd,
+                        per_side=player_per_side,
+                        figsize=(4.0, 3.0),
+                        encoding=encoding,
+                    ),
+                    max_width=320,
+                )
+            except Exception:
+                continue
+            yield section
+
+        for metric in metriche.get("difesa", []):
+            try:
+                section = PdfImageSection(
+                    f"Zone {giocatore} Difesa - {_metric_label(metric)}",
+                    player_zone_image(
+                        zona_individuali,
+                        [metric],
+                        chi=giocatore,
+                        title=f"{giocatore} - Difesa {_metric_label(metric)}",
+                        cmap=cm.BuPu,
+                        per_side=player_per_side,
+                        figsize=(4.0, 3.0),
+                        encoding=encoding,
+                    ),
+                    max_width=320,
+                )
+            except Exception:
+                continue
+            yield section
+
+
+def zone_selection_key(zone_context: Mapping) -> tuple:
+    """Scelte dell'utente nel contesto delle zone (metriche, giocatori, per lato), da mettere nella chiave dei lavori PDF.
+
+    Due export con le stesse scelte producono lo stesso PDF; cambiando metriche
+    o giocatori la chiave cambia e il PDF già generato non viene riproposto.
+    """
+
+    player_metrics = zone_context.get("player_metrics", {})
+    return (
+        tuple(zone_context.get("team_att_metrics", [])),
+        tuple(zone_context.get("team_dif_metrics", [])),
+        tuple(zone_context.get("players", [])),
+        tuple(
+            (giocatore, tuple(metriche.get("attacco", [])), tuple(metriche.get("difesa", [])))
+            for giocatore, metriche in player_metrics.items()
+        ),
+        zone_context.get("team_per_side", True),
+        zone_context.get("player_per_side", True),
+    )
+
+
+def build_match_table_sections(
+    df: pd.DataFrame,
+    partita_info: Mapping,
+    categoria: str,
+    reports: Optional[Mapping] = None,
+) -> List[PdfTableSection]:
+    """Sezioni tabellari del PDF di una partita, nello stesso ordine della pagina.
+
+    Args:
+        df: Eventi della partita già normalizzati (Periodo, tempoEffettivo, ...).
+        partita_info: Riga della tabella ``partite`` (data, avversario, competizione).
+        categoria: Categoria della partita (u15/u17 hanno solo le stats di squadra).
+        reports: Report già calcolati (es. quelli in sessione); se None vengono calcolati.
+    """
+
+    if reports is None:
+        reports = LazyReports(match_report_builders(df))
+    solo_squadra = categoria.lower() in CATEGORIE_SOLO_SQUADRA
+
+    sections: List[PdfTableSection] = []
+
+    _, _, score_pdf_table = risultato_table(df, partita_info['avversario'])
+    if not score_pdf_table.empty:
+        sections.append(PdfTableSection("Risultato", score_pdf_table.copy()))
+
+    gol_df = gol_timeline(df)
+    if not gol_df.empty:
+        timeline_pdf = gol_df[['Minuto', 'Squadra', 'Marcatore']]
+        if not timeline_pdf.empty:
+            sections.append(PdfTableSection("Timeline Gol", timeline_pdf.reset_index(drop=True)))
+
+    # Stats Squadra
+    squadra = reports['eventi']['squadra']
+    sections.append(PdfTableSection("Stats Squadra - Possesso Attacco", stats_table(squadra['attacco'])))
+    sections.append(PdfTableSection("Stats Squadra - Non Possesso Difesa", stats_table(squadra['difesa'])))
+    sections.append(PdfTableSection("Stats Squadra - Perse e Recuperate", stats_table(calcola_palle_stats(df, squadra['attacco'].keys()))))
+    sections.append(PdfTableSection("Stats Squadra - Falli", stats_table(squadra['falli'])))
+    sections.append(PdfTableSection("Stats Squadra - Portieri Noi", stats_table(remove_portiere_integrazione_stats(squadra['portieri_noi']))))
+    sections.append(PdfTableSection("Stats Squadra - Portieri Loro", stats_table(remove_portiere_integrazione_stats(squadra['portieri_loro']))))
+
+    if solo_squadra:
+        return sections
+
+    # Stats Individuali
+    individuali = reports['eventi']['individuali_split']
+    for periodo, label in (('Totale', 'Totale'), ('1T', 'Primo Tempo'), ('2T', 'Secondo Tempo')):
+        df_ind = individuali_table(individuali[periodo])
+        if not df_ind.empty:
+            sections.append(PdfTableSection(f"Stats Individuali - {label}", df_ind.copy()))
+    portieri = reports['eventi']['portieri_individuali_split']
+    for periodo, label in (('Totale', 'Totale'), ('1T', 'Primo Tempo'), ('2T', 'Secondo Tempo')):
+        df_port = portieri_table(portieri[periodo])
+        if not df_port.empty:
+            sections.append(PdfTableSection(f"Stats Portieri Individuali - {label}", df_port.copy()))
+
+    # Top 5
+    for stat_label, df_top5 in calcola_top5_tables(individuali['Totale']):
+        sections.append(PdfTableSection(f"Top 5 - {stat_label}", df_top5.copy()))
+
+    # Stats Quartetti (solo Totale) e Quinto Uomo
+    report_quartetti = reports['quartetti']
+    if report_quartetti['Totale']:
+        df_quartetti_tot = quartetti_table(report_quartetti['Totale'])
+        if not df_quartetti_tot.empty:
+            sections.append(PdfTableSection("Stats Quartetti - Totale", df_quartetti_tot.copy()))
+    report_quinto_uomo = reports['quinto_uomo']
+    for periodo, label in (('Totale', 'Totale'), ('1T', 'Primo Tempo'), ('2T', 'Secondo Tempo')):
+        if report_quinto_uomo[periodo]:
+            df_quinto = quartetti_table(report_quinto_uomo[periodo], split_index=False)
+            if not df_quinto.empty:
+                sections.append(PdfTableSection(f"Quinto Uomo - {label}", df_quinto.copy()))
+
+    # Minutaggi
+    try:
+        dati_durate = format_column_names(reports['durate'])
+        if not dati_durate.empty:
+            sections.append(PdfTableSection("Minutaggi - Durata Partita", dati_durate.copy()))
+    except Exception:
+        pass
+    for periodo, categorie in reports['minutaggi'].items():
+        for key_cat, titolo in MINUTAGGI_CATEGORIE_VISTE:
+            if key_cat in categorie and not categorie[key_cat].empty:
+                df_minutaggi = format_column_names(categorie[key_cat].copy())
+                # Escludi Minutaggi - Quartetti per Primo tempo e Secondo tempo, mantieni solo Totale
+                if titolo == "Quartetti" and periodo != "totale":
+                    continue
+                sections.append(PdfTableSection(f"Minutaggi - {titolo} ({MINUTAGGI_LABEL_TO_TITLE.get(periodo, periodo)})", df_minutaggi.copy()))
+
+    return sections
+
+
+def generate_match_pdf(
+    df: pd.DataFrame,
+    partita_info: Mapping,
+    categoria: str,
+    reports: Optional[Mapping] = None,
+    encoding: Union[str, ImageEncoding, None] = None,
+) -> bytes:
+    """PDF completo di una partita (tabelle e tutte le zone), come l'export della pagina partite."""
+
+    if reports is None:
+        reports = LazyReports(match_report_builders(df))
+    table_sections = build_match_table_sections(df, partita_info, categoria, reports=reports)
+    report_zona = reports['zona']
+    zone_context = dict(zone_metrics(report_zona, categoria), report_zona=report_zona)
+    if partita_info.get('id') is not None:
+        zone_context["partite"] = [partita_info['id']]
+    return render_match_pdf(match_report_title(partita_info), table_sections, zone_context, encoding=encoding)
+
+
+def render_match_pdf(
+    title: str,
+    table_sections: List[PdfTableSection],
+    zone_context: Mapping,
+    encoding: Union[str, ImageEncoding, None] = None,
+) -> bytes:
+    """Disegna i grafici zonali e impagina il PDF (la parte lenta dell'export).
+
+    ``zone_context["partite"]`` (opzionale) associa i grafici in cache alle
+    partite da cui sono calcolati, per poterli scartare se la partita cambia.
+    """
+
+    with ambito_partite(zone_context.get("partite", ())):
+        return generate_pdf_report(
+            title,
+            table_sections=table_sections,
+            image_sections=iter_zone_image_sections(zone_context, encoding=encoding),
+        )
@@ -0,0 +1,184 @@
+"""Riepilogo per partita (gol, tiri, falli, risultato) salvato accanto agli eventi.
+
+La Home e la panoramica della stagione mostrano solo pochi conteggi per
+partita: invece di scaricare tutti gli eventi a ogni visita, i conteggi si
+calcolano quando gli eventi cambiano (caricamento CSV, import della stagione,
+eliminazione) e si salvano nella tabella ``riepilogo_partite``, una riga per
+partita::
+
+    CREATE TABLE riepilogo_partite (
+        partita_id text PRIMARY KEY REFERENCES partite(id) ON DELETE CASCADE,
+        eventi integer, gol_fatti integer, gol_subiti integer,
+        tiri_fatti integer, tiri_subiti integer,
+        tiri_in_porta_fatti integer, tiri_in_porta_subiti integer, parate integer,
+        palle_perse integer, palle_recuperate integer,
+        falli_fatti integer, falli_subiti integer,
+        risultato char(1), aggiornato_il timestamptz
+    );
+
+Le partite senza riepilogo (caricate prima della tabella) vengono calcolate
+dagli eventi al momento della lettura; la migrazione in Admin li salva.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from futsal_analysis.data_access import EVENTI_RIEPILOGO, leggi_eventi
+
+
+TABELLA_RIEPILOGO = "riepilogo_partite"
+
+COLONNE_RIEPILOGO = [
+    "eventi",
+    "gol_fatti", "gol_subiti",
+    "tiri_fatti", "tiri_subiti",
+    "tiri_in_porta_fatti", "tiri_in_porta_subiti", "parate",
+    "palle_perse", "palle_recuperate",
+    "falli_fatti", "falli_subiti",
+]
+
+ESITI_IN_PORTA = ['Parata', 'Gol', 'Palo']
+
+VITTORIA, PAREGGIO, SCONFITTA = "V", "P", "S"
+
+logger = logging.getLogger(__name__)
+
+
+def calcola_riepiloghi(df: pd.DataFrame, partite_ids: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """Riepilogo di ogni partita degli eventi, in un solo raggruppamento.
+
+    Args:
+        df: Eventi (colonne ``partita_id``, ``evento``, ``squadra``, ``esito``).
+        partite_ids: Partite da riportare, nell'ordine dato; quelle senza
+            eventi hanno tutti i conteggi a 0 (pareggio 0-0).
+
+    Returns:
+        DataFrame indicizzato per ``partita_id`` con ``COLONNE_RIEPILOGO`` e ``risultato``.
+    """
+
+    if df.empty:
+        conteggi = pd.DataFrame(columns=COLONNE_RIEPILOGO, dtype="int64")
+    else:
+        evento = df['evento'].astype("string")
+        noi = df['squadra'] == 'Noi'
+        loro = df['squadra'] == 'Loro'
+        gol = evento == 'Gol'
+        tiro = evento.str.contains('Tiro', na=False, regex=False)
+        fallo = evento.str.contains('Fallo', na=False, regex=False)
+        in_porta = tiro & df['esito'].isin(ESITI_IN_PORTA)
+        flag = pd.DataFrame({
+            "eventi": True,
+            "gol_fatti": gol & noi,
+            "gol_subiti": gol & loro,
+            "tiri_fatti": tiro & noi,
+            "tiri_subiti": tiro & loro,
+            "tiri_in_porta_fatti": in_porta & noi,
+            "tiri_in_porta_subiti": in_porta & loro,
+            "parate": tiro & loro & (df['esito'] == 'Parata'),
+            "palle_perse": evento.str.contains('Palla persa', na=False, regex=False),
+            "palle_recuperate": evento.str.contains('Palla recuperata', na=False, regex=False),
+            "falli_fatti": fallo & noi,
+            "falli_subiti": fallo & loro,
+        }, index=df.index)
+        conteggi = flag.astype("int64").groupby(df['partita_id'].astype(str)).sum()
+
+    if partite_ids is not None:
+        conteggi = conteggi.reindex([str(p) for p in partite_ids], fill_value=0)
+    conteggi.index.name = "partita_id"
+    return calcola_risultati(conteggi)
+
+
+def aggiorna_riepilogo(client, partita_id: str) -> Optional[Dict[str, Any]]:
+    """Ricalcola dagli eventi salvati il riepilogo della partita e lo salva.
+
+    Chiamata dopo ogni modifica degli eventi. Un errore (es. tabella non
+    ancora creata) viene registrato nel log senza interrompere chi scrive gli
+    eventi: la lettura ricalcola comunque i riepiloghi mancanti.
+
+    Returns:
+        Il record salvato, o None se non è stato possibile salvarlo.
+    """
+
+    try:
+        df = leggi_eventi(client, EVENTI_RIEPILOGO, [partita_id])
+        riga = calcola_riepiloghi(df, [partita_id]).reset_index().iloc[0]
+        record = {"partita_id": str(partita_id), "risultato": riga["risultato"]}
+        record.update({colonna: int(riga[colonna]) for colonna in COLONNE_RIEPILOGO})
+        record["aggiornato_il"] = datetime.now(timezone.utc).isoformat()
+        client.table(TABELLA_RIEPILOGO).upsert([record], on_conflict="partita_id").execute()
+        return record
+    except Exception:
+        logger.exception("Riepilogo della partita %s non aggiornato", partita_id)
+        return None
+
+
+def elimina_riepilogo(client, partita_id: str) -> bool:
+    """Toglie il riepilogo di una partita eliminata (errori solo nel log, come :func:`aggiorna_riepilogo`)."""
+
+    try:
+        client.table(TABELLA_RIEPILOGO).delete().eq("partita_id", str(partita_id)).execute()
+        return True
+    except Exception:
+        logger.exception("Riepilogo della partita %s non eliminato", partita_id)
+        return False
+
+
+def aggiorna_riepiloghi(client, partita_ids: Optional[Iterable[str]] = None, progress=None) -> int:
+    """Ricalcola i riepiloghi delle partite indicate (default: tutte); restituisce quanti sono stati salvati.
+
+    ``progress`` è chiamata con ``(partita_id, record)`` a ogni partita.
+    """
+
+    if partita_ids is None:
+        partita_ids = [p["id"] for p in client.table("partite").select("id").execute().data or []]
+    salvati = 0
+    for partita_id in partita_ids:
+        record = aggiorna_riepilogo(client, partita_id)
+        salvati += record is not None
+        if progress is not None:
+            progress(partita_id, record)
+    return salvati
+
+
+def carica_riepiloghi(client, partite_ids: Iterable[str]) -> pd.DataFrame:
+    """Riepiloghi delle partite indicate con una sola query (vedi :func:`calcola_riepiloghi`).
+
+    Le partite senza riepilogo salvato vengono calcolate dai loro eventi.
+    """
+
+    partite_ids = [str(p) for p in partite_ids]
+    if not partite_ids:
+        return calcola_riepiloghi(pd.DataFrame(), [])
+    try:
+        righe = (
+            client.table(TABELLA_RIEPILOGO).select(",".join(["partita_id", *COLONNE_RIEPILOGO]))
+            .in_("partita_id", partite_ids).execute().data or []
+        )
+    except Exception:
+        logger.exception("Lettura di %s non riuscita: riepiloghi calcolati dagli eventi", TABELLA_RIEPILOGO)
+        righe = []
+    salvati = pd.DataFrame(righe, columns=["partita_id", *COLONNE_RIEPILOGO]).set_index("partita_id")
+
+    mancanti = [p for p in partite_ids if p not in salvati.index]
+    if mancanti:
+        eventi = leggi_eventi(client, EVENTI_RIEPILOGO, mancanti)
+        salvati = pd.concat([salvati, calcola_riepiloghi(eventi, mancanti)[COLONNE_RIEPILOGO]])
+    return calcola_risultati(salvati.reindex(partite_ids).astype("int64"))
+
+
+def calcola_risultati(riepiloghi: pd.DataFrame) -> pd.DataFrame:
+    """Aggiunge la colonna ``risultato`` (V/P/S) dai gol fatti e subiti."""
+
+    riepiloghi = riepiloghi.copy()
+    riepiloghi["risultato"] = np.select(
+        [riepiloghi["gol_fatti"] > riepiloghi["gol_subiti"], riepiloghi["gol_fatti"] < riepiloghi["gol_subiti"]],
+        [VITTORIA, SCONFITTA],
+        PAREGGIO,
+    )
+    return riepiloghi
@@ -0,0 +1,317 @@
+"""Import di una stagione: molte partite con i loro CSV eventi in un colpo solo.
+
+La sorgente è un archivio ZIP (o una cartella) con i CSV delle partite e un
+``manifest.csv`` che descrive ogni file, una riga per partita::
+
+    file,data,avversario,competizione,categoria,yt_link
+    2024-10-05_roma.csv,05/10/2024,Roma,Campionato,U19,https://youtu.be/...
+
+Sono accettati anche i nomi inglesi delle colonne (``date``, ``opponent``,
+``competition``, ``category``). Le partite vengono create (o aggiornate) nella
+tabella ``partite``, i CSV preprocessati in processi paralleli e gli eventi
+scritti a lotti con :func:`ingestion.sincronizza_eventi`, quindi ripetere
+l'import non duplica nulla. I file con lo stesso nome in cartelle diverse e
+i file o le partite ripetuti nel manifest vengono rifiutati, con un errore
+nel report di ciascuna riga.
+"""
+
+from __future__ import annotations
+
+import io
+import multiprocessing
+import os
+import time
+import zipfile
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+import pandas as pd
+
+from futsal_analysis.cache_registry import invalida_categoria, invalida_partita
+from futsal_analysis.ingestion import (
+    DEFAULT_CHUNKSIZE,
+    aggiungi_colonne_tempi,
+    iter_eventi_csv,
+    parse_data_sicura,
+    sincronizza_eventi,
+    to_id_partita,
+)
+from futsal_analysis.match_summary import aggiorna_riepilogo
+
+
+MANIFEST = "manifest.csv"
+
+COLONNE_MANIFEST = ["file", "data", "avversario", "competizione", "categoria", "yt_link"]
+
+ALIAS_MANIFEST = {
+    "date": "data",
+    "opponent": "avversario",
+    "competition": "competizione",
+    "category": "categoria",
+    "csv": "file",
+}
+
+CATEGORIA_DEFAULT = "Prima Squadra"
+
+# Preprocessing CPU-bound: pochi processi bastano, ognuno è un interprete in più in memoria
+DEFAULT_MAX_WORKERS = 4
+
+
+@dataclass
+class EsitoFile:
+    """Esito dell'import di un file della stagione.
+
+    Attributes:
+        file: Nome del CSV (come nel manifest).
+        partita_id: Partita creata o aggiornata ('' se la riga del manifest non è valida).
+        eventi: Eventi letti dal file.
+        inserted: Eventi nuovi scritti.
+        updated: Eventi già presenti e modificati.
+        skipped: Eventi già presenti e invariati.
+        removed: Eventi salvati che non compaiono più nel file, eliminati.
+        seconds: Durata di preprocessing e scrittura.
+        errore: Motivo del fallimento, vuoto se l'import è riuscito.
+    """
+
+    file: str
+    partita_id: str = ""
+    eventi: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    removed: int = 0
+    seconds: float = 0.0
+    errore: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return not self.errore
+
+
+Sorgente = Union[str, os.PathLike, bytes, io.IOBase]
+
+
+def leggi_sorgente(sorgente: Sorgente) -> Tuple[pd.DataFrame, Dict[str, Optional[bytes]]]:
+    """Manifest e contenuto dei CSV di uno ZIP (percorso, bytes o file aperto) o di una cartella.
+
+    I file sono indicizzati per nome senza cartelle, così lo ZIP può contenere
+    una cartella di primo livello. Un nome presente in più cartelle ha valore
+    None: non si può sapere quale file intende il manifest.
+    """
+
+    files: Dict[str, Optional[bytes]] = {}
+
+    def aggiungi(nome: str, leggi: Callable[[], bytes]) -> None:
+        files[nome] = None if nome in files else leggi()
+
+    if isinstance(sorgente, (str, os.PathLike)) and Path(sorgente).is_dir():
+        for percorso in Path(sorgente).rglob("*.csv"):
+            aggiungi(percorso.name, percorso.read_bytes)
+    else:
+        if isinstance(sorgente, bytes):
+            sorgente = io.BytesIO(sorgente)
+        try:
+            with zipfile.ZipFile(sorgente) as archivio:
+                for info in archivio.infolist():
+                    nome = Path(info.filename).name
+                    if not info.is_dir() and nome.lower().endswith(".csv") and not nome.startswith("._"):
+                        aggiungi(nome, lambda info=info: archivio.read(info))
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"archivio ZIP non valido: {e}") from e
+
+    chiave_manifest = next((nome for nome in files if nome.lower() == MANIFEST), None)
+    if chiave_manifest is None:
+        raise ValueError(f"{MANIFEST} non trovato nella sorgente")
+    contenuto_manifest = files.pop(chiave_manifest)
+    if contenuto_manifest is None:
+        raise ValueError(f"più di un {MANIFEST} nella sorgente")
+    return leggi_manifest(contenuto_manifest), files
+
+
+def leggi_manifest(contenuto: bytes) -> pd.DataFrame:
+    """Manifest normalizzato: colonne ``COLONNE_MANIFEST``, date in formato YYYY-MM-DD."""
+
+    manifest = pd.read_csv(io.BytesIO(contenuto), dtype=str, sep=None, engine="python")
+    manifest.columns = manifest.columns.str.strip().str.lower().str.replace(" ", "_")
+    manifest = manifest.rename(columns=ALIAS_MANIFEST)
+    if "file" not in manifest.columns:
+        raise ValueError(f"{MANIFEST}: manca la colonna 'file'")
+    manifest = manifest.reindex(columns=COLONNE_MANIFEST).fillna("")
+    manifest = manifest.apply(lambda col: col.str.strip())
+
+    date = manifest["data"].map(parse_data_sicura)
+    manifest["data"] = [d.strftime("%Y-%m-%d") if pd.notna(d) else "" for d in date]
+    manifest.loc[manifest["categoria"] == "", "categoria"] = CATEGORIA_DEFAULT
+    return manifest
+
+
+def righe_partite(manifest: pd.DataFrame) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, EsitoFile]]:
+    """Righe per la tabella ``partite`` e gli esiti delle righe non valide, per posizione nel manifest."""
+
+    partite: Dict[int, Dict[str, Any]] = {}
+    scartate: Dict[int, EsitoFile] = {}
+    for indice, riga in enumerate(manifest.to_dict("records")):
+        if not riga["data"] or not riga["avversario"]:
+            scartate[indice] = EsitoFile(riga["file"], errore="data o avversario mancanti/non validi")
+            continue
+        partite[indice] = {
+            "id": to_id_partita(riga["data"], riga["avversario"]),
+            "data": riga["data"],
+            "avversario": riga["avversario"],
+            "competizione": riga["competizione"],
+            "categoria": riga["categoria"],
+            "yt_link": riga["yt_link"],
+        }
+    return partite, scartate
+
+
+def _prepara_file(contenuto: bytes, partita_id: str, categoria: str, chunksize: int = DEFAULT_CHUNKSIZE) -> pd.DataFrame:
+    """Worker eseguito nei processi del pool (deve essere una funzione di modulo per il pickle)."""
+
+    frames = list(iter_eventi_csv(io.BytesIO(contenuto), partita_id, categoria, chunksize=chunksize))
+    if not frames:
+        return pd.DataFrame()
+    return aggiungi_colonne_tempi(pd.concat(frames))
+
+
+def _default_workers(n_file: int) -> int:
+    return max(1, min(DEFAULT_MAX_WORKERS, os.cpu_count() or 1, n_file))
+
+
+def importa_stagione(
+    client,
+    sorgente: Sorgente,
+    max_workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int, EsitoFile], None]] = None,
+    **insert_kwargs: Any,
+) -> List[EsitoFile]:
+    """Crea le partite del manifest e carica i loro eventi.
+
+    I file vengono preprocessati in processi paralleli; gli eventi di ogni file
+    sono scritti nel processo principale appena il file è pronto, quindi la
+    scrittura si sovrappone al preprocessing dei file successivi.
+
+    Args:
+        client: Client Supabase.
+        sorgente: ZIP (percorso, bytes o file aperto) o cartella con i CSV e il manifest.
+        max_workers: Processi paralleli; con 1 i file vengono preprocessati nel processo corrente.
+        progress: Callback ``(completati, totale, esito)`` chiamata a ogni file concluso.
+        **insert_kwargs: Opzioni di :func:`ingestion.insert_batches`.
+
+    Returns:
+        Un esito per riga del manifest, nell'ordine del manifest.
+    """
+
+    manifest, files = leggi_sorgente(sorgente)
+    righe = manifest.to_dict("records")
+    partite, esiti = righe_partite(manifest)
+
+    # Un file o una partita su più righe del manifest: non si sa quale riga vale,
+    # e ogni import sostituirebbe gli eventi dell'altro, quindi si rifiutano tutte
+    file_ripetuti = manifest["file"].duplicated(keep=False).to_numpy()
+    per_partita = Counter(partita["id"] for partita in partite.values())
+    da_importare: List[Tuple[int, Mapping, Mapping]] = []
+    for indice, partita in partite.items():
+        riga = righe[indice]
+        if file_ripetuti[indice]:
+            errore = "file indicato in più righe del manifest"
+        elif per_partita[partita["id"]] > 1:
+            errore = "stessa partita (data e avversario) in più righe del manifest"
+        elif riga["file"] not in files:
+            errore = "file non presente nella sorgente"
+        elif files[riga["file"]] is None:
+            errore = "più file con questo nome nella sorgente (in cartelle diverse)"
+        else:
+            da_importare.append((indice, riga, partita))
+            continue
+        esiti[indice] = EsitoFile(riga["file"], partita["id"], errore=errore)
+
+    totale = len(manifest)
+    completati = len(esiti)
+
+    def _concluso(indice: int, esito: EsitoFile) -> None:
+        nonlocal completati
+        esiti[indice] = esito
+        completati += 1
+        if progress is not None:
+            progress(completati, totale, esito)
+
+    if da_importare:
+        # Le partite prima degli eventi; upsert sull'id così l'import si può ripetere
+        per_id = {partita["id"]: partita for _, _, partita in da_importare}
+        client.table("partite").upsert(list(per_id.values()), on_conflict="id").execute()
+        # Partite nuove o modificate: elenchi e indice delle loro categorie vanno riletti
+        for categoria in {partita["categoria"] for partita in per_id.values()}:
+            invalida_categoria(categoria)
+
+    def _scrivi(riga: Mapping, partita: Mapping, df: pd.DataFrame, inizio: float) -> EsitoFile:
+        esito = EsitoFile(riga["file"], partita["id"], eventi=len(df))
+        if df.empty:
+            esito.errore = "nessun evento nel file"
+            return esito
+        scrittura = sincronizza_eventi(client, [df], partita["id"], **insert_kwargs)
+        esito.inserted, esito.updated, esito.skipped = scrittura.inserted, scrittura.updated, scrittura.skipped
+        esito.removed = scrittura.removed
+        if scrittura.errors:
+            esito.errore = f"{len(scrittura.errors)} lotti non scritti: {scrittura.errors[0]}"
+        if scrittura.inserted or scrittura.updated or scrittura.removed:
+            aggiorna_riepilogo(client, partita["id"])
+            invalida_partita(partita["id"])
+        esito.seconds = time.perf_counter() - inizio
+        return esito
+
+    workers = max_workers or _default_workers(len(da_importare))
+    if workers <= 1:
+        for indice, riga, partita in da_importare:
+            inizio = time.perf_counter()
+            try:
+                df = _prepara_file(files[riga["file"]], partita["id"], partita["categoria"])
+                _concluso(indice, _scrivi(riga, partita, df, inizio))
+            except Exception as e:
+                _concluso(indice, EsitoFile(riga["file"], partita["id"], errore=str(e) or e.__class__.__name__))
+    else:
+        # "spawn" evita di duplicare con fork lo stato del server Streamlit (thread, socket)
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            in_corso: Dict[Future, Tuple[int, Mapping, Mapping, float]] = {}
+
+            def _raccogli(futures: Iterable[Future]) -> None:
+                for future in futures:
+                    indice, riga, partita, inizio = in_corso.pop(future)
+                    try:
+                        _concluso(indice, _scrivi(riga, partita, future.result(), inizio))
+                    except Exception as e:
+                        _concluso(indice, EsitoFile(riga["file"], partita["id"], errore=str(e) or e.__class__.__name__))
+
+            for indice, riga, partita in da_importare:
+                future = pool.submit(_prepara_file, files[riga["file"]], partita["id"], partita["categoria"])
+                in_corso[future] = (indice, riga, partita, time.perf_counter())
+                # Al massimo due file in coda per processo: i CSV non si accumulano in memoria
+                if len(in_corso) >= workers * 2:
+                    finiti, _ = wait(list(in_corso), return_when=FIRST_COMPLETED)
+                    _raccogli(finiti)
+            _raccogli(list(in_corso))
+
+    return [esiti[indice] for indice in range(len(righe))]
+
+
+def report_import(esiti: Iterable[EsitoFile]) -> pd.DataFrame:
+    """Tabella del report per file (una riga per file del manifest)."""
+
+    return pd.DataFrame([
+        {
+            "File": e.file,
+            "Partita": e.partita_id,
+            "Eventi": e.eventi,
+            "Nuovi": e.inserted,
+            "Aggiornati": e.updated,
+            "Invariati": e.skipped,
+            "Eliminati": e.removed,
+            "Secondi": round(e.seconds, 1),
+            "Esito": "✅" if e.ok else f"❌ {e.errore}",
+        }
+        for e in esiti
+    ])
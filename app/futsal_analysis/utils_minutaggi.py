@@ -3,6 +3,159 @@ import numpy as np
 from itertools import combinations
 from collections import defaultdict
 
+
+def estrai_mov_portiere(row):
+    """Restituisce (movimento_list, portiere or None)"""
+    mov_cols = ['quartetto', 'quartetto_1', 'quartetto_2', 'quartetto_3', 'quartetto_4']
+    movimento = [row.get(c) for c in mov_cols]
+    movimento = [str(g).strip() for g in movimento if pd.notna(g) and str(g).strip()]
+    movimento = sorted(set(movimento))
+    portiere = row.get('portiere')
+    portiere = str(portiere).strip() if pd.notna(portiere) and str(portiere).strip() else None
+    return movimento, portiere
+
+
+def chiavi_minutaggio(movimento, portiere):
+    """
+    Categorie di minutaggio (categoria, chiave) a cui va attribuito il tempo
+    trascorso con in campo ``movimento`` (lista ordinata) e ``portiere`` (o None).
+    """
+    chiavi = []
+    # --------- CALCOLO PORTIERI: SEMPRE (se presente) ---------
+    if portiere:
+        chiavi.append(("mov4_portieri", (portiere,)))
+
+    # --------- CALCOLO SINGOLI: SEMPRE (se presenti giocatori movimento) ---------
+    for g in movimento:
+        chiavi.append(("mov4_singoli", (g,)))
+
+    # --------- CALCOLO SINGOLO + PORTIERE: SOLO SE ENTRAMBI PRESENTI ---------
+    if portiere:
+        for g in movimento:
+            chiavi.append(("mov4_singolo_portiere", (portiere, g)))
+
+    # --------- Altre combinazioni come da logica originale ---------
+    if len(movimento) == 4:
+        # # coppie di movimento - COMMENTATO
+        # for c in combinations(movimento, 2):
+        #     chiavi.append(("mov4_coppie", tuple(sorted(c))))
+
+        # # coppia + portiere - COMMENTATO
+        # if portiere:
+        #     for c in combinations(movimento, 2):
+        #         trio = (portiere, *sorted(c))   
+        #         chiavi.append(("mov4_coppia_portiere", trio))
+
+        # quartetto (solo mov)
+        chiavi.append(("mov4_quartetto", tuple(movimento)))
+
+        # quartetto + portiere (portiere separato)
+        if portiere:
+            chiavi.append(("mov4_quartetto_portiere", (portiere, *movimento)))
+
+    elif len(movimento) == 3:
+        if portiere:
+            chiavi.append(("mov3_con_portiere", tuple(movimento)))
+        else:
+            chiavi.append(("mov3_senza_portiere", tuple(movimento)))
+
+    elif len(movimento) == 5 and portiere is None:
+        chiavi.append(("mov5_senza_portiere", tuple(movimento)))
+
+    return chiavi
+
+
+def minutaggi_to_frames(counter, total_sec):
+    """Converte i secondi accumulati per (categoria, chiave) nei DataFrame di calcola_minutaggi."""
+    dfs = {}
+    for (cat, key), sec in counter.items():
+        minutes = round(sec / 60, 2)
+        mmss = f"{int(sec//60):02}:{int(sec%60):02}"
+        perc = f"{int(round(100 * sec / total_sec))}%"
+
+        if cat == "mov4_portieri":
+            df = dfs.setdefault(cat, [])
+            df.append({
+                "Portiere": key[0],
+                "Minuti_giocati": mmss,
+                "Percentuale": perc
+            })
+
+        elif cat == "mov4_singoli":
+            df = dfs.setdefault(cat, [])
+            df.append({
+                "Giocatore": key[0],
+                "Minuti_giocati": mmss,
+                "Percentuale": perc
+            })
+
+        elif cat == "mov4_singolo_portiere":
+            port, g = key
+            df = dfs.setdefault(cat, [])
+            df.append({
+                "Portiere": port,
+                "Giocatore": g,
+                "Minuti_giocati": mmss,
+                "Percentuale": perc
+            })
+
+        # elif cat == "mov4_coppie":  # COMMENTATO
+        #     g1, g2 = key
+        #     df = dfs.setdefault(cat, [])
+        #     df.append({
+        #         "Giocatori": (g1, g2),
+        #         "Minuti_giocati": mmss,
+        #         "Percentuale": perc
+        #     })
+
+        # elif cat == "mov4_coppia_portiere":  # COMMENTATO
+        #     port, g1, g2 = key
+        #     df = dfs.setdefault(cat, [])
+        #     df.append({
+        #         "Portiere": port,
+        #         "Giocatori": (g1, g2),
+        #         "Minuti_giocati": mmss,
+        #         "Percentuale": perc
+        #     })
+
+        elif cat == "mov4_quartetto":
+            df = dfs.setdefault(cat, [])
+            df.append({
+                "Giocatori_movimento": key,
+                "Minuti_giocati": mmss,
+                "Percentuale": perc
+            })
+
+        elif cat == "mov4_quartetto_portiere":
+            port, *mov = key
+            df = dfs.setdefault(cat, [])
+            df.append({
+                "Portiere": port,
+                "Giocatori_movimento": tuple(mov),
+                "Minuti_giocati": mmss,
+                "Percentuale": perc
+            })
+
+        elif cat.startswith("mov3"):
+            df = dfs.setdefault(cat, [])
+            df.append({
+                "Giocatori_movimento": key,
+                "Minuti_giocati": mmss,
+                "Percentuale": perc
+            })
+
+        elif cat == "mov5_senza_portiere":
+            df = dfs.setdefault(cat, [])
+            df.append({
+                "Giocatori_movimento": key,
+                "Minuti_giocati": mmss,
+                "Percentuale": perc
+            })
+
+    # Convert lists to DataFrames and sort
+    return {k: pd.DataFrame(v).sort_values("Minuti_giocati", ascending=False) for k, v in dfs.items()}
+
+
 def calcola_minutaggi(df, df_1t, df_2t):
     """
     Calcola i minuti giocati suddivisi in categorie:
@@ -51,16 +204,6 @@ def calcola_minutaggi(df, df_1t, df_2t):
         ).values
         return np.clip(delta, a_min=0, a_max=None).sum()
 
-    def estrai_mov_portiere(row):
-        """Restituisce (movimento_list, portiere or None)"""
-        mov_cols = ['quartetto', 'quartetto_1', 'quartetto_2', 'quartetto_3', 'quartetto_4']
-        movimento = [row.get(c) for c in mov_cols]
-        movimento = [str(g).strip() for g in movimento if pd.notna(g) and str(g).strip()]
-        movimento = sorted(set(movimento))
-        portiere = row.get('portiere')
-        portiere = str(portiere).strip() if pd.notna(portiere) and str(portiere).strip() else None
-        return movimento, portiere
-
     # ---------- core processor ------------
     def process_period(df_local):
         acc = defaultdict(float)
@@ -91,144 +234,15 @@ def calcola_minutaggi(df, df_1t, df_2t):
                 continue
 
             movimento, portiere = estrai_mov_portiere(df_local.loc[i + 1])
-            mov_len = len(movimento)
-            if mov_len < 1:    # Prima era <3, ora basta almeno 1 in campo!
+            if len(movimento) < 1:    # Prima era <3, ora basta almeno 1 in campo!
                 continue
 
-            # --------- CALCOLO PORTIERI: SEMPRE (se presente) ---------
-            if portiere:
-                acc[("mov4_portieri", (portiere,))] += delta
-
-            # --------- CALCOLO SINGOLI: SEMPRE (se presenti giocatori movimento) ---------
-            for g in movimento:
-                acc[("mov4_singoli", (g,))] += delta
-
-            # --------- CALCOLO SINGOLO + PORTIERE: SOLO SE ENTRAMBI PRESENTI ---------
-            if portiere:
-                for g in movimento:
-                    acc[("mov4_singolo_portiere", (portiere, g))] += delta
-
-            # --------- Altre combinazioni come da logica originale ---------
-            if mov_len == 4:
-                # # coppie di movimento - COMMENTATO
-                # for c in combinations(movimento, 2):
-                #     acc[("mov4_coppie", tuple(sorted(c)))] += delta
-
-                # # coppia + portiere - COMMENTATO
-                # if portiere:
-                #     for c in combinations(movimento, 2):
-                #         trio = (portiere, *sorted(c))   
-                #         acc[("mov4_coppia_portiere", trio)] += delta
-
-                # quartetto (solo mov)
-                acc[("mov4_quartetto", tuple(movimento))] += delta
-
-                # quartetto + portiere (portiere separato)
-                if portiere:
-                    acc[("mov4_quartetto_portiere", (portiere, *movimento))] += delta
-
-            elif mov_len == 3:
-                if portiere:
-                    acc[("mov3_con_portiere", tuple(movimento))] += delta
-                else:
-                    acc[("mov3_senza_portiere", tuple(movimento))] += delta
-
-            elif mov_len == 5 and portiere is None:
-                acc[("mov5_senza_portiere", tuple(movimento))] += delta
+            for chiave in chiavi_minutaggio(movimento, portiere):
+                acc[chiave] += delta
 
         return acc
 
 
-    # ---------- convert -------------------
-    def dict_to_df(counter, total_sec):
-        dfs = {}
-        for (cat, key), sec in counter.items():
-            minutes = round(sec / 60, 2)
-            mmss = f"{int(sec//60):02}:{int(sec%60):02}"
-            perc = f"{int(round(100 * sec / total_sec))}%"
-
-            if cat == "mov4_portieri":
-                df = dfs.setdefault(cat, [])
-                df.append({
-                    "Portiere": key[0],
-                    "Minuti_giocati": mmss,
-                    "Percentuale": perc
-                })
-
-            elif cat == "mov4_singoli":
-                df = dfs.setdefault(cat, [])
-                df.append({
-                    "Giocatore": key[0],
-                    "Minuti_giocati": mmss,
-                    "Percentuale": perc
-                })
-
-            elif cat == "mov4_singolo_portiere":
-                port, g = key
-                df = dfs.setdefault(cat, [])
-                df.append({
-                    "Portiere": port,
-                    "Giocatore": g,
-                    "Minuti_giocati": mmss,
-                    "Percentuale": perc
-                })
-
-            # elif cat == "mov4_coppie":  # COMMENTATO
-            #     g1, g2 = key
-            #     df = dfs.setdefault(cat, [])
-            #     df.append({
-            #         "Giocatori": (g1, g2),
-            #         "Minuti_giocati": mmss,
-            #         "Percentuale": perc
-            #     })
-
-            # elif cat == "mov4_coppia_portiere":  # COMMENTATO
-            #     port, g1, g2 = key
-            #     df = dfs.setdefault(cat, [])
-            #     df.append({
-            #         "Portiere": port,
-            #         "Giocatori": (g1, g2),
-            #         "Minuti_giocati": mmss,
-            #         "Percentuale": perc
-            #     })
-
-            elif cat == "mov4_quartetto":
-                df = dfs.setdefault(cat, [])
-                df.append({
-                    "Giocatori_movimento": key,
-                    "Minuti_giocati": mmss,
-                    "Percentuale": perc
-                })
-
-            elif cat == "mov4_quartetto_portiere":
-                port, *mov = key
-                df = dfs.setdefault(cat, [])
-                df.append({
-                    "Portiere": port,
-                    "Giocatori_movimento": tuple(mov),
-                    "Minuti_giocati": mmss,
-                    "Percentuale": perc
-                })
-
-            elif cat.startswith("mov3"):
-                df = dfs.setdefault(cat, [])
-                df.append({
-                    "Giocatori_movimento": key,
-                    "Minuti_giocati": mmss,
-                    "Percentuale": perc
-                })
-
-            elif cat == "mov5_senza_portiere":
-                df = dfs.setdefault(cat, [])
-                df.append({
-                    "Giocatori_movimento": key,
-                    "Minuti_giocati": mmss,
-                    "Percentuale": perc
-                })
-
-        # Convert lists to DataFrames and sort
-        return {k: pd.DataFrame(v).sort_values("Minuti_giocati", ascending=False) for k, v in dfs.items()}
-
     # ---------- run for each period ----------
     durations = {
         "totale": durata_reale_sec(df),
@@ -238,6 +252,6 @@ def calcola_minutaggi(df, df_1t, df_2t):
     period_dfs = {}
     for label, dframe in [("totale", df), ("primo_tempo", df_1t), ("secondo_tempo", df_2t)]:
         counter = process_period(dframe)
-        period_dfs[label] = dict_to_df(counter, durations[label])
+        period_dfs[label] = minutaggi_to_frames(counter, durations[label])
 
     return period_dfs
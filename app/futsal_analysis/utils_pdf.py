@@ -3,17 +3,31 @@
 from __future__ import annotations
 
 import numbers
+import os
+import tempfile
 from dataclasses import dataclass
+from functools import partial
 from io import BytesIO
-from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
+import numpy as np
 import pandas as pd
 from matplotlib.figure import Figure
+from PIL import Image as PILImage
+from reportlab import rl_config
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.lib.utils import ImageReader
-from reportlab.platypus import Image, PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from reportlab.platypus import Flowable, Image, PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+try:
+    from svglib.svglib import svg2rlg
+except ImportError:  # dipendenza opzionale: senza svglib il profilo vettoriale non è disponibile
+    svg2rlg = None
+
+# Stream binari invece che in ASCII85: le immagini occupano circa il 25% in meno
+rl_config.useA85 = 0
 
 
 Section = Tuple[str, pd.DataFrame]
@@ -30,6 +44,8 @@ class PdfImageSection:
     title: str
     image_bytes: bytes
     max_width: int = 380
+    # Alternativa a image_bytes: immagine su file, letta solo quando viene disegnata
+    image_path: Optional[str] = None
 
 
 def _format_value(value: object) -> str:
@@ -51,30 +67,83 @@ def _format_value(value: object) -> str:
     return str(value)
 
 
+def _format_float_array(numbers_arr: np.ndarray) -> list[str]:
+    """Float senza valori mancanti: interi senza decimali, gli altri con due decimali."""
+
+    is_integer = np.isfinite(numbers_arr) & (numbers_arr == np.floor(numbers_arr))
+    return [
+        "%d" % value if integer else "%.2f" % value
+        for value, integer in zip(numbers_arr.tolist(), is_integer.tolist())
+    ]
+
+
+def _format_column(values: pd.Series) -> np.ndarray:
+    """Formatta un'intera colonna in stringhe, con lo stesso risultato di ``_format_value``.
+
+    Il tipo di conversione viene scelto una sola volta in base al dtype della
+    colonna (niente controlli per singola cella); solo le colonne ``object`` o
+    di tipi non gestiti passano valore per valore da ``_format_value``.
+    I valori mancanti diventano stringa vuota.
+    """
+
+    dtype = values.dtype
+    out = np.full(len(values), "", dtype=object)
+
+    # Dtype numpy senza valori mancanti possibili (o con NaN): niente passaggi da pandas
+    if isinstance(dtype, np.dtype) and dtype.kind in "biuf":
+        arr = values.to_numpy()
+        if dtype.kind == "b":
+            out[:] = np.where(arr, "True", "False")
+        elif dtype.kind in "iu":
+            out[:] = [str(value) for value in arr.tolist()]
+        else:
+            mask = ~np.isnan(arr)
+            out[mask] = _format_float_array(arr[mask])
+        return out
+
+    mask = values.notna().to_numpy(dtype=bool)
+    if not mask.any():
+        return out
+    valid = values[mask]
+
+    if pd.api.types.is_bool_dtype(dtype):
+        out[mask] = np.where(valid.to_numpy(dtype=bool), "True", "False")
+    elif pd.api.types.is_integer_dtype(dtype):
+        out[mask] = [str(value) for value in valid.to_numpy(dtype=object).tolist()]
+    elif pd.api.types.is_float_dtype(dtype):
+        out[mask] = _format_float_array(valid.to_numpy(dtype=float))
+    elif pd.api.types.is_datetime64_any_dtype(dtype):
+        out[mask] = valid.dt.strftime("%d/%m/%Y %H:%M").to_numpy(dtype=object)
+    elif isinstance(dtype, pd.StringDtype):
+        out[mask] = valid.to_numpy(dtype=object)
+    else:
+        out[mask] = [_format_value(value) for value in valid]
+
+    return out
+
+
 def _dataframe_to_table_data(df: pd.DataFrame, index_column: Optional[str] = None) -> list[list[str]]:
     """Converte un DataFrame in una lista di liste per l'uso con ReportLab.
-    
+
+    Ogni colonna viene formattata in blocco con ``_format_column``; le righe
+    vengono composte solo alla fine.
+
     Args:
         df: DataFrame da convertire
         index_column: Nome della colonna da usare come indice (se None, usa il comportamento standard)
     """
 
-    df_reset = df.copy()
-    
     # Se è specificata una colonna indice, usala come indice
-    if index_column and index_column in df_reset.columns:
-        df_reset = df_reset.set_index(index_column)
-        df_reset = df_reset.reset_index()
+    if index_column and index_column in df.columns:
+        df_reset = df.set_index(index_column).reset_index()
     else:
-        df_reset = df_reset.reset_index()
+        df_reset = df.reset_index()
 
     # Rinomina la colonna dell'indice per renderla più leggibile
     first_col = df_reset.columns[0]
     if first_col == "index":
         df_reset = df_reset.rename(columns={first_col: ""})
 
-    df_reset = df_reset.fillna("")
-    
     # Rinomina colonne specifiche per uniformità
     column_rename_map = {
         "Tiri Ribattuti Noi": "Tiri Subiti Ribattuti",
@@ -84,32 +153,41 @@ def _dataframe_to_table_data(df: pd.DataFrame, index_column: Optional[str] = Non
     df_reset = df_reset.rename(columns=column_rename_map)
 
     header = [str(col) for col in df_reset.columns]
-    rows = [[_format_value(value) for value in row] for row in df_reset.itertuples(index=False)]
-
-    if header:
-        first_header = header[0].strip().lower()
-        if first_header in ("", "index"):
-            sequential = True
-            for expected, row in enumerate(rows):
-                value = row[0]
-                if value == "":
-                    sequential = False
-                    break
-                try:
-                    idx_val = int(value)
-                except (TypeError, ValueError):
-                    sequential = False
-                    break
-                if idx_val != expected:
-                    sequential = False
-                    break
-            if sequential:
-                header = header[1:]
-                rows = [row[1:] for row in rows]
+    columns = [_format_column(values) for _, values in df_reset.items()]
+    n_rows = len(df_reset)
+
+    # Un indice 0..n-1 (quello di default di pandas) non viene riportato nel PDF
+    if header and header[0].strip().lower() in ("", "index") and _is_sequential_index(columns[0]):
+        header = header[1:]
+        columns = columns[1:]
+
+    if columns:
+        rows = [list(row) for row in zip(*columns)]
+    else:
+        rows = [[] for _ in range(n_rows)]
 
     return [header] + rows
 
 
+def _is_sequential_index(formatted: np.ndarray) -> bool:
+    """True se la colonna formattata contiene esattamente 0, 1, 2, ..."""
+
+    expected = np.arange(len(formatted)).astype(str)
+    if np.array_equal(formatted.astype(str), expected):
+        return True
+
+    # Caso raro (es. "01", " 1"): stesso controllo riga per riga di int()
+    for expected_value, value in enumerate(formatted):
+        if value == "":
+            return False
+        try:
+            if int(value) != expected_value:
+                return False
+        except (TypeError, ValueError):
+            return False
+    return True
+
+
 def generate_pdf_from_tables(title: str, sections: Iterable[Section]) -> bytes:
     """Genera un PDF con un titolo e una lista di sezioni tabellari.
 
@@ -179,126 +257,345 @@ def figure_to_png_bytes(fig: Figure, dpi: int = 150) -> bytes:
     return png_bytes
 
 
-def generate_pdf_report(
-    title: str,
-    table_sections: Optional[Sequence[PdfTableSection]] = None,
-    image_sections: Optional[Sequence[PdfImageSection]] = None,
-    compact_tables: bool = False,
-) -> bytes:
-    """Genera un PDF con sezioni tabellari e immagini."""
+@dataclass(frozen=True)
+class ImageEncoding:
+    """Profilo di codifica dei grafici inseriti nei PDF.
+
+    Attributes:
+        name: Nome del profilo (mostrato nell'interfaccia).
+        format: ``"png"``, ``"png_palette"`` (PNG a colori indicizzati),
+            ``"jpeg"`` oppure ``"svg"`` (vettoriale, richiede svglib).
+        max_dpi: Risoluzione massima, anche se il grafico viene chiesto a DPI più alti.
+        quality: Qualità JPEG iniziale (1-95).
+        colors: Numero di colori della palette PNG.
+        max_bytes: Budget per immagine: se superato si riducono qualità/colori
+            e poi risoluzione, fino a ``min_dpi``.
+        min_dpi: Risoluzione minima usata per rientrare nel budget.
+    """
+
+    name: str
+    format: str = "png"
+    max_dpi: int = 150
+    quality: int = 85
+    colors: int = 256
+    max_bytes: Optional[int] = None
+    min_dpi: int = 72
+
+
+IMAGE_PROFILES: Dict[str, ImageEncoding] = {
+    # PNG RGBA a 150 dpi: il comportamento di sempre
+    "standard": ImageEncoding("standard"),
+    # Colori indicizzati e senza canale alfa: i grafici a zone hanno pochi colori pieni
+    "compatto": ImageEncoding("compatto", format="png_palette", max_dpi=110, colors=128, max_bytes=60_000),
+    # JPEG viene incluso nel PDF senza ricodifica: il più leggero per le connessioni mobili
+    "jpeg": ImageEncoding("jpeg", format="jpeg", max_dpi=110, quality=70, max_bytes=40_000),
+    "vettoriale": ImageEncoding("vettoriale", format="svg"),
+}
+DEFAULT_IMAGE_PROFILE = "standard"
+
+IMAGE_PROFILE_LABELS = {
+    "standard": "Standard (PNG)",
+    "compatto": "Compatto (PNG a colori ridotti)",
+    "jpeg": "Leggero (JPEG)",
+    "vettoriale": "Vettoriale (SVG)",
+}
+
+
+def available_image_profiles() -> List[str]:
+    """Nomi dei profili utilizzabili (il vettoriale solo se svglib è installato)."""
+
+    return [name for name, profile in IMAGE_PROFILES.items() if profile.format != "svg" or svg2rlg is not None]
+
+
+def get_image_profile(profile: Union[str, ImageEncoding, None]) -> ImageEncoding:
+    """Profilo per nome (o il profilo stesso); None e nomi non disponibili danno lo standard."""
+
+    if isinstance(profile, ImageEncoding):
+        return profile
+    if profile in available_image_profiles():
+        return IMAGE_PROFILES[profile]
+    return IMAGE_PROFILES[DEFAULT_IMAGE_PROFILE]
+
+
+def _encode_raster(fig: Figure, encoding: ImageEncoding, dpi: int, quality: int, colors: int) -> bytes:
+    png_bytes = figure_to_png_bytes(fig, dpi=dpi)
+    if encoding.format == "png":
+        return png_bytes
 
+    with PILImage.open(BytesIO(png_bytes)) as rgba:
+        # Il canale alfa diventerebbe una maschera separata nel PDF: si appiattisce sullo sfondo bianco
+        rgb = PILImage.new("RGB", rgba.size, (255, 255, 255))
+        rgb.paste(rgba, mask=rgba.convert("RGBA").getchannel("A"))
     buffer = BytesIO()
-    
-    # Verifica se ci sono solo sezioni Live per usare portrait
-    table_sections_list_temp = list(table_sections or [])
-    live_section_titles = (
-        "Possesso - Attacco",
-        "Non Possesso - Difesa",
-        "Perse e Recuperate",
-        "Falli",
-    )
-    has_only_live = (
-        bool(table_sections_list_temp)
-        and all(sec.title in live_section_titles or sec.title in ("Risultato", "Timeline Gol") for sec in table_sections_list_temp)
-        and not image_sections
-    )
-    
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4 if has_only_live else landscape(A4),
-        leftMargin=25,
-        rightMargin=25,
-        topMargin=30,
-        bottomMargin=30,
-    )
+    if encoding.format == "jpeg":
+        rgb.save(buffer, format="JPEG", quality=quality, optimize=True, dpi=(dpi, dpi))
+    else:
+        rgb.quantize(colors=colors).save(buffer, format="PNG", optimize=True, dpi=(dpi, dpi))
+    return buffer.getvalue()
 
-    styles = getSampleStyleSheet()
-    # Font del titolo principale del report (centrato e leggermente più grande).
-    title_style = ParagraphStyle(
-        "ReportTitle",
-        parent=styles["Title"],
-        alignment=1,
-        fontSize=12,
-        spaceAfter=8,
-    )
-    # Font dei titoli di sezione all'interno del PDF.
-    section_title_style = ParagraphStyle(
-        "SectionTitle",
-        parent=styles["Heading4"],
-        fontSize=6,
-        leading=7,
-        spaceAfter=2,
-    )
 
-    # Stile delle tabelle: font ridimensionati e padding verticale contenuto.
-    header_font_size = 5 if compact_tables else 6
-    body_font_size = 5 if compact_tables else 6
-    small_header_font_size = 3 if compact_tables else 4
+def figure_to_image_bytes(fig: Figure, encoding: Union[str, ImageEncoding, None] = None, dpi: int = 150) -> bytes:
+    """Codifica una figura secondo il profilo, rispettando DPI massimo e budget.
 
-    table_style = TableStyle(
-        [
-            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e2e8f0")),
-            ("TEXTCOLOR", (0, 0), (-1, 0), colors.HexColor("#0f172a")),
-            ("ALIGN", (0, 0), (-1, 0), "CENTER"),
-            ("ALIGN", (0, 1), (-1, -1), "CENTER"),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            # Font dell'intestazione di tabella (riga 0).
-            ("FONTSIZE", (0, 0), (-1, 0), header_font_size),
-            # Font delle celle di dati (righe > 0).
-            ("FONTSIZE", (0, 1), (-1, -1), body_font_size),
-            ("TOPPADDING", (0, 0), (-1, 0), 0.8),
-            ("BOTTOMPADDING", (0, 0), (-1, 0), 0.8),
-            ("TOPPADDING", (0, 1), (-1, -1), 0.4),
-            ("BOTTOMPADDING", (0, 1), (-1, -1), 0.4),
-            ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#cbd5f5")),
-            ("BACKGROUND", (0, 1), (-1, -1), colors.white),
-        ]
-    )
-    
-    # Stile delle tabelle per stats individuali e quartetti: font più piccolo per le intestazioni
-    table_style_small_header = TableStyle(
-        [
-            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e2e8f0")),
-            ("TEXTCOLOR", (0, 0), (-1, 0), colors.HexColor("#0f172a")),
-            ("ALIGN", (0, 0), (-1, 0), "CENTER"),
-            ("ALIGN", (0, 1), (-1, -1), "CENTER"),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            # Font dell'intestazione di tabella (riga 0) - ridotto per stats individuali e quartetti.
-            ("FONTSIZE", (0, 0), (-1, 0), small_header_font_size),
-            # Font delle celle di dati (righe > 0).
-            ("FONTSIZE", (0, 1), (-1, -1), body_font_size),
-            ("TOPPADDING", (0, 0), (-1, 0), 0.8),
-            ("BOTTOMPADDING", (0, 0), (-1, 0), 0.8),
-            ("TOPPADDING", (0, 1), (-1, -1), 0.4),
-            ("BOTTOMPADDING", (0, 1), (-1, -1), 0.4),
-            ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#cbd5f5")),
-            ("BACKGROUND", (0, 1), (-1, -1), colors.white),
-        ]
-    )
+    Se l'immagine supera ``max_bytes`` si abbassa prima la qualità (JPEG) o il
+    numero di colori (PNG a palette), poi la risoluzione; se neanche a
+    ``min_dpi`` rientra nel budget viene restituita la versione più piccola.
+    """
+
+    encoding = get_image_profile(encoding)
+    if encoding.format == "svg":
+        buffer = BytesIO()
+        fig.savefig(buffer, format="svg", bbox_inches="tight")
+        return buffer.getvalue()
+
+    dpi = min(dpi, encoding.max_dpi)
+    quality, colors = encoding.quality, encoding.colors
+    data = _encode_raster(fig, encoding, dpi, quality, colors)
+    while encoding.max_bytes is not None and len(data) > encoding.max_bytes:
+        if encoding.format == "jpeg" and quality > 50:
+            quality -= 10
+        elif encoding.format == "png_palette" and colors > 32:
+            colors //= 2
+        elif dpi > encoding.min_dpi:
+            dpi = max(encoding.min_dpi, int(dpi * 0.8))
+        else:
+            break
+        data = _encode_raster(fig, encoding, dpi, quality, colors)
+    return data
 
-    available_width = doc.width
-    column_gap = 12
-    column_width = (available_width - (column_gap * 2)) / 3.0
 
-    elements: List = [Paragraph(title, title_style)]
+def image_extension(image_bytes: bytes) -> str:
+    """Estensione del formato dell'immagine (dai primi bytes)."""
 
-    table_sections_list: List[PdfTableSection] = list(table_sections or [])
+    if image_bytes[:3] == b"\xff\xd8\xff":
+        return "jpg"
+    if image_bytes[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if image_bytes.lstrip()[:1] == b"<":
+        return "svg"
+    return "img"
 
-    def pop_section_by_title(section_title: str) -> Optional[PdfTableSection]:
-        for idx, sec in enumerate(table_sections_list):
-            if sec.title == section_title:
-                return table_sections_list.pop(idx)
-        return None
 
-    def build_table_flowable(section: PdfTableSection, width: float, index_column: Optional[str] = None, use_small_header: bool = False) -> Table:
+class _LazyFlowable(Flowable):
+    """Segnaposto che crea il flowable reale solo quando ReportLab lo impagina.
+
+    ``doc.build`` riceve una lista di questi segnaposto leggeri: la tabella o la
+    riga di immagini viene costruita da ``factory`` al momento dell'impaginazione
+    e rilasciata appena disegnata.
+    """
+
+    def __init__(self, factory: Callable[[], Flowable]) -> None:
+        super().__init__()
+        self._factory = factory
+        self._flowable: Optional[Flowable] = None
+
+    def _real(self) -> Flowable:
+        if self._flowable is None:
+            self._flowable = self._factory()
+        return self._flowable
+
+    def getSpaceBefore(self) -> float:
+        return self._real().getSpaceBefore()
+
+    def getSpaceAfter(self) -> float:
+        return self._real().getSpaceAfter()
+
+    def wrap(self, availWidth: float, availHeight: float) -> Tuple[float, float]:
+        self.width, self.height = self._real().wrapOn(getattr(self, "canv", None), availWidth, availHeight)
+        return self.width, self.height
+
+    def split(self, availWidth: float, availHeight: float) -> List[Flowable]:
+        return self._real().splitOn(getattr(self, "canv", None), availWidth, availHeight)
+
+    def drawOn(self, canvas, x: float, y: float, _sW: float = 0) -> None:
+        flowable, self._flowable = self._real(), None
+        flowable.drawOn(canvas, x, y, _sW)
+
+
+# Titoli delle sezioni Live (da formattare in due colonne, report in verticale)
+LIVE_SECTION_TITLES = (
+    "Possesso - Attacco",
+    "Non Possesso - Difesa",
+    "Perse e Recuperate",
+    "Falli",
+)
+
+
+class StreamingPdfReport:
+    """Report PDF costruito a sezioni e scritto in streaming.
+
+    Le sezioni si aggiungono una alla volta con :meth:`add_table` e
+    :meth:`add_image`; le tabelle ReportLab vengono create solo al momento della
+    scrittura e le immagini, se ``spool_images`` è attivo, vengono subito
+    salvate su file temporanei e rilette solo quando vengono disegnate. In
+    memoria resta quindi solo il flowable in impaginazione anche per report di
+    stagione con centinaia di tabelle e grafici.
+
+    Esempio:
+        with StreamingPdfReport("Report Stagione", compact_tables=True) as report:
+            report.add_tables(pdf_table_sections)
+            for sezione in sezioni_immagini:
+                report.add_image(sezione)
+            pdf_bytes = report.to_bytes()
+    """
+
+    def __init__(self, title: str, compact_tables: bool = False, spool_images: bool = True) -> None:
+        self.title = title
+        self.compact_tables = compact_tables
+        self.spool_images = spool_images
+        self._table_sections: List[PdfTableSection] = []
+        self._image_sections: List[PdfImageSection] = []
+        self._spool_dir: Optional[tempfile.TemporaryDirectory] = None
+
+    def __enter__(self) -> "StreamingPdfReport":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def add_table(self, section: PdfTableSection) -> None:
+        self._table_sections.append(section)
+
+    def add_tables(self, sections: Iterable[PdfTableSection]) -> None:
+        for section in sections:
+            self.add_table(section)
+
+    def add_image(self, section: PdfImageSection) -> None:
+        """Aggiunge un'immagine; con ``spool_images`` i bytes vengono scritti su disco."""
+
+        if self.spool_images and section.image_bytes:
+            if self._spool_dir is None:
+                self._spool_dir = tempfile.TemporaryDirectory(prefix="report_pdf_")
+            extension = image_extension(section.image_bytes)
+            path = os.path.join(self._spool_dir.name, f"img_{len(self._image_sections):05d}.{extension}")
+            with open(path, "wb") as handle:
+                handle.write(section.image_bytes)
+            section = PdfImageSection(section.title, b"", section.max_width, image_path=path)
+        self._image_sections.append(section)
+
+    def add_images(self, sections: Iterable[PdfImageSection]) -> None:
+        for section in sections:
+            self.add_image(section)
+
+    def close(self) -> None:
+        """Elimina i file temporanei delle immagini."""
+
+        if self._spool_dir is not None:
+            self._spool_dir.cleanup()
+            self._spool_dir = None
+
+    def build(self, output: Union[str, BinaryIO]) -> None:
+        """Scrive il PDF su ``output`` (percorso o file binario aperto)."""
+
+        # Verifica se ci sono solo sezioni Live per usare portrait
+        has_only_live = (
+            bool(self._table_sections)
+            and all(sec.title in LIVE_SECTION_TITLES or sec.title in ("Risultato", "Timeline Gol") for sec in self._table_sections)
+            and not self._image_sections
+        )
+
+        doc = SimpleDocTemplate(
+            output,
+            pagesize=A4 if has_only_live else landscape(A4),
+            leftMargin=25,
+            rightMargin=25,
+            topMargin=30,
+            bottomMargin=30,
+        )
+        self._setup_layout(doc)
+        doc.build(list(self._iter_flowables()))
+
+    def to_bytes(self) -> bytes:
+        buffer = BytesIO()
+        self.build(buffer)
+        return buffer.getvalue()
+
+    # ------------------------------------------------------------------
+    # Stili e misure
+    # ------------------------------------------------------------------
+
+    def _setup_layout(self, doc: SimpleDocTemplate) -> None:
+        styles = getSampleStyleSheet()
+        # Font del titolo principale del report (centrato e leggermente più grande).
+        self._title_style = ParagraphStyle(
+            "ReportTitle",
+            parent=styles["Title"],
+            alignment=1,
+            fontSize=12,
+            spaceAfter=8,
+        )
+        # Font dei titoli di sezione all'interno del PDF.
+        self._section_title_style = ParagraphStyle(
+            "SectionTitle",
+            parent=styles["Heading4"],
+            fontSize=6,
+            leading=7,
+            spaceAfter=2,
+        )
+
+        # Stile delle tabelle: font ridimensionati e padding verticale contenuto.
+        header_font_size = 5 if self.compact_tables else 6
+        body_font_size = 5 if self.compact_tables else 6
+        small_header_font_size = 3 if self.compact_tables else 4
+
+        self._table_style = TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e2e8f0")),
+                ("TEXTCOLOR", (0, 0), (-1, 0), colors.HexColor("#0f172a")),
+                ("ALIGN", (0, 0), (-1, 0), "CENTER"),
+                ("ALIGN", (0, 1), (-1, -1), "CENTER"),
+                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+                # Font dell'intestazione di tabella (riga 0).
+                ("FONTSIZE", (0, 0), (-1, 0), header_font_size),
+                # Font delle celle di dati (righe > 0).
+                ("FONTSIZE", (0, 1), (-1, -1), body_font_size),
+                ("TOPPADDING", (0, 0), (-1, 0), 0.8),
+                ("BOTTOMPADDING", (0, 0), (-1, 0), 0.8),
+                ("TOPPADDING", (0, 1), (-1, -1), 0.4),
+                ("BOTTOMPADDING", (0, 1), (-1, -1), 0.4),
+                ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#cbd5f5")),
+                ("BACKGROUND", (0, 1), (-1, -1), colors.white),
+            ]
+        )
+
+        # Stile delle tabelle per stats individuali e quartetti: font più piccolo per le intestazioni
+        self._table_style_small_header = TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e2e8f0")),
+                ("TEXTCOLOR", (0, 0), (-1, 0), colors.HexColor("#0f172a")),
+                ("ALIGN", (0, 0), (-1, 0), "CENTER"),
+                ("ALIGN", (0, 1), (-1, -1), "CENTER"),
+                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+                # Font dell'intestazione di tabella (riga 0) - ridotto per stats individuali e quartetti.
+                ("FONTSIZE", (0, 0), (-1, 0), small_header_font_size),
+                # Font delle celle di dati (righe > 0).
+                ("FONTSIZE", (0, 1), (-1, -1), body_font_size),
+                ("TOPPADDING", (0, 0), (-1, 0), 0.8),
+                ("BOTTOMPADDING", (0, 0), (-1, 0), 0.8),
+                ("TOPPADDING", (0, 1), (-1, -1), 0.4),
+                ("BOTTOMPADDING", (0, 1), (-1, -1), 0.4),
+                ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#cbd5f5")),
+                ("BACKGROUND", (0, 1), (-1, -1), colors.white),
+            ]
+        )
+
+        self._available_width = doc.width
+        self._column_gap = 12
+        self._column_width = (self._available_width - (self._column_gap * 2)) / 3.0
+
+    # ------------------------------------------------------------------
+    # Tabelle
+    # ------------------------------------------------------------------
+
+    def _build_table_flowable(self, section: PdfTableSection, width: float, index_column: Optional[str] = None, use_small_header: bool = False) -> Table:
         df = section.dataframe
         if df.empty:
             df = pd.DataFrame([[]])
         table_data = _dataframe_to_table_data(df, index_column=index_column)
         num_cols = len(table_data[0]) if table_data else 1
-        
+
         # Per le stats quartetti e minutaggi quartetti, allarga la prima colonna (indice con nomi giocatori) e restringe le altre
         is_quartetti = section.title.startswith(("Stats Quartetti", "Quinto Uomo"))
         is_minutaggi_quartetti = "Minutaggi" in section.title and "Quartetti" in section.title
@@ -311,18 +608,18 @@ def generate_pdf_report(
         else:
             # Distribuzione equa per le altre tabelle
             col_widths = [width / num_cols] * num_cols
-        
+
         data_table = Table(table_data, colWidths=col_widths, hAlign="LEFT", repeatRows=1)
         # Usa lo stile con header più piccolo se richiesto
-        style_to_use = table_style_small_header if use_small_header else table_style
+        style_to_use = self._table_style_small_header if use_small_header else self._table_style
         data_table.setStyle(style_to_use)
         return data_table
 
-    def build_section_table(section: PdfTableSection, width: float, index_column: Optional[str] = None, use_small_header: bool = False) -> Table:
+    def _build_section_table(self, section: PdfTableSection, width: float, index_column: Optional[str] = None, use_small_header: bool = False) -> Table:
         section_table = Table(
             [
-                [Paragraph(section.title, section_title_style)],
-                [build_table_flowable(section, width, index_column=index_column, use_small_header=use_small_header)],
+                [Paragraph(section.title, self._section_title_style)],
+                [self._build_table_flowable(section, width, index_column=index_column, use_small_header=use_small_header)],
             ],
             colWidths=[width],
             hAlign="LEFT",
@@ -340,35 +637,13 @@ def generate_pdf_report(
         )
         return section_table
 
-    # Sezione centrale con Risultato, Timeline e Durata Partita, se disponibili
-    result_section = pop_section_by_title("Risultato")
-    timeline_section = pop_section_by_title("Timeline Gol")
-    durata_section = pop_section_by_title("Minutaggi - Durata Partita")
-    summary_rendered = False
-    if result_section or timeline_section or durata_section:
-        if result_section:
-            result_table = build_section_table(result_section, column_width)
-            result_table.hAlign = "CENTER"
-            elements.append(result_table)
-            elements.append(Spacer(1, 6))
-        if timeline_section:
-            timeline_table = build_section_table(timeline_section, column_width)
-            timeline_table.hAlign = "CENTER"
-            elements.append(timeline_table)
-            elements.append(Spacer(1, 6))
-        if durata_section:
-            durata_table = build_section_table(durata_section, column_width)
-            durata_table.hAlign = "CENTER"
-            elements.append(durata_table)
-            elements.append(Spacer(1, 12))
-        summary_rendered = True
-
-    def get_index_column_for_minutaggi(section: PdfTableSection) -> Optional[str]:
+    @staticmethod
+    def _get_index_column_for_minutaggi(section: PdfTableSection) -> Optional[str]:
         """Determina quale colonna usare come indice per i minutaggi."""
         df = section.dataframe
         if df.empty:
             return None
-        
+
         # Cerca le colonne possibili per l'indice
         # Nota: dopo format_column_names, "Giocatori_movimento" diventa "Giocatori Movimento"
         possible_index_cols = [
@@ -382,299 +657,149 @@ def generate_pdf_report(
                 return col
         return None
 
-    def render_sections_columns(sections: List[PdfTableSection], use_index_column: bool = False) -> None:
-        """Rende le sezioni su tre colonne con piccoli spazi tra le tabelle."""
-        if not sections:
-            return
-        
-        # Se sono minutaggi, ordina le sezioni in modo specifico
-        if use_index_column:
-            def sort_key_minutaggi(section: PdfTableSection) -> tuple:
-                title = section.title
-                # Ordina per tipo (Singoli prima, poi Quartetti)
-                if "Singoli" in title:
-                    tipo_order = 0
-                elif "Quartetti" in title or "Quartetto" in title:
-                    tipo_order = 1
-                else:
-                    tipo_order = 2
-                
-                # Ordina per periodo (Totale, Primo tempo, Secondo tempo)
-                if "Totale" in title:
-                    periodo_order = 0
-                elif "Primo tempo" in title or "1T" in title:
-                    periodo_order = 1
-                elif "Secondo tempo" in title or "2T" in title:
-                    periodo_order = 2
-                else:
-                    periodo_order = 3
-                
-                return (tipo_order, periodo_order)
-            
-            sections = sorted(sections, key=sort_key_minutaggi)
-        
-        row_cells: List = []
-        column_sections: List[List] = []
-        wide_sections: List[PdfTableSection] = []
-
-        for section in sections:
-            if section.dataframe.shape[0] > 18:
-                wide_sections.append(section)
-                continue
-            
-            # Determina la colonna indice se necessario
-            index_col = None
-            if use_index_column:
-                index_col = get_index_column_for_minutaggi(section)
-            
-            row_cells.append(build_section_table(section, column_width, index_column=index_col))
-            if len(row_cells) == 3:
-                column_sections.append(row_cells)
-                row_cells = []
-
-        if row_cells:
-            while len(row_cells) < 3:
-                row_cells.append("")
-            column_sections.append(row_cells)
-
-        for row in column_sections:
-            row_data = []
-            col_widths = []
-            for idx, cell in enumerate(row):
-                row_data.append(cell)
-                col_widths.append(column_width)
-                if idx < len(row) - 1:
-                    row_data.append("")
-                    col_widths.append(column_gap)
-            grid = Table(
-                [row_data],
-                colWidths=col_widths,
-                hAlign="CENTER",
-            )
-            grid.setStyle(
-                TableStyle(
-                    [
-                        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                        ("LEFTPADDING", (0, 0), (-1, -1), 4),
-                        ("RIGHTPADDING", (0, 0), (-1, -1), 4),
-                    ]
-                )
+    @staticmethod
+    def _sort_key_minutaggi(section: PdfTableSection) -> tuple:
+        title = section.title
+        # Ordina per tipo (Singoli prima, poi Quartetti)
+        if "Singoli" in title:
+            tipo_order = 0
+        elif "Quartetti" in title or "Quartetto" in title:
+            tipo_order = 1
+        else:
+            tipo_order = 2
+
+        # Ordina per periodo (Totale, Primo tempo, Secondo tempo)
+        if "Totale" in title:
+            periodo_order = 0
+        elif "Primo tempo" in title or "1T" in title:
+            periodo_order = 1
+        elif "Secondo tempo" in title or "2T" in title:
+            periodo_order = 2
+        else:
+            periodo_order = 3
+
+        return (tipo_order, periodo_order)
+
+    def _grid_row(self, cells: List, width: float) -> Table:
+        """Affianca le celle di una riga separandole con lo spazio tra colonne."""
+        row_data = []
+        col_widths = []
+        for idx, cell in enumerate(cells):
+            row_data.append(cell)
+            col_widths.append(width)
+            if idx < len(cells) - 1:
+                row_data.append("")
+                col_widths.append(self._column_gap)
+        grid = Table(
+            [row_data],
+            colWidths=col_widths,
+            hAlign="CENTER",
+        )
+        grid.setStyle(
+            TableStyle(
+                [
+                    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+                    ("LEFTPADDING", (0, 0), (-1, -1), 4),
+                    ("RIGHTPADDING", (0, 0), (-1, -1), 4),
+                ]
             )
-            elements.append(grid)
-            elements.append(Spacer(1, 6))
+        )
+        return grid
 
-        for section in wide_sections:
-            # Determina la colonna indice se necessario
-            index_col = None
-            if use_index_column:
-                index_col = get_index_column_for_minutaggi(section)
-            table_full = build_section_table(section, available_width, index_column=index_col)
-            table_full.hAlign = "CENTER"
-            elements.append(table_full)
-            elements.append(Spacer(1, 8))
-
-    def render_sections_columns_2(sections: List[PdfTableSection]) -> None:
-        """Rende le sezioni su due colonne con piccoli spazi tra le tabelle."""
+    def _iter_sections_grid(self, sections: List[PdfTableSection], n_columns: int, use_index_column: bool = False) -> Iterator:
+        """Rende le sezioni su ``n_columns`` colonne con piccoli spazi tra le tabelle.
+
+        Le sezioni con più di 18 righe vengono rese a tutta larghezza dopo la griglia.
+        """
         if not sections:
             return
-        # Calcola larghezza colonna per 2 colonne
-        column_width_2 = (available_width - column_gap) / 2.0
-        row_cells: List = []
-        column_sections: List[List] = []
-        wide_sections: List[PdfTableSection] = []
-
-        for section in sections:
-            if section.dataframe.shape[0] > 18:
-                wide_sections.append(section)
-                continue
-            row_cells.append(build_section_table(section, column_width_2))
-            if len(row_cells) == 2:
-                column_sections.append(row_cells)
-                row_cells = []
-
-        if row_cells:
-            while len(row_cells) < 2:
-                row_cells.append("")
-            column_sections.append(row_cells)
-
-        for row in column_sections:
-            row_data = []
-            col_widths = []
-            for idx, cell in enumerate(row):
-                row_data.append(cell)
-                col_widths.append(column_width_2)
-                if idx < len(row) - 1:
-                    row_data.append("")
-                    col_widths.append(column_gap)
-            grid = Table(
-                [row_data],
-                colWidths=col_widths,
-                hAlign="CENTER",
-            )
-            grid.setStyle(
-                TableStyle(
-                    [
-                        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                        ("LEFTPADDING", (0, 0), (-1, -1), 4),
-                        ("RIGHTPADDING", (0, 0), (-1, -1), 4),
-                    ]
-                )
-            )
-            elements.append(grid)
-            elements.append(Spacer(1, 6))
 
-        for section in wide_sections:
-            table_full = build_section_table(section, available_width)
-            table_full.hAlign = "CENTER"
-            elements.append(table_full)
-            elements.append(Spacer(1, 8))
+        # Se sono minutaggi, ordina le sezioni in modo specifico
+        if use_index_column:
+            sections = sorted(sections, key=self._sort_key_minutaggi)
 
-    def render_sections_columns_4(sections: List[PdfTableSection]) -> None:
-        """Rende le sezioni su quattro colonne con piccoli spazi tra le tabelle."""
-        if not sections:
-            return
-        # Calcola larghezza colonna per 4 colonne
-        column_width_4 = (available_width - (column_gap * 3)) / 4.0
-        row_cells: List = []
-        column_sections: List[List] = []
+        width = (self._available_width - (self._column_gap * (n_columns - 1))) / float(n_columns)
+        row_sections: List[PdfTableSection] = []
+        grid_rows: List[List[PdfTableSection]] = []
         wide_sections: List[PdfTableSection] = []
 
         for section in sections:
             if section.dataframe.shape[0] > 18:
                 wide_sections.append(section)
                 continue
-            row_cells.append(build_section_table(section, column_width_4))
-            if len(row_cells) == 4:
-                column_sections.append(row_cells)
-                row_cells = []
-
-        if row_cells:
-            while len(row_cells) < 4:
-                row_cells.append("")
-            column_sections.append(row_cells)
-
-        for row in column_sections:
-            row_data = []
-            col_widths = []
-            for idx, cell in enumerate(row):
-                row_data.append(cell)
-                col_widths.append(column_width_4)
-                if idx < len(row) - 1:
-                    row_data.append("")
-                    col_widths.append(column_gap)
-            grid = Table(
-                [row_data],
-                colWidths=col_widths,
-                hAlign="CENTER",
-            )
-            grid.setStyle(
-                TableStyle(
-                    [
-                        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                        ("LEFTPADDING", (0, 0), (-1, -1), 4),
-                        ("RIGHTPADDING", (0, 0), (-1, -1), 4),
-                    ]
-                )
-            )
-            elements.append(grid)
-            elements.append(Spacer(1, 6))
+            row_sections.append(section)
+            if len(row_sections) == n_columns:
+                grid_rows.append(row_sections)
+                row_sections = []
+        if row_sections:
+            grid_rows.append(row_sections)
+
+        # Le tabelle di ogni riga vengono costruite solo quando la riga viene scritta
+        for row in grid_rows:
+            yield _LazyFlowable(partial(self._build_sections_row, row, width, n_columns, use_index_column))
+            yield Spacer(1, 6)
 
         for section in wide_sections:
-            table_full = build_section_table(section, available_width)
-            table_full.hAlign = "CENTER"
-            elements.append(table_full)
-            elements.append(Spacer(1, 8))
+            # Determina la colonna indice se necessario
+            index_col = self._get_index_column_for_minutaggi(section) if use_index_column else None
+            yield _LazyFlowable(partial(self._build_centered_table, section, self._available_width, index_column=index_col))
+            yield Spacer(1, 8)
 
-    def render_sections_single(sections: List[PdfTableSection], use_small_header: bool = False) -> None:
+    def _build_sections_row(self, row: List[PdfTableSection], width: float, n_columns: int, use_index_column: bool) -> Table:
+        cells: List = []
+        for section in row:
+            # Determina la colonna indice se necessario
+            index_col = self._get_index_column_for_minutaggi(section) if use_index_column else None
+            cells.append(self._build_section_table(section, width, index_column=index_col))
+        while len(cells) < n_columns:
+            cells.append("")
+        return self._grid_row(cells, width)
+
+    def _build_centered_table(self, section: PdfTableSection, width: float, **kwargs) -> Table:
+        table = self._build_section_table(section, width, **kwargs)
+        table.hAlign = "CENTER"
+        return table
+
+    def _iter_sections_single(self, sections: List[PdfTableSection], use_small_header: bool = False) -> Iterator:
         """Rende ogni sezione a tutta larghezza (una colonna)."""
         for section in sections:
-            table_full = build_section_table(section, available_width, use_small_header=use_small_header)
-            table_full.hAlign = "CENTER"
-            elements.append(table_full)
-            elements.append(Spacer(1, 6))
-
-    # Suddivide le restanti sezioni per gruppo logico.
-    team_sections: List[PdfTableSection] = []
-    individual_sections: List[PdfTableSection] = []
-    quartetti_sections: List[PdfTableSection] = []
-    minutaggi_sections: List[PdfTableSection] = []
-    live_sections: List[PdfTableSection] = []
-    top5_sections: List[PdfTableSection] = []
-    other_sections: List[PdfTableSection] = []
-
-    # Titoli delle sezioni Live (da formattare in tre colonne)
-    live_section_titles = (
-        "Possesso - Attacco",
-        "Non Possesso - Difesa",
-        "Perse e Recuperate",
-        "Falli",
-    )
-
-    for section in table_sections_list:
-        title = section.title
-        if title.startswith("Stats Squadra"):
-            team_sections.append(section)
-        elif title.startswith(("Stats Individuali", "Stats Portieri Individuali")):
-            individual_sections.append(section)
-        elif title.startswith(("Stats Quartetti", "Quinto Uomo")):
-            quartetti_sections.append(section)
-        elif title.startswith("Minutaggi") and title != "Minutaggi - Durata Partita":
-            minutaggi_sections.append(section)
-        elif title in live_section_titles:
-            live_sections.append(section)
-        elif title.startswith("Top 5"):
-            top5_sections.append(section)
-        else:
-            other_sections.append(section)
-
-    groups: List[Tuple[str, List[PdfTableSection], Callable]] = [
-        ("Stats Squadra", team_sections, lambda s: render_sections_columns(s, use_index_column=False)),
-        ("Top 5", top5_sections, render_sections_columns_4),
-        ("Stats Individuali", individual_sections, lambda s: render_sections_single(s, use_small_header=True)),
-        ("Stats Quartetti", quartetti_sections, lambda s: render_sections_single(s, use_small_header=True)),
-        ("Minutaggi", minutaggi_sections, lambda s: render_sections_columns(s, use_index_column=True)),
-        ("Live", live_sections, render_sections_columns_2),
-        ("Altro", other_sections, render_sections_single),
-    ]
+            yield _LazyFlowable(partial(self._build_centered_table, section, self._available_width, use_small_header=use_small_header))
+            yield Spacer(1, 6)
+
+    # ------------------------------------------------------------------
+    # Immagini
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _extract_player_name(title: str) -> Optional[str]:
+        """Estrae il nome del giocatore dal titolo se è una zona individuale."""
+        if title.startswith("Zone ") and (" Attacco - " in title or " Difesa - " in title):
+            # Formato: "Zone {giocatore} Attacco - ..." o "Zone {giocatore} Difesa - ..."
+            parts = title.split(" ")
+            if len(parts) >= 2:
+                # Trova la parte dopo "Zone" e prima di "Attacco" o "Difesa"
+                player_parts = []
+                for part in parts[1:]:
+                    if part in ("Attacco", "Difesa"):
+                        break
+                    player_parts.append(part)
+                if player_parts:
+                    return " ".join(player_parts)
+        return None
 
-    content_started = summary_rendered
+    def _image_rows(self) -> List[List[PdfImageSection]]:
+        """Dispone le immagini in righe da 3; ogni giocatore inizia su una nuova riga."""
 
-    for _, sections, renderer in groups:
-        if not sections:
-            continue
-        if content_started:
-            elements.append(PageBreak())
-        renderer(sections)
-        content_started = True
-
-    if image_sections:
         # Filtra le sezioni valide
-        valid_sections = [s for s in image_sections if s.image_bytes]
-        
-        # Raggruppa le immagini per giocatore (per le zone individuali)
-        def extract_player_name(title: str) -> Optional[str]:
-            """Estrae il nome del giocatore dal titolo se è una zona individuale."""
-            if title.startswith("Zone ") and (" Attacco - " in title or " Difesa - " in title):
-                # Formato: "Zone {giocatore} Attacco - ..." o "Zone {giocatore} Difesa - ..."
-                parts = title.split(" ")
-                if len(parts) >= 2:
-                    # Trova la parte dopo "Zone" e prima di "Attacco" o "Difesa"
-                    player_parts = []
-                    for i, part in enumerate(parts[1:], 1):
-                        if part in ("Attacco", "Difesa"):
-                            break
-                        player_parts.append(part)
-                    if player_parts:
-                        return " ".join(player_parts)
-            return None
-        
-        # Raggruppa per giocatore
+        valid_sections = [s for s in self._image_sections if s.image_bytes or s.image_path]
+
+        # Raggruppa per giocatore (per le zone individuali)
         player_groups: List[List[PdfImageSection]] = []
         current_player: Optional[str] = None
         current_group: List[PdfImageSection] = []
-        
+
         for section in valid_sections:
-            player = extract_player_name(section.title)
+            player = self._extract_player_name(section.title)
             if player:
                 # È una zona individuale
                 if current_player is None:
@@ -696,138 +821,216 @@ def generate_pdf_report(
                     player_groups.append(current_group)
                     current_group = []
                 player_groups.append([section])
-        
+
         # Aggiungi l'ultimo gruppo
         if current_group:
             player_groups.append(current_group)
-        
-        # Organizza i gruppi in righe di 3, assicurandosi che ogni giocatore inizi su una nuova riga
+
         image_rows: List[List[PdfImageSection]] = []
         current_row: List[PdfImageSection] = []
-        
+
         for group in player_groups:
             # Se aggiungere questo gruppo alla riga corrente la farebbe superare 3, inizia una nuova riga
             if len(current_row) + len(group) > 3:
                 if current_row:
                     image_rows.append(current_row)
                 current_row = []
-            
+
             # Aggiungi le immagini del gruppo alla riga corrente
             for section in group:
                 current_row.append(section)
                 if len(current_row) == 3:
                     image_rows.append(current_row)
                     current_row = []
-        
+
         # Aggiungi l'ultima riga se non è vuota
         if current_row:
             image_rows.append(current_row)
-        
-        # Organizza le righe in pagine di 2 righe (6 immagini)
-        images_per_page = 6
-        image_pages: List[List[List[PdfImageSection]]] = []
-        
-        for i in range(0, len(image_rows), 2):
-            page_rows = image_rows[i:i + 2]
-            # Appiattisci le righe in una lista di immagini per la pagina
-            page_images = []
-            for row in page_rows:
-                page_images.extend(row)
-            image_pages.append(page_images)
-        
-        def build_image_cell(section: PdfImageSection) -> Table:
-            """Crea una cella con l'immagine."""
-            img_buffer_reader = BytesIO(section.image_bytes)
-            img_reader = ImageReader(img_buffer_reader)
-            img_width, img_height = img_reader.getSize()
-            # Usa la larghezza della colonna come max_width per sfruttare meglio lo spazio
-            max_width = column_width - 10  # Lascia un piccolo margine
-            
-            if img_width > max_width:
-                ratio = max_width / float(img_width)
-                img_width = max_width
-                img_height = img_height * ratio
-            
-            # Crea un nuovo buffer per l'immagine finale
-            img_buffer = BytesIO(section.image_bytes)
-            
-            # Crea una tabella per ogni sezione (solo immagine, senza titolo)
-            section_cell = Table(
+
+        return image_rows
+
+    def _build_image_cell(self, section: PdfImageSection) -> Table:
+        """Crea una cella con l'immagine, letta dal file o dai bytes solo ora."""
+        column_width = self._column_width
+        # Usa la larghezza della colonna come max_width per sfruttare meglio lo spazio
+        max_width = column_width - 10  # Lascia un piccolo margine
+
+        if self._is_svg(section):
+            image = self._build_svg_drawing(section, max_width)
+        else:
+            image = self._build_raster_image(section, max_width)
+
+        # Crea una tabella per ogni sezione (solo immagine, senza titolo)
+        section_cell = Table(
+            [
+                [image],
+            ],
+            colWidths=[column_width],
+            hAlign="CENTER",
+        )
+        section_cell.setStyle(
+            TableStyle(
                 [
-                    [Image(img_buffer, width=img_width, height=img_height, hAlign="CENTER")],
-                ],
-                colWidths=[column_width],
-                hAlign="CENTER",
-            )
-            section_cell.setStyle(
-                TableStyle(
-                    [
-                        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                        ("LEFTPADDING", (0, 0), (-1, -1), 0),
-                        ("RIGHTPADDING", (0, 0), (-1, -1), 0),
-                        ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
-                        ("TOPPADDING", (0, 0), (-1, -1), 0),
-                    ]
-                )
-            )
-            return section_cell
-        
-        def build_image_row(images: List[PdfImageSection]) -> Table:
-            """Crea una riga con fino a 3 immagini."""
-            row_data = []
-            col_widths = []
-            
-            for idx, section in enumerate(images):
-                section_cell = build_image_cell(section)
-                row_data.append(section_cell)
-                col_widths.append(column_width)
-                
-                # Aggiungi gap tra le colonne (tranne l'ultima)
-                if idx < len(images) - 1:
-                    row_data.append("")
-                    col_widths.append(column_gap)
-            
-            # Riempi le colonne mancanti se la riga non è completa
-            while len(row_data) < 5:  # 3 colonne + 2 gap = 5 elementi
-                if len(row_data) % 2 == 0:  # Posizione pari = colonna
-                    row_data.append("")
-                    col_widths.append(column_width)
-                else:  # Posizione dispari = gap
-                    row_data.append("")
-                    col_widths.append(column_gap)
-            
-            # Crea la tabella della riga
-            row_table = Table(
-                [row_data],
-                colWidths=col_widths,
-                hAlign="CENTER",
-            )
-            row_table.setStyle(
-                TableStyle(
-                    [
-                        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                        ("LEFTPADDING", (0, 0), (-1, -1), 4),
-                        ("RIGHTPADDING", (0, 0), (-1, -1), 4),
-                    ]
-                )
+                    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+                    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                    ("LEFTPADDING", (0, 0), (-1, -1), 0),
+                    ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+                    ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+                    ("TOPPADDING", (0, 0), (-1, -1), 0),
+                ]
             )
-            return row_table
-        
-        # Renderizza le righe di immagini
-        for row_idx, row_images in enumerate(image_rows):
+        )
+        return section_cell
+
+    @staticmethod
+    def _is_svg(section: PdfImageSection) -> bool:
+        if section.image_path:
+            return section.image_path.endswith(".svg")
+        return image_extension(section.image_bytes) == "svg"
+
+    @staticmethod
+    def _build_svg_drawing(section: PdfImageSection, max_width: float):
+        """Grafico vettoriale: il disegno SVG viene convertito in una Drawing ReportLab."""
+
+        drawing = svg2rlg(section.image_path or BytesIO(section.image_bytes))
+        if drawing.width > max_width:
+            ratio = max_width / float(drawing.width)
+            drawing.scale(ratio, ratio)
+            drawing.width *= ratio
+            drawing.height *= ratio
+        drawing.hAlign = "CENTER"
+        return drawing
+
+    @staticmethod
+    def _build_raster_image(section: PdfImageSection, max_width: float) -> Image:
+        source = section.image_path or BytesIO(section.image_bytes)
+        img_width, img_height = ImageReader(source).getSize()
+
+        if img_width > max_width:
+            ratio = max_width / float(img_width)
+            img_width = max_width
+            img_height = img_height * ratio
+
+        if section.image_path:
+            # lazy=2: il file viene aperto al momento del disegno e richiuso subito dopo
+            image = Image(section.image_path, width=img_width, height=img_height, hAlign="CENTER", lazy=2)
+        else:
+            image = Image(BytesIO(section.image_bytes), width=img_width, height=img_height, hAlign="CENTER")
+        return image
+
+    def _build_image_row(self, images: List[PdfImageSection]) -> Table:
+        """Crea una riga con fino a 3 immagini."""
+        cells: List = [self._build_image_cell(section) for section in images]
+        # Riempi le colonne mancanti se la riga non è completa
+        while len(cells) < 3:
+            cells.append("")
+        return self._grid_row(cells, self._column_width)
+
+    # ------------------------------------------------------------------
+    # Sequenza dei flowable
+    # ------------------------------------------------------------------
+
+    def _iter_flowables(self) -> Iterator:
+        yield Paragraph(self.title, self._title_style)
+
+        table_sections_list: List[PdfTableSection] = list(self._table_sections)
+
+        def pop_section_by_title(section_title: str) -> Optional[PdfTableSection]:
+            for idx, sec in enumerate(table_sections_list):
+                if sec.title == section_title:
+                    return table_sections_list.pop(idx)
+            return None
+
+        # Sezione centrale con Risultato, Timeline e Durata Partita, se disponibili
+        result_section = pop_section_by_title("Risultato")
+        timeline_section = pop_section_by_title("Timeline Gol")
+        durata_section = pop_section_by_title("Minutaggi - Durata Partita")
+        summary_rendered = False
+        if result_section or timeline_section or durata_section:
+            if result_section:
+                yield _LazyFlowable(partial(self._build_centered_table, result_section, self._column_width))
+                yield Spacer(1, 6)
+            if timeline_section:
+                yield _LazyFlowable(partial(self._build_centered_table, timeline_section, self._column_width))
+                yield Spacer(1, 6)
+            if durata_section:
+                yield _LazyFlowable(partial(self._build_centered_table, durata_section, self._column_width))
+                yield Spacer(1, 12)
+            summary_rendered = True
+
+        # Suddivide le restanti sezioni per gruppo logico.
+        team_sections: List[PdfTableSection] = []
+        individual_sections: List[PdfTableSection] = []
+        quartetti_sections: List[PdfTableSection] = []
+        minutaggi_sections: List[PdfTableSection] = []
+        live_sections: List[PdfTableSection] = []
+        top5_sections: List[PdfTableSection] = []
+        other_sections: List[PdfTableSection] = []
+
+        for section in table_sections_list:
+            title = section.title
+            if title.startswith("Stats Squadra"):
+                team_sections.append(section)
+            elif title.startswith(("Stats Individuali", "Stats Portieri Individuali")):
+                individual_sections.append(section)
+            elif title.startswith(("Stats Quartetti", "Quinto Uomo")):
+                quartetti_sections.append(section)
+            elif title.startswith("Minutaggi") and title != "Minutaggi - Durata Partita":
+                minutaggi_sections.append(section)
+            elif title in LIVE_SECTION_TITLES:
+                live_sections.append(section)
+            elif title.startswith("Top 5"):
+                top5_sections.append(section)
+            else:
+                other_sections.append(section)
+
+        groups: List[Tuple[str, List[PdfTableSection], Callable[[List[PdfTableSection]], Iterator]]] = [
+            ("Stats Squadra", team_sections, lambda s: self._iter_sections_grid(s, 3)),
+            ("Top 5", top5_sections, lambda s: self._iter_sections_grid(s, 4)),
+            ("Stats Individuali", individual_sections, lambda s: self._iter_sections_single(s, use_small_header=True)),
+            ("Stats Quartetti", quartetti_sections, lambda s: self._iter_sections_single(s, use_small_header=True)),
+            ("Minutaggi", minutaggi_sections, lambda s: self._iter_sections_grid(s, 3, use_index_column=True)),
+            ("Live", live_sections, lambda s: self._iter_sections_grid(s, 2)),
+            ("Altro", other_sections, self._iter_sections_single),
+        ]
+
+        content_started = summary_rendered
+
+        for _, sections, renderer in groups:
+            if not sections:
+                continue
+            if content_started:
+                yield PageBreak()
+            yield from renderer(sections)
+            content_started = True
+
+        # Renderizza le righe di immagini, due righe (6 immagini) per pagina
+        for row_idx, row_images in enumerate(self._image_rows()):
             # Se è la prima riga e c'è già contenuto, o se è una nuova pagina (ogni 2 righe)
             if (content_started and row_idx == 0) or (row_idx > 0 and row_idx % 2 == 0):
-                elements.append(PageBreak())
-            
+                yield PageBreak()
+
             if row_images:
-                row_table = build_image_row(row_images)
-                elements.append(row_table)
-                elements.append(Spacer(1, 6))
-            
+                yield _LazyFlowable(partial(self._build_image_row, row_images))
+                yield Spacer(1, 6)
+
             content_started = True
 
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer.read()
 
+def generate_pdf_report(
+    title: str,
+    table_sections: Optional[Sequence[PdfTableSection]] = None,
+    image_sections: Optional[Iterable[PdfImageSection]] = None,
+    compact_tables: bool = False,
+) -> bytes:
+    """Genera un PDF con sezioni tabellari e immagini.
+
+    ``image_sections`` può essere anche un generatore: ogni immagine viene
+    riversata su un file temporaneo appena prodotta e riletta solo quando viene
+    disegnata, quindi i grafici non restano mai tutti in memoria.
+    """
+
+    with StreamingPdfReport(title, compact_tables=compact_tables) as report:
+        report.add_tables(table_sections or [])
+        report.add_images(image_sections or [])
+        return report.to_bytes()
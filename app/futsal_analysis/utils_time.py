@@ -235,4 +235,109 @@ def filtra_per_tempo(df, periodo):
     elif periodo == 'Secondo tempo':
         return df[df['Periodo'] == 'Secondo tempo'].reset_index(drop=True)
     else:
-        raise ValueError("Periodo non valido. Usa 'Primo tempo' o 'Secondo tempo'")
\ No newline at end of file
+        raise ValueError("Periodo non valido. Usa 'Primo tempo' o 'Secondo tempo'")
+
+# ---------- Tempi salvati con gli eventi (calcolati una volta al caricamento) ----------
+
+# Colonne numeriche della tabella eventi: codice del periodo e tempi in secondi
+COLONNE_TEMPI = ['periodo_cod', 'tempo_effettivo_sec', 'tempo_reale_sec']
+PERIODO_CODICI = {'Intervallo': 0, 'Primo tempo': 1, 'Secondo tempo': 2}
+PERIODO_DA_CODICE = {codice: periodo for periodo, codice in PERIODO_CODICI.items()}
+
+
+def _tempi_numerici_single(df_single):
+    """Stesse regole di tag_primo_secondo_tempo / calcola_tempo_effettivo / calcola_tempo_reale, vettoriali."""
+    n = len(df_single)
+    eventi = df_single['evento'].to_numpy()
+    td = pd.to_timedelta(df_single['posizione'], errors='coerce').to_numpy()
+    sec = td / np.timedelta64(1, 's')
+    pos = np.arange(n)
+
+    def secondi_da(t0):
+        # Differenza sui timedelta (interi in ns) e poi troncata, come differenza_tempi:
+        # sottrarre i secondi float può finire un secondo sotto
+        return np.trunc((td - t0) / np.timedelta64(1, 's'))
+
+    fine_primo = np.flatnonzero(eventi == 'Fine primo tempo')
+    if len(fine_primo) == 0:
+        periodo = np.ones(n, dtype='int64')
+        reale = secondi_da(td[0])
+        effettivo = np.full(n, np.nan)
+    else:
+        idx_fp = fine_primo[0]
+        inizio_secondo = np.flatnonzero(eventi == 'Inizio secondo tempo')
+        idx_ss = inizio_secondo[0] if len(inizio_secondo) else None
+        if idx_ss is None or idx_ss <= idx_fp:
+            idx_ss = idx_fp + 1 if idx_fp + 1 < n else n
+        fine_partita = np.flatnonzero(eventi == 'Fine partita')
+        idx_end = fine_partita[0] if len(fine_partita) else n - 1
+
+        primo = pos <= idx_fp
+        secondo = (pos >= idx_ss) & (idx_ss < n)
+        periodo = np.where(primo, 1, np.where(secondo, 2, 0))
+
+        t_start = sec[0]
+        t_ss = sec[idx_ss] if idx_ss < n else sec[idx_fp]
+        td_ss = td[idx_ss] if idx_ss < n else td[idx_fp]
+        reale = np.where(primo, secondi_da(td[0]), np.where(secondo, secondi_da(td_ss), np.nan))
+
+        # Percentuale del tempo trascorso nel periodo, riportata su 20 minuti
+        # (come l'originale: posizione non valida = periodo finito)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            denom_1 = sec[idx_fp] - t_start
+            denom_2 = sec[idx_end] - t_ss
+            perc_1 = np.nan_to_num(np.clip((sec - t_start) / denom_1, 0, 1), nan=1.0)
+            perc_2 = np.nan_to_num(np.clip((sec - t_ss) / denom_2, 0, 1), nan=1.0)
+        eff_1 = np.zeros(n) if not denom_1 > 0 else perc_1 * 20 * 60
+        eff_2 = np.full(n, 20 * 60.0) if not denom_2 > 0 else 20 * 60 + perc_2 * 20 * 60
+        effettivo = np.where(primo, eff_1, np.where(secondo, eff_2, np.nan))
+
+    return pd.DataFrame({
+        'periodo_cod': periodo,
+        'tempo_effettivo_sec': effettivo,
+        'tempo_reale_sec': pd.array(reale, dtype='Int64'),
+    }, index=df_single.index)
+
+
+def calcola_tempi_numerici(df):
+    """Codice del periodo e tempi (secondi) di ogni evento, partita per partita.
+
+    Il df deve essere ordinato per posizione all'interno di ogni partita; è il
+    formato salvato nelle colonne COLONNE_TEMPI della tabella eventi.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=COLONNE_TEMPI, index=df.index)
+    if 'partita_id' not in df.columns or df['partita_id'].nunique() <= 1:
+        return _tempi_numerici_single(df)
+    parti = [_tempi_numerici_single(gruppo) for _, gruppo in df.groupby('partita_id', sort=False)]
+    return pd.concat(parti).reindex(df.index)
+
+
+def _mmss(valori, arrotonda):
+    secondi = pd.to_numeric(pd.Series(valori), errors='coerce').to_numpy(dtype='float64')
+    secondi = np.round(secondi) if arrotonda else np.trunc(secondi)
+    return ['' if np.isnan(s) else f"{int(s) // 60:02}:{int(s) % 60:02}" for s in secondi]
+
+
+def aggiungi_tempi(df):
+    """Aggiunge Periodo, tempoEffettivo e tempoReale (testo, come le funzioni sopra).
+
+    Usa le colonne numeriche salvate al caricamento; solo le partite che non le
+    hanno ancora (caricate prima e non migrate) vengono ricalcolate.
+    """
+    if df.empty:
+        return df
+    tempi = df.reindex(columns=COLONNE_TEMPI)
+    mancanti = tempi['periodo_cod'].isna()
+    if mancanti.any():
+        if 'partita_id' in df.columns:
+            mancanti = df['partita_id'].isin(df.loc[mancanti, 'partita_id'])
+        else:
+            mancanti[:] = True
+        tempi = tempi.astype('float64')
+        tempi.loc[mancanti] = calcola_tempi_numerici(df[mancanti]).astype('float64').to_numpy()
+
+    df['Periodo'] = pd.to_numeric(tempi['periodo_cod']).map(PERIODO_DA_CODICE).tolist()
+    df['tempoEffettivo'] = _mmss(tempi['tempo_effettivo_sec'], arrotonda=True)
+    df['tempoReale'] = _mmss(tempi['tempo_reale_sec'], arrotonda=False)
+    return df
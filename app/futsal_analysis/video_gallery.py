@@ -0,0 +1,50 @@
+"""Miniature dei video YouTube per la galleria delle partite.
+
+La galleria mostra per ogni partita solo l'immagine di anteprima (un JPEG
+servito da YouTube) e crea il player ``st.video`` solo per la partita
+aperta: così la pagina non carica un embed per ogni partita.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+
+YOUTUBE_THUMB_URL = "https://img.youtube.com/vi/{video_id}/mqdefault.jpg"
+
+_ID_VALIDO = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+
+def youtube_id(link: Optional[str]) -> Optional[str]:
+    """Id del video da un link YouTube (watch, youtu.be, embed, shorts, live).
+
+    Returns:
+        L'id di 11 caratteri, o None se il link non è riconosciuto.
+    """
+
+    if not link:
+        return None
+    url = urlparse(link.strip() if "://" in link else f"https://{link.strip()}")
+    host = (url.hostname or "").lower().removeprefix("www.").removeprefix("m.")
+    if host == "youtu.be":
+        candidato = url.path.lstrip("/").split("/")[0]
+    elif host.endswith("youtube.com") or host.endswith("youtube-nocookie.com"):
+        parti = [p for p in url.path.split("/") if p]
+        if parti[:1] == ["watch"]:
+            candidato = parse_qs(url.query).get("v", [""])[0]
+        elif len(parti) >= 2 and parti[0] in ("embed", "shorts", "live", "v"):
+            candidato = parti[1]
+        else:
+            return None
+    else:
+        return None
+    return candidato if _ID_VALIDO.match(candidato) else None
+
+
+def miniatura_youtube(link: Optional[str]) -> Optional[str]:
+    """URL dell'anteprima del video (320x180), o None se il link non è di YouTube."""
+
+    video_id = youtube_id(link)
+    return YOUTUBE_THUMB_URL.format(video_id=video_id) if video_id else None
@@ -11,15 +11,51 @@ from futsal_analysis.utils_eventi import *
 from futsal_analysis.utils_minutaggi import *
 from futsal_analysis.pitch_drawer import FutsalPitch
 from futsal_analysis.zone_analysis import *
-from futsal_analysis.utils_pdf import (
-    PdfImageSection,
-    PdfTableSection,
-    figure_to_png_bytes,
-    generate_pdf_report,
+from futsal_analysis.cache_registry import CATEGORIA, PARTITA, registra_cache_streamlit
+from futsal_analysis.image_cache import ambito_partite, player_zone_image, team_zone_image
+from futsal_analysis.batch_export import export_partite_zip, filtra_partite
+from futsal_analysis.data_access import EVENTI_ANALISI, PARTITE_SCHEDA, leggi_eventi, leggi_partite
+from futsal_analysis.dashboard_utils import formatta_dimensione, render_pannello_job
+from futsal_analysis.job_queue import get_job_queue, session_owner
+from futsal_analysis.lazy_reports import fingerprint_dataframe, get_session_reports, keep_widget_state
+from futsal_analysis.match_index import get_indice_partite
+from futsal_analysis.match_report import (
+    MINUTAGGI_CATEGORIE_VISTE,
+    MINUTAGGI_LABEL_TO_TITLE,
+    PLAYER_ATT_METRICS,
+    PLAYER_DIF_METRICS,
+    TEAM_ATT_METRICS,
+    TEAM_DIF_METRICS,
+    calcola_palle_stats,
+    calcola_top5_tables,
+    clean_quartetti_columns,
+    format_column_names,
+    format_index_names,
+    gol_timeline,
+    match_report_builders,
+    match_report_title,
+    render_match_pdf,
+    prepare_portieri_table,
+    remove_portiere_integrazione_stats,
+    reorder_columns_gol,
+    risultato_table,
+    zone_selection_key,
 )
+from futsal_analysis.utils_pdf import IMAGE_PROFILE_LABELS, PdfTableSection, available_image_profiles
 
 st.set_page_config(page_title="Analisi Partite", layout="wide", page_icon="⚽")
 
+# Widget del tab Zone il cui valore va mantenuto quando il tab non è visualizzato
+ZONE_WIDGET_KEYS = [
+    "zona_team_per_side",
+    "zona_stats_attacco_squadra",
+    "zona_stats_difesa_squadra",
+    "zona_player_per_side",
+    "zona_giocatore",
+    "zona_stats_attacco_gioc",
+    "zona_stats_difesa_gioc",
+]
+
 # CSS per ridurre la grandezza del font
 st.markdown("""
 <style>
@@ -37,13 +73,44 @@ st.markdown("""
 
 # --- VERIFICA CATEGORIA SELEZIONATA ---
 supabase = get_supabase_client()
+# Export PDF e ricalcoli pesanti passano dalla coda dei lavori in background
+job_queue = get_job_queue()
+job_owner = session_owner(st.session_state)
+
+
+# Le letture da Supabase sono in cache: i rerun della pagina (e dei fragment) non rifanno le query
+@st.cache_data(ttl=600)
+def carica_partite(categoria):
+    """Partite della categoria, dalla più recente."""
+    return leggi_partite(supabase, PARTITE_SCHEDA, categoria=categoria)
+
+
+@st.cache_data(ttl=600)
+def carica_eventi_partita(partita_id):
+    """Eventi della partita già normalizzati (colonne, zone, periodo e tempi)."""
+    # Solo le colonne usate dalle analisi (vedi data_access.EVENTI_ANALISI)
+    df = leggi_eventi(supabase, EVENTI_ANALISI, [partita_id])
+    if df.empty:
+        return df
+
+    df.columns = df.columns.str.strip().str.lower().str.replace(" ", "_")
+    df = df.copy()
+    # Non convertire i NaN a 0, lasciarli come valori mancanti per l'analisi delle zone
+    df['dove'] = pd.to_numeric(df.get('dove', None), errors='coerce').astype('Int64')
+    # Periodo e tempi salvati al caricamento (ricalcolati solo per le partite non migrate)
+    df = aggiungi_tempi(df)
+    return df
+
+
+# Eliminare o ricaricare una partita dall'Admin scarta solo le sue letture
+registra_cache_streamlit("1_partite:eventi", carica_eventi_partita, ambito=PARTITA)
+registra_cache_streamlit("1_partite:partite", carica_partite, ambito=CATEGORIA)
+
 
 # Se non c'è una categoria in session_state, imposta un default
 if 'categoria_selezionata' not in st.session_state:
-    # Carica le categorie disponibili
-    res_all = supabase.table("partite").select("categoria").execute()
-    categorie_disponibili = sorted(list(set([p.get('categoria', 'Prima Squadra') for p in res_all.data if p.get('categoria')])))
-    st.session_state['categoria_selezionata'] = categorie_disponibili[0] if categorie_disponibili else 'Prima Squadra'
+    # Categorie disponibili dall'indice condiviso (nessuna query se è già in memoria)
+    st.session_state['categoria_selezionata'] = get_indice_partite(supabase).categoria_default()
 
 categoria_attiva = st.session_state['categoria_selezionata']
 
@@ -51,13 +118,68 @@ st.header(f"Tutte le partite disponibili - {categoria_attiva}")
 st.info(f"📂 Categoria attiva: **{categoria_attiva}** (modificabile dalla Homepage)")
 
 # --- Carica partite FILTRATE PER CATEGORIA ---
-res = supabase.table("partite").select("*").eq("categoria", categoria_attiva).order("data", desc=True).execute()
-partite = res.data
+partite = carica_partite(categoria_attiva)
 
 if not partite:
     st.warning("Nessuna partita trovata.")
     st.stop()
 
+# --- Export massivo: PDF di tutte le partite della categoria in un unico ZIP ---
+with st.expander("📦 Esporta tutti i report (ZIP)", expanded=False):
+    competizioni_disponibili = sorted({p['competizione'] for p in partite if p.get('competizione')})
+    col_comp, col_date = st.columns(2)
+    with col_comp:
+        competizioni_sel = st.multiselect(
+            "Competizioni (vuoto = tutte)",
+            competizioni_disponibili,
+            format_func=lambda c: c.capitalize(),
+            key="batch_competizioni",
+        )
+    with col_date:
+        date_partite = [d for d in (pd.to_datetime(p.get('data'), errors='coerce') for p in partite) if pd.notna(d)]
+        intervallo = st.date_input(
+            "Intervallo date",
+            value=(min(date_partite).date(), max(date_partite).date()) if date_partite else (),
+            key="batch_intervallo",
+        )
+    data_da, data_a = (tuple(intervallo) + (None, None))[:2] if intervallo else (None, None)
+    partite_export = filtra_partite(partite, competizioni_sel, data_da, data_a)
+    st.caption(f"{len(partite_export)} partite selezionate")
+    profilo_zip = st.selectbox(
+        "Immagini nei PDF",
+        available_image_profiles(),
+        format_func=lambda p: IMAGE_PROFILE_LABELS.get(p, p),
+        key="batch_image_profile",
+    )
+
+    if st.button("📦 Genera ZIP", key="batch_export_zip", disabled=not partite_export):
+        barra = st.progress(0.0, text="Generazione report in corso...")
+
+        def _aggiorna_progresso(completate, totale, etichetta):
+            barra.progress(completate / totale, text=f"{completate}/{totale} — {etichetta}")
+
+        esito = export_partite_zip(
+            partite_export, carica_eventi_partita, categoria_attiva,
+            progress=_aggiorna_progresso, encoding=profilo_zip,
+        )
+        st.session_state["batch_export_result"] = esito
+
+    esito = st.session_state.get("batch_export_result")
+    if esito is not None:
+        st.success(f"Generati {len(esito.files)} PDF ({formatta_dimensione(len(esito.zip_bytes))}).")
+        if esito.skipped:
+            st.info("Partite senza eventi: " + ", ".join(esito.skipped))
+        for etichetta, errore in esito.errors.items():
+            st.warning(f"{etichetta}: {errore}")
+        if esito.files:
+            st.download_button(
+                "⬇️ Scarica ZIP",
+                data=esito.zip_bytes,
+                file_name=f"report_{categoria_attiva.lower().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M')}.zip",
+                mime="application/zip",
+                key="download_batch_zip",
+            )
+
 # --- Griglia partite con pulsante Analizza ---
 n_cols = 4
 for i in range(0, len(partite), n_cols):
@@ -88,48 +210,23 @@ st.markdown("---")
 # st.subheader(f"Analisi di {partita_info['competizione'].capitalize()} vs {partita_info['avversario'].title()} — {partita_info['data']}")
 
 # --- Carica eventi della partita scelta ---
-eventi = supabase.table("eventi").select("*").eq("partita_id", partita_id).order("posizione").execute().data
-df = pd.DataFrame(eventi)
+df = carica_eventi_partita(partita_id)
 if df.empty:
     st.warning("Nessun evento trovato per questa partita.")
     st.stop()
 
-# --- Data cleaning/normalizzazione ---
-df.columns = df.columns.str.strip().str.lower().str.replace(" ", "_")
-df = df.copy()
-# Non convertire i NaN a 0, lasciarli come valori mancanti per l'analisi delle zone
-df['dove'] = pd.to_numeric(df.get('dove', None), errors='coerce').astype('Int64')
-df['Periodo'] = tag_primo_secondo_tempo(df)
-df['tempoEffettivo'] = calcola_tempo_effettivo(df)
-df['tempoReale'] = calcola_tempo_reale(df)
-
 # --- RISULTATO ---
-gol_fatti = len(df[(df['evento'] == 'Gol') & (df['squadra'] == 'Noi')])
-gol_subiti = len(df[(df['evento'] == 'Gol') & (df['squadra'] == 'Loro')])
+gol_fatti, gol_subiti, score_pdf_table = risultato_table(df, partita_info['avversario'])
 st.markdown(f"## FMP **{gol_fatti}** – **{gol_subiti}** {partita_info['avversario'].title()}")
 
-score_pdf_table = pd.DataFrame({
-    "FMP": [gol_fatti],
-    partita_info['avversario'].title(): [gol_subiti],
-}, index=["Gol"])
-
 pdf_table_sections = []
+# Riempito dal tab Zone (anche quando viene rieseguito come fragment) e letto dall'export PDF
+zone_pdf_context = {"partite": [partita_id]}
 if not score_pdf_table.empty:
     pdf_table_sections.append(PdfTableSection("Risultato", score_pdf_table.copy()))
 
-gol_df = df[(df['evento'] == 'Gol') | (df['evento'] == 'Autogol')].copy()
+gol_df = gol_timeline(df)
 if not gol_df.empty:
-    gol_df = gol_df.copy()
-    gol_df['Minuto'] = gol_df['tempoEffettivo']  # Usa tempoEffettivo invece di tempoReale
-    gol_df['Marcatore'] = gol_df['chi'].fillna('').str.title()
-    gol_df['Squadra'] = gol_df['squadra']
-    # Ordina per minuto crescente (MM:SS) usando timedelta per evitare ordinamenti lessicografici
-    try:
-        gol_df['_minuto_td'] = pd.to_timedelta(gol_df['Minuto'].astype(str))
-        gol_df = gol_df.sort_values('_minuto_td').drop(columns=['_minuto_td']).reset_index(drop=True)
-    except Exception:
-        gol_df = gol_df.sort_values('Minuto').reset_index(drop=True)
-
     # Timeline gol espandibile
     with st.expander("⚽ Timeline Gol", expanded=False):
         # Mostra i gol in ordine cronologico verticale
@@ -160,191 +257,127 @@ if not gol_df.empty:
     if not timeline_pdf.empty:
         pdf_table_sections.append(PdfTableSection("Timeline Gol", timeline_pdf.reset_index(drop=True)))
 
-# --- Calcola report eventi (necessario per tutti i tab) ---
-report_eventi = calcola_report_completo(df)
+# --- Report calcolati su richiesta: ogni tab calcola solo ciò che gli serve ---
+reports = get_session_reports(
+    st.session_state,
+    "partita",
+    fingerprint_dataframe(df, partita_id),
+    match_report_builders(df),
+    partite=[partita_id],
+)
+
+# Nel run di esportazione PDF vengono eseguiti tutti i tab per raccogliere le sezioni
+export_pdf = st.session_state.pop("partita_export_pdf", False)
+keep_widget_state(st.session_state, ZONE_WIDGET_KEYS)
+
+# --- Helper di formattazione condivisi dai tab ---
+
+def render_section(title, data_dict, show_title=True, pdf_title=None):
+    if show_title:
+        st.markdown(f"**{title}**")
+    try:
+        df_sec = pd.DataFrame(data_dict).fillna(0).astype(int)
+    except Exception:
+        df_sec = pd.DataFrame(data_dict).fillna(0)
+    
+    # Formatta nomi colonne e righe
+    df_sec = format_column_names(df_sec)
+    df_sec = format_index_names(df_sec)
+    
+    st.dataframe(df_sec, use_container_width=True)
+
+    if pdf_title:
+        pdf_table_sections.append(PdfTableSection(pdf_title, df_sec.copy()))
 
 # --- TABS DINAMICI BASATI SULLA CATEGORIA ---
 # Per u15/u17 nascondiamo Stats Individuali, Stats Quartetti e Minutaggi
 if categoria_attiva.lower() in ['u15', 'u17']:
-    tabs = st.tabs(["Stats Squadra", "Zone"])
     tab_names = ["Stats Squadra", "Zone"]
 else:
-    tabs = st.tabs(["Stats Squadra", "Top 5", "Stats Individuali", "Stats Quartetti", "Zone", "Minutaggi"])
     tab_names = ["Stats Squadra", "Top 5", "Stats Individuali", "Stats Quartetti", "Zone", "Minutaggi"]
+# on_change="rerun" rende i tab lazy: viene eseguito solo il contenuto del tab selezionato
+tabs = st.tabs(tab_names, key="partita_tab", on_change="rerun")
+
+
+def tab_visibile(nome):
+    """True se il tab esiste ed è selezionato (sempre True durante l'export PDF)."""
+    if nome not in tab_names:
+        return False
+    return export_pdf or tabs[tab_names.index(nome)].open is not False
 
 # === TAB 1: Stats Squadra ===
 
-with tabs[0]:
-    st.header("Statistiche di squadra")
+if tab_visibile("Stats Squadra"):
+    with tabs[0]:
+        st.header("Statistiche di squadra")
 
-    def format_column_names(df):
-        """Formatta i nomi delle colonne rimuovendo underscore e capitalizzando"""
-        new_columns = {}
-        for col in df.columns:
-            # Rimuovi underscore e capitalizza ogni parola
-            if isinstance(col, str):
-                formatted = col.replace('_', ' ').title().replace(' Per Partita', ' x P')
-            else:
-                formatted = str(col)
-            new_columns[col] = formatted
-        return df.rename(columns=new_columns)
-    
-    def format_index_names(df):
-        """Formatta i nomi delle righe rimuovendo underscore e capitalizzando"""
-        new_index = {}
-        for idx in df.index:
-            if isinstance(idx, tuple):
-                # Mantieni tuple per sfruttare la visualizzazione "chip" di Streamlit
-                formatted = tuple(part.replace('_', ' ').title().replace(' Per Partita', ' x P') for part in idx)
-                new_index[idx] = formatted
-            elif isinstance(idx, str):
-                if ';' in idx:
-                    parts = [p.strip().replace('_', ' ').title().replace(' Per Partita', ' x P') for p in idx.split(';')]
-                    formatted = tuple(parts)
-                    new_index[idx] = formatted
-                else:
-                    formatted = idx.replace('_', ' ').title().replace(' Per Partita', ' x P')
-                    new_index[idx] = formatted
-            else:
-                new_index[idx] = str(idx)
-        return df.rename(index=new_index)
 
-    def render_section(title, data_dict, show_title=True, pdf_title=None):
-        if show_title:
-            st.markdown(f"**{title}**")
-        try:
-            df_sec = pd.DataFrame(data_dict).fillna(0).astype(int)
-        except Exception:
-            df_sec = pd.DataFrame(data_dict).fillna(0)
-        
-        # Formatta nomi colonne e righe
-        df_sec = format_column_names(df_sec)
-        df_sec = format_index_names(df_sec)
-        
-        st.dataframe(df_sec, use_container_width=True)
-
-        if pdf_title:
-            pdf_table_sections.append(PdfTableSection(pdf_title, df_sec.copy()))
-
-    def remove_portiere_integrazione_stats(data_dict):
-        """Rimuove integrazione_portiere (totale/ok/ko) da un dict stats per periodo."""
-        if not isinstance(data_dict, dict):
-            return data_dict
-        cleaned = {}
-        for periodo, values in data_dict.items():
-            if isinstance(values, dict):
-                cleaned[periodo] = {
-                    k: v for k, v in values.items()
-                    if not str(k).startswith('integrazione_portiere')
-                }
-            else:
-                cleaned[periodo] = values
-        return cleaned
-
-    # Sezione Possesso
-    with st.expander("⚽ Possesso", expanded=False):
-        render_section(
-            "Attacco",
-            report_eventi['squadra']['attacco'],
-            show_title=False,
-            pdf_title="Stats Squadra - Possesso Attacco",
-        )
-    
-    # Sezione Non Possesso
-    with st.expander("🛡️ Non Possesso", expanded=False):
-        render_section(
-            "Difesa",
-            report_eventi['squadra']['difesa'],
-            show_title=False,
-            pdf_title="Stats Squadra - Non Possesso Difesa",
-        )
-    
-    # Sezione Perse/Recuperate
-    with st.expander("🔄 Perse/Recuperate", expanded=False):
-        # Calcola le statistiche per palle perse e recuperate usando la funzione dedicata
-        palle_stats = {}
-        for periodo, data in report_eventi['squadra']['attacco'].items():
-            # Calcola le statistiche per questo periodo
-            if periodo == 'Totale':
-                df_periodo = df
-            elif periodo == '1T':
-                df_periodo = df[df['Periodo'] == 'Primo tempo']
-            elif periodo == '2T':
-                df_periodo = df[df['Periodo'] == 'Secondo tempo']
-            else:
-                df_periodo = df
-            
-            # Calcola palle perse e ripartenze per la nostra squadra
-            palle_perse = len(df_periodo[(df_periodo['evento'].str.contains('Palla persa', na=False))])
-            ripartenze = len(df_periodo[(df_periodo['evento'].str.contains('Ripartenza', na=False)) & (df_periodo['squadra'] == 'Noi')])
-            palle_recuperate = len(df_periodo[(df_periodo['evento'].str.contains('Palla recuperata', na=False))])
-            ripartenze_loro = len(df_periodo[(df_periodo['evento'].str.contains('Ripartenza', na=False)) & (df_periodo['squadra'] == 'Loro')])
-            
-            palle_stats[periodo] = {
-                'palle_perse': palle_perse,
-                'ripartenze': ripartenze,
-                'palle_recuperate': palle_recuperate,
-                'ripartenze_loro': ripartenze_loro
-            }
-        
-        render_section(
-            "Perse/Recuperate",
-            palle_stats,
-            show_title=False,
-            pdf_title="Stats Squadra - Perse e Recuperate",
-        )
+        # Sezione Possesso
+        with st.expander("⚽ Possesso", expanded=False):
+            render_section(
+                "Attacco",
+                reports['eventi']['squadra']['attacco'],
+                show_title=False,
+                pdf_title="Stats Squadra - Possesso Attacco",
+            )
     
-    # Sezione Falli
-    with st.expander("⚠️ Falli", expanded=False):
-        render_section(
-            "Falli",
-            report_eventi['squadra']['falli'],
-            show_title=False,
-            pdf_title="Stats Squadra - Falli",
-        )
+        # Sezione Non Possesso
+        with st.expander("🛡️ Non Possesso", expanded=False):
+            render_section(
+                "Difesa",
+                reports['eventi']['squadra']['difesa'],
+                show_title=False,
+                pdf_title="Stats Squadra - Non Possesso Difesa",
+            )
     
-    # Sezione Portieri
-    with st.expander("🥅 Portieri", expanded=False):
-        col_p1, col_p2 = st.columns(2)
-        with col_p1:
-            portieri_noi_clean = remove_portiere_integrazione_stats(report_eventi['squadra']['portieri_noi'])
+        # Sezione Perse/Recuperate
+        with st.expander("🔄 Perse/Recuperate", expanded=False):
+            # Calcola le statistiche per palle perse e recuperate usando la funzione dedicata
+            palle_stats = calcola_palle_stats(df, reports['eventi']['squadra']['attacco'].keys())
+
             render_section(
-                "Noi",
-                portieri_noi_clean,
-                pdf_title="Stats Squadra - Portieri Noi",
+                "Perse/Recuperate",
+                palle_stats,
+                show_title=False,
+                pdf_title="Stats Squadra - Perse e Recuperate",
             )
-        with col_p2:
-            portieri_loro_clean = remove_portiere_integrazione_stats(report_eventi['squadra']['portieri_loro'])
+    
+        # Sezione Falli
+        with st.expander("⚠️ Falli", expanded=False):
             render_section(
-                "Loro",
-                portieri_loro_clean,
-                pdf_title="Stats Squadra - Portieri Loro",
+                "Falli",
+                reports['eventi']['squadra']['falli'],
+                show_title=False,
+                pdf_title="Stats Squadra - Falli",
             )
+    
+        # Sezione Portieri
+        with st.expander("🥅 Portieri", expanded=False):
+            col_p1, col_p2 = st.columns(2)
+            with col_p1:
+                portieri_noi_clean = remove_portiere_integrazione_stats(reports['eventi']['squadra']['portieri_noi'])
+                render_section(
+                    "Noi",
+                    portieri_noi_clean,
+                    pdf_title="Stats Squadra - Portieri Noi",
+                )
+            with col_p2:
+                portieri_loro_clean = remove_portiere_integrazione_stats(reports['eventi']['squadra']['portieri_loro'])
+                render_section(
+                    "Loro",
+                    portieri_loro_clean,
+                    pdf_title="Stats Squadra - Portieri Loro",
+                )
 
 
 # === TAB 2: Stats Individuali ===
-if "Stats Individuali" in tab_names:
+if tab_visibile("Stats Individuali"):
     with tabs[tab_names.index("Stats Individuali")]:
         st.header("Statistiche individuali giocatori")
         
-        def reorder_columns_gol(df):
-            """Riordina le colonne per mettere gol_subiti subito dopo gol_fatti"""
-            if df.empty:
-                return df
-            cols = list(df.columns)
-            if 'gol_fatti' in cols and 'gol_subiti' in cols:
-                # Trova l'indice di gol_fatti
-                idx_gol_fatti = cols.index('gol_fatti')
-                # Rimuovi gol_subiti dalla sua posizione attuale
-                cols.remove('gol_subiti')
-                # Inserisci gol_subiti subito dopo gol_fatti
-                cols.insert(idx_gol_fatti + 1, 'gol_subiti')
-                return df[cols]
-            return df
-        
         # Sezione Giocatori con sezioni espandibili
         with st.expander("👥 Giocatori - Totale", expanded=False):
-            df_tot = pd.DataFrame(report_eventi['individuali_split']['Totale']).T
+            df_tot = pd.DataFrame(reports['eventi']['individuali_split']['Totale']).T
             df_tot = reorder_columns_gol(df_tot)
             df_tot = format_column_names(df_tot)
             df_tot = format_index_names(df_tot)
@@ -353,7 +386,7 @@ if "Stats Individuali" in tab_names:
                 pdf_table_sections.append(PdfTableSection("Stats Individuali - Totale", df_tot.copy()))
         
         with st.expander("👥 Giocatori - Primo Tempo", expanded=False):
-            df_1t = pd.DataFrame(report_eventi['individuali_split']['1T']).T
+            df_1t = pd.DataFrame(reports['eventi']['individuali_split']['1T']).T
             df_1t = reorder_columns_gol(df_1t)
             df_1t = format_column_names(df_1t)
             df_1t = format_index_names(df_1t)
@@ -362,7 +395,7 @@ if "Stats Individuali" in tab_names:
                 pdf_table_sections.append(PdfTableSection("Stats Individuali - Primo Tempo", df_1t.copy()))
         
         with st.expander("👥 Giocatori - Secondo Tempo", expanded=False):
-            df_2t = pd.DataFrame(report_eventi['individuali_split']['2T']).T
+            df_2t = pd.DataFrame(reports['eventi']['individuali_split']['2T']).T
             df_2t = reorder_columns_gol(df_2t)
             df_2t = format_column_names(df_2t)
             df_2t = format_index_names(df_2t)
@@ -372,20 +405,9 @@ if "Stats Individuali" in tab_names:
 
         st.header("Statistiche portieri individuali")
 
-        def prepare_portieri_table(df_portieri):
-            """Prepara la tabella portieri: aggiunge ordine colonne e rimuove integrazione."""
-            if df_portieri.empty:
-                return df_portieri
-            cols_da_rimuovere = [c for c in df_portieri.columns if c.startswith('integrazione_portiere')]
-            df_portieri = df_portieri.drop(columns=cols_da_rimuovere, errors='ignore')
-            ordered_cols = ['gol_subiti', 'parate', 'percentuale_parate']
-            first_cols = [c for c in ordered_cols if c in df_portieri.columns]
-            other_cols = [c for c in df_portieri.columns if c not in first_cols]
-            return df_portieri[first_cols + other_cols]
-        
         # Sezione Portieri con sezioni espandibili
         with st.expander("🥅 Portieri - Totale", expanded=False):
-            df_port_tot = pd.DataFrame(report_eventi['portieri_individuali_split']['Totale']).T
+            df_port_tot = pd.DataFrame(reports['eventi']['portieri_individuali_split']['Totale']).T
             df_port_tot = prepare_portieri_table(df_port_tot)
             df_port_tot = format_column_names(df_port_tot)
             df_port_tot = format_index_names(df_port_tot)
@@ -394,7 +416,7 @@ if "Stats Individuali" in tab_names:
                 pdf_table_sections.append(PdfTableSection("Stats Portieri Individuali - Totale", df_port_tot.copy()))
         
         with st.expander("🥅 Portieri - Primo Tempo", expanded=False):
-            df_port_1t = pd.DataFrame(report_eventi['portieri_individuali_split']['1T']).T
+            df_port_1t = pd.DataFrame(reports['eventi']['portieri_individuali_split']['1T']).T
             df_port_1t = prepare_portieri_table(df_port_1t)
             df_port_1t = format_column_names(df_port_1t)
             df_port_1t = format_index_names(df_port_1t)
@@ -403,7 +425,7 @@ if "Stats Individuali" in tab_names:
                 pdf_table_sections.append(PdfTableSection("Stats Portieri Individuali - Primo Tempo", df_port_1t.copy()))
         
         with st.expander("🥅 Portieri - Secondo Tempo", expanded=False):
-            df_port_2t = pd.DataFrame(report_eventi['portieri_individuali_split']['2T']).T
+            df_port_2t = pd.DataFrame(reports['eventi']['portieri_individuali_split']['2T']).T
             df_port_2t = prepare_portieri_table(df_port_2t)
             df_port_2t = format_column_names(df_port_2t)
             df_port_2t = format_index_names(df_port_2t)
@@ -412,76 +434,18 @@ if "Stats Individuali" in tab_names:
                 pdf_table_sections.append(PdfTableSection("Stats Portieri Individuali - Secondo Tempo", df_port_2t.copy()))
 
 # === TAB 2: Top 5 ===
-if "Top 5" in tab_names:
+if tab_visibile("Top 5"):
     with tabs[tab_names.index("Top 5")]:
         st.header("🏆 Top 5")
         
-        # Lista delle statistiche da mostrare (facilmente modificabile)
-        # Formato: (chiave_statistica, 'Nome Visualizzato', è_calcolata)
-        # Se è_calcolata=True, la statistica viene calcolata invece di essere letta direttamente
-        top5_stats = [
-            ('gol_fatti', 'Gol', False),
-            ('tiri_totali', 'Tiri', False),
-            ('tiri_in_porta_totali', 'Tiri in Porta', False),
-            ('precisione_tiri', 'Precisione Tiri (%)', True),  # Calcolata: tiri_in_porta / tiri_totali * 100
-            ('tiri_fuori', 'Tiri Fuori', False),
-            ('tiri_ribattuti', 'Tiri Ribattuti', False),
-            ('palo_traversa', 'Palo/Traversa', False),
-            ('palle_perse', 'Palle Perse', False),
-            ('palle_recuperate', 'Palle Recuperate', False),
-            ('tiri_ribattuti_noi', 'Tiri Ribattuti da Noi', False),
-            ('falli_fatti', 'Falli Fatti', False),
-            ('falli_subiti', 'Falli Subiti', False),
-            # ('ammonizioni', 'Ammonizioni', False),
-            # ('espulsioni', 'Espulsioni', False),
-        ]
-        
-        # Estrai i dati individuali totali
-        stats_individuali = report_eventi['individuali_split']['Totale']
-        
-        # Raccogli tutte le tabelle da visualizzare
-        tabelle_da_mostrare = []
-        
-        # Genera una tabella per ogni statistica
-        for stat_key, stat_label, is_calculated in top5_stats:
-            # Raccogli i valori per tutti i giocatori per questa statistica
-            giocatori_stats = []
-            for giocatore, stats in stats_individuali.items():
-                if is_calculated:
-                    # Calcola la precisione di tiri
-                    if stat_key == 'precisione_tiri':
-                        tiri_totali = stats.get('tiri_totali', 0)
-                        tiri_in_porta = stats.get('tiri_in_porta_totali', 0)
-                        if tiri_totali > 0:
-                            precisione = round((tiri_in_porta / tiri_totali) * 100, 1)
-                            giocatori_stats.append({
-                                'Giocatore': giocatore.title(),
-                                stat_label: precisione
-                            })
-                else:
-                    # Statistica diretta
-                    if stat_key in stats:
-                        valore = stats[stat_key]
-                        if pd.notna(valore) and valore > 0:  # Solo giocatori con valore > 0
-                            giocatori_stats.append({
-                                'Giocatore': giocatore.title(),
-                                stat_label: int(valore)
-                            })
-            
-            # Se ci sono dati, crea la tabella Top 5
-            if giocatori_stats:
-                df_top5 = pd.DataFrame(giocatori_stats)
-                # Ordina per valore decrescente e prendi i top 5
-                df_top5 = df_top5.sort_values(by=stat_label, ascending=False).head(5).reset_index(drop=True)
-                # Aggiungi colonna Posizione
-                df_top5.insert(0, 'Posizione', range(1, len(df_top5) + 1))
-                
-                # Salva per visualizzazione successiva
-                tabelle_da_mostrare.append((stat_label, df_top5))
-                
-                # Aggiungi al PDF
-                pdf_table_sections.append(PdfTableSection(f"Top 5 - {stat_label}", df_top5.copy()))
-        
+        # Estrai i dati individuali totali (statistiche in TOP5_STATS di match_report)
+        stats_individuali = reports['eventi']['individuali_split']['Totale']
+
+        # Una tabella per ogni statistica, da visualizzare e da aggiungere al PDF
+        tabelle_da_mostrare = calcola_top5_tables(stats_individuali)
+        for stat_label, df_top5 in tabelle_da_mostrare:
+            pdf_table_sections.append(PdfTableSection(f"Top 5 - {stat_label}", df_top5.copy()))
+
         # Mostra le tabelle in layout a 4 colonne
         for i in range(0, len(tabelle_da_mostrare), 4):
             cols = st.columns(4)
@@ -491,31 +455,14 @@ if "Top 5" in tab_names:
                     st.dataframe(df_top5, use_container_width=True, hide_index=True)
 
 # === TAB 3: Stats Quartetti ===
-if "Stats Quartetti" in tab_names:
+if tab_visibile("Stats Quartetti"):
     with tabs[tab_names.index("Stats Quartetti")]:
         st.header("Statistiche per quartetti")
         
         # Calcola le statistiche dei quartetti
-        report_quartetti = calcola_report_quartetti_completo(df)
-        report_quinto_uomo = calcola_report_quinto_uomo_completo(df)
-
-        quartetti_columns_to_drop = [
-            'angoli',
-            'laterali',
-            'angoli_subiti',
-            'laterali_subiti',
-            'ammonizioni',
-            'espulsioni',
-        ]
-
-        def clean_quartetti_columns(df_input: pd.DataFrame) -> pd.DataFrame:
-            if df_input.empty:
-                return df_input
-            cols_to_drop = [col for col in quartetti_columns_to_drop if col in df_input.columns]
-            if cols_to_drop:
-                df_input = df_input.drop(columns=cols_to_drop)
-            return df_input
-        
+        report_quartetti = reports['quartetti']
+        report_quinto_uomo = reports['quinto_uomo']
+
         # Sezione Quartetti
         with st.expander("👥 Quartetti - Totale", expanded=False):
             if report_quartetti['Totale']:
@@ -601,24 +548,28 @@ if "Stats Quartetti" in tab_names:
                 st.info("Nessuna situazione con quinto uomo trovata nel secondo tempo.")
 
 # === TAB Zone ===
-with tabs[tab_names.index("Zone")]:
+# Il tab è un fragment: cambiare un widget delle zone riesegue solo questa funzione,
+# non il caricamento dei dati né gli altri tab.
+@st.fragment
+def render_tab_zone():
+    # I grafici in cache restano associati alla partita (vedi image_cache.ambito_partite)
+    with ambito_partite([partita_id]):
+        _render_tab_zone()
+
+
+def _render_tab_zone():
     st.header("Analisi per zone di campo")
     campo = FutsalPitch()
-    report_zona = calcola_report_zona(df)
+    report_zona = reports['zona']
 
-    team_att_metrics_all = ['gol_fatti', 'tiri_totali', 'tiri_in_porta_totali', 'tiri_ribattuti', 'tiri_fuori', 'palo_traversa', 'laterali', 'palle_perse']
-    team_dif_metrics_all = ['gol_subiti', 'tiri_totali_subiti', 'tiri_in_porta_totali_subiti', 'tiri_ribattuti_da_noi', 'tiri_fuori_loro', 'palo_traversa_loro', 'laterale_loro', 'palle_recuperate']
-    player_att_metrics_all = ['gol_fatti', 'tiri_totali', 'tiri_in_porta_totali', 'tiri_ribattuti', 'tiri_fuori', 'palo_traversa', 'palle_perse']
-    player_dif_metrics_all = ['tiri_ribattuti_noi', 'palle_recuperate', 'falli_subiti']
-
-    zone_pdf_context = {
+    zone_pdf_context.update({
         "team_att_metrics": [],
         "team_dif_metrics": [],
         "players": [],
         "player_metrics": {},
         "report_zona": report_zona,
         "campo": campo,
-    }
+    })
 
     # --- SEZIONE SQUADRA ---
     with st.expander("🏆 Analisi Zone di Squadra", expanded=False):
@@ -631,7 +582,7 @@ with tabs[tab_names.index("Zone")]:
             zone_attacco = report_zona['squadra']['attacco']
             if zone_attacco:
                 first_zone = next(iter(zone_attacco.values()))
-                metriche_attacco = [m for m in team_att_metrics_all if m in first_zone]
+                metriche_attacco = [m for m in TEAM_ATT_METRICS if m in first_zone]
                 zone_pdf_context["team_att_metrics"] = metriche_attacco
                 stat_keys_att_sel = st.multiselect(
                     "Statistiche attacco (squadra)",
@@ -640,14 +591,13 @@ with tabs[tab_names.index("Zone")]:
                     key="zona_stats_attacco_squadra"
                 )
                 if stat_keys_att_sel:
-                    fig, ax = draw_team_metric_per_zone(
-                        report_zona, campo, stat_keys_att_sel,
+                    st.image(team_zone_image(
+                        report_zona, stat_keys_att_sel,
                         team_key="attacco",
                         title="Attacco per zona (squadra)",
                         cmap=cm.Reds,
                         per_side=per_side_team
-                    )
-                    st.pyplot(fig)
+                    ), use_container_width=True)
             else:
                 st.info("Nessun dato di attacco disponibile.")
 
@@ -656,7 +606,7 @@ with tabs[tab_names.index("Zone")]:
             zone_difesa = report_zona['squadra']['difesa']
             if zone_difesa:
                 first_zone = next(iter(zone_difesa.values()))
-                metriche_difesa = [m for m in team_dif_metrics_all if m in first_zone]
+                metriche_difesa = [m for m in TEAM_DIF_METRICS if m in first_zone]
                 zone_pdf_context["team_dif_metrics"] = metriche_difesa
                 stat_keys_dif_sel = st.multiselect(
                     "Statistiche difesa (squadra)",
@@ -665,14 +615,13 @@ with tabs[tab_names.index("Zone")]:
                     key="zona_stats_difesa_squadra"
                 )
                 if stat_keys_dif_sel:
-                    fig, ax = draw_team_metric_per_zone(
-                        report_zona, campo, stat_keys_dif_sel,
+                    st.image(team_zone_image(
+                        report_zona, stat_keys_dif_sel,
                         team_key="difesa",
                         title="Difesa per zona (squadra)",
                         cmap=cm.Blues,
                         per_side=per_side_team
-                    )
-                    st.pyplot(fig)
+                    ), use_container_width=True)
             else:
                 st.info("Nessun dato di difesa disponibile.")
 
@@ -696,8 +645,8 @@ with tabs[tab_names.index("Zone")]:
                         sample_stats = zona[giocatore]
                         break
                 if sample_stats:
-                    att_metrics = [m for m in player_att_metrics_all if m in sample_stats]
-                    dif_metrics = [m for m in player_dif_metrics_all if m in sample_stats]
+                    att_metrics = [m for m in PLAYER_ATT_METRICS if m in sample_stats]
+                    dif_metrics = [m for m in PLAYER_DIF_METRICS if m in sample_stats]
                 else:
                     att_metrics = []
                     dif_metrics = []
@@ -721,14 +670,13 @@ with tabs[tab_names.index("Zone")]:
                 )
 
                 if stat_keys_att_gioc_sel:
-                    fig, ax = draw_player_metric_per_zone(
-                        report_zona['individuali'], campo, stat_keys_att_gioc_sel,
+                    st.image(player_zone_image(
+                        report_zona['individuali'], stat_keys_att_gioc_sel,
                         chi=giocatore_scelto,
                         title=f"Attacco per zona – {giocatore_scelto}",
                         cmap=cm.OrRd,
                         per_side=per_side_player
-                    )
-                    st.pyplot(fig)
+                    ), use_container_width=True)
 
             with col2:
                 st.markdown(f"#### Difesa – {giocatore_scelto}")
@@ -742,23 +690,28 @@ with tabs[tab_names.index("Zone")]:
                 )
 
                 if stat_keys_dif_gioc_sel:
-                    fig, ax = draw_player_metric_per_zone(
-                        report_zona['individuali'], campo, stat_keys_dif_gioc_sel,
+                    st.image(player_zone_image(
+                        report_zona['individuali'], stat_keys_dif_gioc_sel,
                         chi=giocatore_scelto,
                         title=f"Difesa per zona – {giocatore_scelto}",
                         cmap=cm.BuPu,
                         per_side=per_side_player
-                    )
-                    st.pyplot(fig)
+                    ), use_container_width=True)
+
+
+
+if tab_visibile("Zone"):
+    with tabs[tab_names.index("Zone")]:
+        render_tab_zone()
 
 
 # === TAB Minutaggi ===
-if "Minutaggi" in tab_names:
+if tab_visibile("Minutaggi"):
     with tabs[tab_names.index("Minutaggi")]:
         st.header("Minutaggi")
         # Durata complessiva, 1T e 2T (tempo reale)
         try:
-            dati_durate = calcola_durate(df)
+            dati_durate = reports['durate']
             st.subheader("Durata partita (tempo reale)")
             dati_durate = format_column_names(dati_durate)
             st.dataframe(dati_durate)
@@ -766,24 +719,11 @@ if "Minutaggi" in tab_names:
                 pdf_table_sections.append(PdfTableSection("Minutaggi - Durata Partita", dati_durate.copy()))
         except Exception:
             pass
-        df_1t = filtra_per_tempo(df, 'Primo tempo')
-        df_2t = filtra_per_tempo(df, 'Secondo tempo')
-        minutaggi = calcola_minutaggi(df, df_1t, df_2t)
+        minutaggi = reports['minutaggi']
 
         # Mostra solo le categorie richieste, con titoli parlanti, raggruppate per periodo in sezioni comprimibili
-        categorie_viste = [
-            ("mov4_portieri", "Portieri"),
-            ("mov4_singoli", "Singoli"),
-            # ("mov4_coppie", "Coppie di movimento"),  # COMMENTATO - mantenere solo singoli e quartetti
-            ("mov4_quartetto", "Quartetti"),
-            ("mov5_senza_portiere", "Quinto uomo (5 giocatori di movimento)")
-        ]
-
-        label_to_title = {
-            "totale": "Totale",
-            "primo_tempo": "Primo tempo",
-            "secondo_tempo": "Secondo tempo",
-        }
+        categorie_viste = MINUTAGGI_CATEGORIE_VISTE
+        label_to_title = MINUTAGGI_LABEL_TO_TITLE
 
         for periodo, categorie in minutaggi.items():
             with st.expander(label_to_title.get(periodo, periodo).upper(), expanded=False):
@@ -802,124 +742,38 @@ if "Minutaggi" in tab_names:
 st.markdown("---")
 st.subheader("Esporta report partita")
 
-if st.button("📄 Genera PDF", key="generate_match_pdf"):
-    with st.spinner("Generazione report PDF in corso..."):
-        image_sections = []
-
-        def metric_label(name: str) -> str:
-            return name.replace('_', ' ').title()
-
-        zona_report = zone_pdf_context.get("report_zona", {})
-
-        # Sezioni squadra - attacco
-        for metric in zone_pdf_context.get("team_att_metrics", []):
-            try:
-                fig, _ = draw_team_metric_per_zone(
-                    zona_report,
-                    FutsalPitch(),
-                    [metric],
-                    team_key="attacco",
-                    title=f"Attacco - {metric_label(metric)}",
-                    cmap=cm.Reds,
-                    per_side=True,
-                )
-                fig.set_size_inches(4.0, 3.0)
-                image_sections.append(
-                    PdfImageSection(
-                        f"Zone Squadra Attacco - {metric_label(metric)}",
-                        figure_to_png_bytes(fig),
-                        max_width=320,
-                    )
-                )
-                plt.close(fig)
-            except Exception:
-                continue
-
-        # Sezioni squadra - difesa
-        for metric in zone_pdf_context.get("team_dif_metrics", []):
-            try:
-                fig, _ = draw_team_metric_per_zone(
-                    zona_report,
-                    FutsalPitch(),
-                    [metric],
-                    team_key="difesa",
-                    title=f"Difesa - {metric_label(metric)}",
-                    cmap=cm.Blues,
-                    per_side=True,
-                )
-                fig.set_size_inches(4.0, 3.0)
-                image_sections.append(
-                    PdfImageSection(
-                        f"Zone Squadra Difesa - {metric_label(metric)}",
-                        figure_to_png_bytes(fig),
-                        max_width=320,
-                    )
-                )
-                plt.close(fig)
-            except Exception:
-                continue
-
-        # Sezioni individuali
-        zona_individuali = zona_report.get('individuali', {})
-        for giocatore, metriche in zone_pdf_context.get("player_metrics", {}).items():
-            for metric in metriche.get("attacco", []):
-                try:
-                    fig, _ = draw_player_metric_per_zone(
-                        zona_individuali,
-                        FutsalPitch(),
-                        [metric],
-                        chi=giocatore,
-                        title=f"{giocatore} - Attacco {metric_label(metric)}",
-                        cmap=cm.OrRd,
-                        per_side=True,
-                    )
-                    fig.set_size_inches(4.0, 3.0)
-                    image_sections.append(
-                        PdfImageSection(
-                            f"Zone {giocatore} Attacco - {metric_label(metric)}",
-                            figure_to_png_bytes(fig),
-                            max_width=320,
-                        )
-                    )
-                    plt.close(fig)
-                except Exception:
-                    continue
-
-            for metric in metriche.get("difesa", []):
-                try:
-                    fig, _ = draw_player_metric_per_zone(
-                        zona_individuali,
-                        FutsalPitch(),
-                        [metric],
-                        chi=giocatore,
-                        title=f"{giocatore} - Difesa {metric_label(metric)}",
-                        cmap=cm.BuPu,
-                        per_side=True,
-                    )
-                    fig.set_size_inches(4.0, 3.0)
-                    image_sections.append(
-                        PdfImageSection(
-                            f"Zone {giocatore} Difesa - {metric_label(metric)}",
-                            figure_to_png_bytes(fig),
-                            max_width=320,
-                        )
-                    )
-                    plt.close(fig)
-                except Exception:
-                    continue
-
-        export_title = f"Report Partita - {partita_info['competizione'].title()} vs {partita_info['avversario'].title()} ({partita_info['data']})"
-        file_timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-        pdf_bytes = generate_pdf_report(
-            export_title,
-            table_sections=pdf_table_sections,
-            image_sections=image_sections,
-        )
+def _richiedi_export_pdf():
+    st.session_state["partita_export_pdf"] = True
+
 
-    st.download_button(
-        "⬇️ Scarica PDF",
-        data=pdf_bytes,
+# Profili più leggeri (JPEG, palette) riducono molto il PDF da scaricare in mobilità
+profilo_pdf = st.selectbox(
+    "Immagini nel PDF",
+    available_image_profiles(),
+    format_func=lambda p: IMAGE_PROFILE_LABELS.get(p, p),
+    key="partita_pdf_profile",
+)
+
+# Il click imposta il flag e provoca un nuovo run in cui tutti i tab vengono calcolati
+st.button("📄 Genera PDF", key="generate_match_pdf", on_click=_richiedi_export_pdf)
+
+if export_pdf:
+    # Grafici e impaginazione vengono eseguiti nella coda dei lavori: la pagina resta utilizzabile
+    export_title = match_report_title(partita_info)
+    file_timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+    job_queue.submit(
+        "pdf_partita",
+        export_title,
+        render_match_pdf,
+        export_title,
+        list(pdf_table_sections),
+        dict(zone_pdf_context),
+        encoding=profilo_pdf,
+        owner=job_owner,
+        key=("pdf_partita", reports.fingerprint, profilo_pdf, zone_selection_key(zone_pdf_context)),
+        partite=[partita_id],
         file_name=f"report_partita_{file_timestamp}.pdf",
         mime="application/pdf",
-        key="download_match_pdf",
     )
+
+render_pannello_job(job_queue, job_owner, key_prefix="partita")
@@ -11,16 +11,35 @@ from futsal_analysis.utils_eventi import *
 from futsal_analysis.utils_minutaggi import *
 from futsal_analysis.pitch_drawer import FutsalPitch
 from futsal_analysis.zone_analysis import *
-from futsal_analysis.dashboard_utils import render_panoramica_stagione
+from futsal_analysis.data_access import EVENTI_ANALISI, PARTITE_SCHEDA, leggi_eventi, leggi_partite
+from futsal_analysis.dashboard_utils import render_pannello_job, render_panoramica_stagione
+from futsal_analysis.cache_registry import CATEGORIA, registra_cache_streamlit, versione_partite
+from futsal_analysis.image_cache import ambito_partite, player_zone_image, team_zone_image
+from futsal_analysis.job_queue import get_job_queue, report_in_background, session_owner
+from futsal_analysis.lazy_reports import fingerprint_dataframe, get_session_reports, keep_widget_state
+from futsal_analysis.match_index import get_indice_partite
+from futsal_analysis.match_summary import calcola_riepiloghi
+from futsal_analysis.match_report import iter_zone_image_sections, zone_selection_key
 from futsal_analysis.utils_pdf import (
-    PdfImageSection,
+    IMAGE_PROFILE_LABELS,
     PdfTableSection,
-    figure_to_png_bytes,
-    generate_pdf_report,
+    StreamingPdfReport,
+    available_image_profiles,
 )
 
 st.set_page_config(page_title="Stats Stagione", layout="wide", page_icon="📊")
 
+# Widget del tab Zone il cui valore va mantenuto quando il tab non è visualizzato
+ZONE_WIDGET_KEYS = [
+    "zona_team_per_side",
+    "zona_stats_attacco_squadra",
+    "zona_stats_difesa_squadra",
+    "zona_player_per_side",
+    "zona_giocatore",
+    "zona_stats_attacco_gioc",
+    "zona_stats_difesa_gioc",
+]
+
 # CSS per ridurre la grandezza del font
 st.markdown("""
 <style>
@@ -54,17 +73,47 @@ st.markdown("""
 
 # --- VERIFICA CATEGORIA SELEZIONATA ---
 supabase = get_supabase_client()
+# Export PDF e ricalcoli pesanti passano dalla coda dei lavori in background
+job_queue = get_job_queue()
+job_owner = session_owner(st.session_state)
+
+
+# Le letture da Supabase sono in cache: i rerun della pagina (e dei fragment) non rifanno le query
+@st.cache_data(ttl=600)
+def carica_partite(categoria):
+    """Partite della categoria, dalla più recente."""
+    return leggi_partite(supabase, PARTITE_SCHEDA, categoria=categoria)
+
+
+@st.cache_data(ttl=600)
+def carica_eventi_stagione(partite_ids, versioni):
+    """Eventi di tutte le partite indicate (una query per partita), già normalizzati.
+
+    ``versioni`` (``versione_partite``) serve solo alla chiave della cache: cambia
+    quando una delle partite viene ricaricata o eliminata dall'Admin.
+    """
+    # Solo le colonne usate dalle analisi (vedi data_access.EVENTI_ANALISI)
+    df_all = leggi_eventi(supabase, EVENTI_ANALISI, partite_ids)
+    if df_all.empty:
+        return df_all
+
+    df_all.columns = df_all.columns.str.strip().str.lower().str.replace(" ", "_")
+    df_all = df_all.copy()
+    df_all['dove'] = pd.to_numeric(df_all.get('dove', None), errors='coerce').fillna(0).astype(int)
+    # Periodo e tempi salvati al caricamento (ricalcolati solo per le partite non migrate)
+    df_all = aggiungi_tempi(df_all)
+    return df_all
+
+
+# Nuove partite o partite eliminate dall'Admin scartano solo l'elenco della loro categoria
+registra_cache_streamlit("2_Stats:partite", carica_partite, ambito=CATEGORIA)
+registra_cache_streamlit("2_Stats:eventi", carica_eventi_stagione)
+
 
 # Se non c'è una categoria in session_state, imposta un default
 if 'categoria_selezionata' not in st.session_state:
-    # Carica le categorie disponibili
-    res_all = supabase.table("partite").select("categoria").execute()
-    categorie_disponibili = sorted(list(set([p.get('categoria', 'Prima Squadra') for p in res_all.data if p.get('categoria')])))
-    # Cerca "Campionato" come default, altrimenti usa la prima categoria disponibile
-    if 'Campionato' in categorie_disponibili:
-        st.session_state['categoria_selezionata'] = 'Campionato'
-    else:
-        st.session_state['categoria_selezionata'] = categorie_disponibili[0] if categorie_disponibili else 'Prima Squadra'
+    # Cerca "Campionato" come default, altrimenti usa la prima categoria disponibile (indice condiviso)
+    st.session_state['categoria_selezionata'] = get_indice_partite(supabase).categoria_default('Campionato')
 
 categoria_attiva = st.session_state['categoria_selezionata']
 
@@ -72,8 +121,7 @@ st.header(f"📊 Statistiche di Stagione - {categoria_attiva}")
 st.info(f"📂 Categoria attiva: **{categoria_attiva}** (modificabile dalla Homepage)")
 
 # --- Carica tutte le partite FILTRATE PER CATEGORIA ---
-res = supabase.table("partite").select("*").eq("categoria", categoria_attiva).order("data", desc=True).execute()
-partite = res.data
+partite = carica_partite(categoria_attiva)
 
 if not partite:
     st.warning(f"Nessuna partita trovata per la categoria '{categoria_attiva}'.")
@@ -112,35 +160,22 @@ st.info(f"Caricamento dati per {len(partite_filtrate)} partite nelle competizion
 
 # Carica eventi: una query per ogni partita
 partite_ids = [p['id'] for p in partite_filtrate]
-eventi_totali = []
 
 with st.spinner("Caricamento eventi in corso..."):
-    for partita_id in partite_ids:
-        eventi_res = supabase.table("eventi").select("*").eq("partita_id", partita_id).order("posizione").execute()
-        if eventi_res.data:
-            eventi_totali.extend(eventi_res.data)
+    df_all = carica_eventi_stagione(tuple(partite_ids), versione_partite(partite_ids))
 
-if not eventi_totali:
+if df_all.empty:
     st.warning("Nessun evento trovato per le partite selezionate.")
     st.stop()
 
-# Crea DataFrame completo
-df_all = pd.DataFrame(eventi_totali)
-
-# --- Data cleaning/normalizzazione ---
-df_all.columns = df_all.columns.str.strip().str.lower().str.replace(" ", "_")
-df_all = df_all.copy()
-df_all['dove'] = pd.to_numeric(df_all.get('dove', None), errors='coerce').fillna(0).astype(int)
-df_all['Periodo'] = tag_primo_secondo_tempo(df_all)
-df_all['tempoEffettivo'] = calcola_tempo_effettivo(df_all)
-df_all['tempoReale'] = calcola_tempo_reale(df_all)
-
 # --- PANORAMICA STAGIONE ---
-render_panoramica_stagione(df_all, partite_ids)
+render_panoramica_stagione(calcola_riepiloghi(df_all, partite_ids))
 
-# --- Calcola report completo per tutti gli eventi ---
 st.markdown("---")
-report_eventi = calcola_report_completo(df_all)
+
+# Nel run di esportazione PDF vengono eseguiti tutti i tab per raccogliere le sezioni
+export_pdf = st.session_state.pop("stats_export_pdf", False)
+keep_widget_state(st.session_state, ZONE_WIDGET_KEYS)
 pdf_table_sections = []
 MAX_ROWS_PER_PDF_SECTION = 30
 
@@ -159,6 +194,7 @@ def append_pdf_section(title: str, df: pd.DataFrame):
     pdf_table_sections.append(PdfTableSection(title, df_pdf))
 
 zone_pdf_context = {
+    "partite": list(partite_ids),
     "report_zona": {},
     "team_att_metrics": [],
     "team_dif_metrics": [],
@@ -230,6 +266,9 @@ def clean_quartetti_columns(df_input: pd.DataFrame) -> pd.DataFrame:
 def aggrega_minutaggi_partite(partite_ids, df_eventi):
     """
     Calcola i minutaggi per ogni partita e poi li aggrega sommando i secondi totali.
+
+    Gira nella coda dei lavori (senza contesto Streamlit): gli errori delle
+    singole partite vengono restituiti in 'errori' e mostrati dalla pagina.
     """
     from collections import defaultdict
     import pandas as pd
@@ -243,6 +282,8 @@ def aggrega_minutaggi_partite(partite_ids, df_eventi):
     durata_totale_tot = 0
     durata_totale_1t = 0
     durata_totale_2t = 0
+
+    errori = []
     
     for p_id in partite_ids:
         # Filtra eventi per questa partita
@@ -253,11 +294,10 @@ def aggrega_minutaggi_partite(partite_ids, df_eventi):
         # Reset degli indici per evitare problemi con loc
         df_partita = df_partita.reset_index(drop=True)
         
-        # IMPORTANTE: Ricalcola Periodo, tempoEffettivo e tempoReale per QUESTA partita
-        # (non usare quelli calcolati su df_all con tutte le partite mischiate!)
-        df_partita['Periodo'] = tag_primo_secondo_tempo(df_partita)
-        df_partita['tempoEffettivo'] = calcola_tempo_effettivo(df_partita)
-        df_partita['tempoReale'] = calcola_tempo_reale(df_partita)
+        # Periodo, tempoEffettivo e tempoReale sono già calcolati partita per partita
+        # (salvati con gli eventi); si ricalcolano solo se mancano
+        if 'Periodo' not in df_partita.columns:
+            df_partita = aggiungi_tempi(df_partita)
         
         # Filtra per periodo
         df_1t = df_partita[df_partita['Periodo'] == 'Primo tempo'].reset_index(drop=True)
@@ -386,9 +426,9 @@ def aggrega_minutaggi_partite(partite_ids, df_eventi):
             durata_totale_2t += durata_2t_partita
                     
         except Exception as e:
-            # Mostra warning solo per errori non banali
+            # Riporta solo gli errori non banali
             if "empty" not in str(e).lower() and len(df_partita) > 0:
-                st.warning(f"⚠️ Errore nel calcolo minutaggi per partita {p_id}: {e}")
+                errori.append(f"⚠️ Errore nel calcolo minutaggi per partita {p_id}: {e}")
             continue
     
     # Converti gli accumulatori in DataFrame
@@ -453,7 +493,8 @@ def aggrega_minutaggi_partite(partite_ids, df_eventi):
     return {
         'totale': acc_to_dataframes(acc_totale, durata_totale_tot),
         'primo_tempo': acc_to_dataframes(acc_primo_tempo, durata_totale_1t),
-        'secondo_tempo': acc_to_dataframes(acc_secondo_tempo, durata_totale_2t)
+        'secondo_tempo': acc_to_dataframes(acc_secondo_tempo, durata_totale_2t),
+        'errori': errori,
     }
 
 # Funzione per normalizzare le statistiche individuali
@@ -570,74 +611,109 @@ def normalizza_stats_quartetti(df_stats, minutaggi_data):
     
     return df
 
-# --- Calcola minutaggi una volta per tutti i tabs (solo per categorie complete) ---
-if categoria_attiva.lower() not in ['u15', 'u17']:
-    minutaggi = aggrega_minutaggi_partite(partite_ids, df_all)
-else:
-    minutaggi = None
+# --- Report calcolati su richiesta: ogni tab calcola solo ciò che gli serve ---
+# (i minutaggi aggregati servono a Stats Individuali, Stats Quartetti e Minutaggi, solo per categorie complete)
+reports = get_session_reports(
+    st.session_state,
+    "stagione",
+    fingerprint_dataframe(df_all, categoria_attiva, tuple(partite_ids)),
+    {
+        "eventi": lambda: calcola_report_completo(df_all),
+        "quartetti": lambda: calcola_report_quartetti_completo(df_all),
+        "quinto_uomo": lambda: calcola_report_quinto_uomo_completo(df_all),
+        "zona": lambda: calcola_report_zona(df_all),
+        "minutaggi": lambda: aggrega_minutaggi_partite(partite_ids, df_all),
+    },
+    partite=partite_ids,
+)
 
 # --- TABS DINAMICI BASATI SULLA CATEGORIA ---
 # Per u15/u17 nascondiamo Stats Individuali, Stats Quartetti e Minutaggi
 if categoria_attiva.lower() in ['u15', 'u17']:
-    tabs = st.tabs(["Stats Squadra", "Zone"])
     tab_names = ["Stats Squadra", "Zone"]
 else:
-    tabs = st.tabs(["Stats Squadra", "Top 5", "Stats Individuali", "Stats Quartetti", "Zone", "Minutaggi"])
     tab_names = ["Stats Squadra", "Top 5", "Stats Individuali", "Stats Quartetti", "Zone", "Minutaggi"]
+# on_change="rerun" rende i tab lazy: viene eseguito solo il contenuto del tab selezionato
+tabs = st.tabs(tab_names, key="stats_tab", on_change="rerun")
+
+
+def tab_visibile(nome):
+    """True se il tab esiste ed è selezionato (sempre True durante l'export PDF)."""
+    if nome not in tab_names:
+        return False
+    return export_pdf or tabs[tab_names.index(nome)].open is not False
+
+
+def minutaggi_pronti(nome):
+    """True se i minutaggi aggregati sono disponibili.
+
+    Altrimenti li calcola nella coda dei lavori e lo segnala nel tab: il pannello
+    dei lavori riesegue la pagina quando il calcolo è concluso. Durante l'export
+    PDF servono subito e vengono calcolati nello script.
+    """
+    if export_pdf or report_in_background(job_queue, reports, "minutaggi", f"Minutaggi stagione - {categoria_attiva}", owner=job_owner):
+        with tabs[tab_names.index(nome)]:
+            for errore in reports['minutaggi']['errori']:
+                st.warning(errore)
+        return True
+    with tabs[tab_names.index(nome)]:
+        st.info("⏳ Calcolo dei minutaggi della stagione in corso: il tab si aggiornerà automaticamente.")
+    return False
 
 # === TAB 1: Stats Squadra ===
-with tabs[0]:
-    st.header("Statistiche di squadra aggregate")
+if tab_visibile("Stats Squadra"):
+    with tabs[0]:
+        st.header("Statistiche di squadra aggregate")
     
-    # Sezione Possesso
-    with st.expander("⚽ Possesso", expanded=False):
-        render_section("Attacco", report_eventi['squadra']['attacco'], show_title=False, pdf_title="Stats Squadra - Possesso Attacco")
+        # Sezione Possesso
+        with st.expander("⚽ Possesso", expanded=False):
+            render_section("Attacco", reports['eventi']['squadra']['attacco'], show_title=False, pdf_title="Stats Squadra - Possesso Attacco")
     
-    # Sezione Non Possesso
-    with st.expander("🛡️ Non Possesso", expanded=False):
-        render_section("Difesa", report_eventi['squadra']['difesa'], show_title=False, pdf_title="Stats Squadra - Non Possesso Difesa")
+        # Sezione Non Possesso
+        with st.expander("🛡️ Non Possesso", expanded=False):
+            render_section("Difesa", reports['eventi']['squadra']['difesa'], show_title=False, pdf_title="Stats Squadra - Non Possesso Difesa")
     
-    # Sezione Perse/Recuperate
-    with st.expander("🔄 Perse/Recuperate", expanded=False):
-        palle_stats = {}
-        for periodo, data in report_eventi['squadra']['attacco'].items():
-            if periodo == 'Totale':
-                df_periodo = df_all
-            elif periodo == '1T':
-                df_periodo = df_all[df_all['Periodo'] == 'Primo tempo']
-            elif periodo == '2T':
-                df_periodo = df_all[df_all['Periodo'] == 'Secondo tempo']
-            else:
-                df_periodo = df_all
+        # Sezione Perse/Recuperate
+        with st.expander("🔄 Perse/Recuperate", expanded=False):
+            palle_stats = {}
+            for periodo, data in reports['eventi']['squadra']['attacco'].items():
+                if periodo == 'Totale':
+                    df_periodo = df_all
+                elif periodo == '1T':
+                    df_periodo = df_all[df_all['Periodo'] == 'Primo tempo']
+                elif periodo == '2T':
+                    df_periodo = df_all[df_all['Periodo'] == 'Secondo tempo']
+                else:
+                    df_periodo = df_all
             
-            palle_perse = len(df_periodo[(df_periodo['evento'].str.contains('Palla persa', na=False))])
-            ripartenze = len(df_periodo[(df_periodo['evento'].str.contains('Ripartenza', na=False)) & (df_periodo['squadra'] == 'Noi')])
-            palle_recuperate = len(df_periodo[(df_periodo['evento'].str.contains('Palla recuperata', na=False))])
-            ripartenze_loro = len(df_periodo[(df_periodo['evento'].str.contains('Ripartenza', na=False)) & (df_periodo['squadra'] == 'Loro')])
+                palle_perse = len(df_periodo[(df_periodo['evento'].str.contains('Palla persa', na=False))])
+                ripartenze = len(df_periodo[(df_periodo['evento'].str.contains('Ripartenza', na=False)) & (df_periodo['squadra'] == 'Noi')])
+                palle_recuperate = len(df_periodo[(df_periodo['evento'].str.contains('Palla recuperata', na=False))])
+                ripartenze_loro = len(df_periodo[(df_periodo['evento'].str.contains('Ripartenza', na=False)) & (df_periodo['squadra'] == 'Loro')])
             
-            palle_stats[periodo] = {
-                'palle_perse': palle_perse,
-                'ripartenze': ripartenze,
-                'palle_recuperate': palle_recuperate,
-                'ripartenze_loro': ripartenze_loro
-            }
+                palle_stats[periodo] = {
+                    'palle_perse': palle_perse,
+                    'ripartenze': ripartenze,
+                    'palle_recuperate': palle_recuperate,
+                    'ripartenze_loro': ripartenze_loro
+                }
         
-        render_section("Perse/Recuperate", palle_stats, show_title=False, pdf_title="Stats Squadra - Perse e Recuperate")
+            render_section("Perse/Recuperate", palle_stats, show_title=False, pdf_title="Stats Squadra - Perse e Recuperate")
     
-    # Sezione Falli
-    with st.expander("⚠️ Falli", expanded=False):
-        render_section("Falli", report_eventi['squadra']['falli'], show_title=False, pdf_title="Stats Squadra - Falli")
+        # Sezione Falli
+        with st.expander("⚠️ Falli", expanded=False):
+            render_section("Falli", reports['eventi']['squadra']['falli'], show_title=False, pdf_title="Stats Squadra - Falli")
     
-    # Sezione Portieri
-    with st.expander("🥅 Portieri", expanded=False):
-        col_p1, col_p2 = st.columns(2)
-        with col_p1:
-            render_section("Noi", report_eventi['squadra']['portieri_noi'], pdf_title="Stats Squadra - Portieri Noi")
-        with col_p2:
-            render_section("Loro", report_eventi['squadra']['portieri_loro'], pdf_title="Stats Squadra - Portieri Loro")
+        # Sezione Portieri
+        with st.expander("🥅 Portieri", expanded=False):
+            col_p1, col_p2 = st.columns(2)
+            with col_p1:
+                render_section("Noi", reports['eventi']['squadra']['portieri_noi'], pdf_title="Stats Squadra - Portieri Noi")
+            with col_p2:
+                render_section("Loro", reports['eventi']['squadra']['portieri_loro'], pdf_title="Stats Squadra - Portieri Loro")
 
 # === TAB 2: Top 5 ===
-if "Top 5" in tab_names:
+if tab_visibile("Top 5"):
     with tabs[tab_names.index("Top 5")]:
         st.header("🏆 Top 5")
         
@@ -662,7 +738,7 @@ if "Top 5" in tab_names:
         ]
         
         # Estrai i dati individuali totali
-        stats_individuali = report_eventi['individuali_split']['Totale']
+        stats_individuali = reports['eventi']['individuali_split']['Totale']
         
         # Raccogli tutte le tabelle da visualizzare
         tabelle_da_mostrare = []
@@ -715,8 +791,9 @@ if "Top 5" in tab_names:
                         append_pdf_section(f"Top 5 - {stat_label}", df_top5)
 
 # === TAB 3: Stats Individuali ===
-if "Stats Individuali" in tab_names:
+if tab_visibile("Stats Individuali") and minutaggi_pronti("Stats Individuali"):
     with tabs[tab_names.index("Stats Individuali")]:
+        minutaggi = reports['minutaggi']
         st.header("Statistiche individuali giocatori aggregate")
         
         def reorder_columns_gol(df):
@@ -735,7 +812,7 @@ if "Stats Individuali" in tab_names:
             return df
         
         with st.expander("👥 Giocatori - Totale", expanded=False):
-            df_tot = pd.DataFrame(report_eventi['individuali_split']['Totale']).T
+            df_tot = pd.DataFrame(reports['eventi']['individuali_split']['Totale']).T
             # Normalizza le statistiche
             df_tot = normalizza_stats_individuali(df_tot, minutaggi['totale'], tipo='giocatore')
             # Riordina colonne: metti minuti_giocati all'inizio, poi stats grezze (con gol_subiti dopo gol_fatti), poi normalizzate
@@ -759,7 +836,7 @@ if "Stats Individuali" in tab_names:
                 append_pdf_section("Stats Individuali - Totale", df_tot)
         
         with st.expander("👥 Giocatori - Primo Tempo", expanded=False):
-            df_1t = pd.DataFrame(report_eventi['individuali_split']['1T']).T
+            df_1t = pd.DataFrame(reports['eventi']['individuali_split']['1T']).T
             df_1t = normalizza_stats_individuali(df_1t, minutaggi['primo_tempo'], tipo='giocatore')
             cols_grezze = [c for c in df_1t.columns if c != 'minuti_giocati' and '_per_partita' not in c]
             df_temp = df_1t[cols_grezze]
@@ -779,7 +856,7 @@ if "Stats Individuali" in tab_names:
                 append_pdf_section("Stats Individuali - Primo Tempo", df_1t)
         
         with st.expander("👥 Giocatori - Secondo Tempo", expanded=False):
-            df_2t = pd.DataFrame(report_eventi['individuali_split']['2T']).T
+            df_2t = pd.DataFrame(reports['eventi']['individuali_split']['2T']).T
             df_2t = normalizza_stats_individuali(df_2t, minutaggi['secondo_tempo'], tipo='giocatore')
             cols_grezze = [c for c in df_2t.columns if c != 'minuti_giocati' and '_per_partita' not in c]
             df_temp = df_2t[cols_grezze]
@@ -801,7 +878,7 @@ if "Stats Individuali" in tab_names:
         st.header("Statistiche portieri individuali aggregate")
         
         with st.expander("🥅 Portieri - Totale", expanded=False):
-            df_port_tot = pd.DataFrame(report_eventi['portieri_individuali_split']['Totale']).T
+            df_port_tot = pd.DataFrame(reports['eventi']['portieri_individuali_split']['Totale']).T
             df_port_tot = normalizza_stats_individuali(df_port_tot, minutaggi['totale'], tipo='portiere')
             cols = ['minuti_giocati'] + [c for c in df_port_tot.columns if c != 'minuti_giocati' and '_per_partita' not in c] + [c for c in df_port_tot.columns if '_per_partita' in c]
             df_port_tot = df_port_tot[cols]
@@ -812,7 +889,7 @@ if "Stats Individuali" in tab_names:
                 append_pdf_section("Stats Portieri Individuali - Totale", df_port_tot)
         
         with st.expander("🥅 Portieri - Primo Tempo", expanded=False):
-            df_port_1t = pd.DataFrame(report_eventi['portieri_individuali_split']['1T']).T
+            df_port_1t = pd.DataFrame(reports['eventi']['portieri_individuali_split']['1T']).T
             df_port_1t = normalizza_stats_individuali(df_port_1t, minutaggi['primo_tempo'], tipo='portiere')
             cols = ['minuti_giocati'] + [c for c in df_port_1t.columns if c != 'minuti_giocati' and '_per_partita' not in c] + [c for c in df_port_1t.columns if '_per_partita' in c]
             df_port_1t = df_port_1t[cols]
@@ -823,7 +900,7 @@ if "Stats Individuali" in tab_names:
                 append_pdf_section("Stats Portieri Individuali - Primo Tempo", df_port_1t)
         
         with st.expander("🥅 Portieri - Secondo Tempo", expanded=False):
-            df_port_2t = pd.DataFrame(report_eventi['portieri_individuali_split']['2T']).T
+            df_port_2t = pd.DataFrame(reports['eventi']['portieri_individuali_split']['2T']).T
             df_port_2t = normalizza_stats_individuali(df_port_2t, minutaggi['secondo_tempo'], tipo='portiere')
             cols = ['minuti_giocati'] + [c for c in df_port_2t.columns if c != 'minuti_giocati' and '_per_partita' not in c] + [c for c in df_port_2t.columns if '_per_partita' in c]
             df_port_2t = df_port_2t[cols]
@@ -834,12 +911,13 @@ if "Stats Individuali" in tab_names:
                 append_pdf_section("Stats Portieri Individuali - Secondo Tempo", df_port_2t)
 
 # === TAB 4: Stats Quartetti ===
-if "Stats Quartetti" in tab_names:
+if tab_visibile("Stats Quartetti") and minutaggi_pronti("Stats Quartetti"):
     with tabs[tab_names.index("Stats Quartetti")]:
+        minutaggi = reports['minutaggi']
         st.header("Statistiche per quartetti aggregate")
         
-        report_quartetti = calcola_report_quartetti_completo(df_all)
-        report_quinto_uomo = calcola_report_quinto_uomo_completo(df_all)
+        report_quartetti = reports['quartetti']
+        report_quinto_uomo = reports['quinto_uomo']
         
         with st.expander("👥 Quartetti - Totale", expanded=False):
             if report_quartetti['Totale']:
@@ -924,10 +1002,19 @@ if "Stats Quartetti" in tab_names:
                 st.info("Nessuna situazione con quinto uomo trovata nel secondo tempo.")
 
 # === TAB Zone ===
-with tabs[tab_names.index("Zone")]:
+# Il tab è un fragment: cambiare un widget delle zone riesegue solo questa funzione,
+# non il caricamento dei dati né gli altri tab.
+@st.fragment
+def render_tab_zone():
+    # I grafici in cache restano associati alle partite aggregate (vedi image_cache.ambito_partite)
+    with ambito_partite(partite_ids):
+        _render_tab_zone()
+
+
+def _render_tab_zone():
     st.header("Analisi per zone di campo aggregate")
     campo = FutsalPitch()
-    report_zona = calcola_report_zona(df_all)
+    report_zona = reports['zona']
     zone_pdf_context["report_zona"] = report_zona
 
     with st.expander("🏆 Analisi Zone di Squadra", expanded=False):
@@ -950,14 +1037,13 @@ with tabs[tab_names.index("Zone")]:
                 )
                 if stat_keys_att_sel:
                     zone_pdf_context["team_att_metrics"] = stat_keys_att_sel
-                    fig, ax = draw_team_metric_per_zone(
-                        report_zona, campo, stat_keys_att_sel,
+                    st.image(team_zone_image(
+                        report_zona, stat_keys_att_sel,
                         team_key="attacco",
                         title="Attacco per zona (squadra)",
                         cmap=cm.Reds,
                         per_side=per_side_team
-                    )
-                    st.pyplot(fig)
+                    ), use_container_width=True)
             else:
                 st.info("Nessun dato di attacco disponibile.")
 
@@ -975,14 +1061,13 @@ with tabs[tab_names.index("Zone")]:
                 )
                 if stat_keys_dif_sel:
                     zone_pdf_context["team_dif_metrics"] = stat_keys_dif_sel
-                    fig, ax = draw_team_metric_per_zone(
-                        report_zona, campo, stat_keys_dif_sel,
+                    st.image(team_zone_image(
+                        report_zona, stat_keys_dif_sel,
                         team_key="difesa",
                         title="Difesa per zona (squadra)",
                         cmap=cm.Blues,
                         per_side=per_side_team
-                    )
-                    st.pyplot(fig)
+                    ), use_container_width=True)
             else:
                 st.info("Nessun dato di difesa disponibile.")
 
@@ -1037,14 +1122,13 @@ with tabs[tab_names.index("Zone")]:
                         zone_pdf_context.setdefault("player_metrics", {}).setdefault(giocatore_scelto, {})["attacco"] = stat_keys_att_gioc_sel
 
                     if stat_keys_att_gioc_sel:
-                        fig, ax = draw_player_metric_per_zone(
-                            report_zona['individuali'], campo, stat_keys_att_gioc_sel,
+                        st.image(player_zone_image(
+                            report_zona['individuali'], stat_keys_att_gioc_sel,
                             chi=giocatore_scelto,
                             title=f"Attacco per zona – {giocatore_scelto}",
                             cmap=cm.OrRd,
                             per_side=per_side_player
-                        )
-                        st.pyplot(fig)
+                        ), use_container_width=True)
 
                 with col2:
                     st.markdown(f"#### Difesa – {giocatore_scelto}")
@@ -1060,20 +1144,26 @@ with tabs[tab_names.index("Zone")]:
                         zone_pdf_context.setdefault("player_metrics", {}).setdefault(giocatore_scelto, {})["difesa"] = stat_keys_dif_gioc_sel
 
                     if stat_keys_dif_gioc_sel:
-                        fig, ax = draw_player_metric_per_zone(
-                            report_zona['individuali'], campo, stat_keys_dif_gioc_sel,
+                        st.image(player_zone_image(
+                            report_zona['individuali'], stat_keys_dif_gioc_sel,
                             chi=giocatore_scelto,
                             title=f"Difesa per zona – {giocatore_scelto}",
                             cmap=cm.BuPu,
                             per_side=per_side_player
-                        )
-                        st.pyplot(fig)
+                        ), use_container_width=True)
             else:
                 st.info("Nessun giocatore trovato.")
 
+
+if tab_visibile("Zone"):
+    with tabs[tab_names.index("Zone")]:
+        render_tab_zone()
+
+
 # === TAB Minutaggi ===
-if "Minutaggi" in tab_names:
+if tab_visibile("Minutaggi") and minutaggi_pronti("Minutaggi"):
     with tabs[tab_names.index("Minutaggi")]:
+        minutaggi = reports['minutaggi']
         st.header("Minutaggi aggregati")
         
         # I minutaggi sono già stati calcolati prima dei tabs (variabile `minutaggi`)
@@ -1092,7 +1182,8 @@ if "Minutaggi" in tab_names:
             "secondo_tempo": "Secondo tempo",
         }
 
-        for periodo, categorie in minutaggi.items():
+        for periodo in label_to_title:
+            categorie = minutaggi[periodo]
             with st.expander(label_to_title.get(periodo, periodo).upper(), expanded=False):
                 for key_cat, titolo in categorie_viste:
                     if key_cat in categorie and not categorie[key_cat].empty:
@@ -1109,128 +1200,68 @@ if "Minutaggi" in tab_names:
 st.markdown("---")
 st.subheader("Esporta report stagione")
 
-has_zone_pdf_content = bool(zone_pdf_context.get("team_att_metrics") or zone_pdf_context.get("team_dif_metrics") or zone_pdf_context.get("player_metrics"))
-if pdf_table_sections or has_zone_pdf_content:
-    if st.button("📄 Genera PDF", key="generate_stats_pdf"):
-        with st.spinner("Generazione report PDF in corso..."):
-            file_timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-            export_title = f"Report Stagione - {categoria_attiva} ({competizioni_label})"
-            image_sections = []
+def _richiedi_export_pdf():
+    st.session_state["stats_export_pdf"] = True
 
-            def metric_label(name: str) -> str:
-                return name.replace('_', ' ').title()
 
-            zona_report = zone_pdf_context.get("report_zona", {})
-            per_side_team_pdf = zone_pdf_context.get("team_per_side", True)
-            per_side_player_pdf = zone_pdf_context.get("player_per_side", True)
+# Profili più leggeri (JPEG, palette) riducono molto il PDF da scaricare in mobilità
+profilo_pdf = st.selectbox(
+    "Immagini nel PDF",
+    available_image_profiles(),
+    format_func=lambda p: IMAGE_PROFILE_LABELS.get(p, p),
+    key="stats_pdf_profile",
+)
 
-            for metric in zone_pdf_context.get("team_att_metrics", []):
-                try:
-                    fig, _ = draw_team_metric_per_zone(
-                        zona_report,
-                        FutsalPitch(),
-                        [metric],
-                        team_key="attacco",
-                        title=f"Attacco - {metric_label(metric)}",
-                        cmap=cm.Reds,
-                        per_side=per_side_team_pdf,
-                    )
-                    fig.set_size_inches(4.0, 3.0)
-                    image_sections.append(
-                        PdfImageSection(
-                            f"Zone Squadra Attacco - {metric_label(metric)}",
-                            figure_to_png_bytes(fig),
-                            max_width=320,
-                        )
-                    )
-                    plt.close(fig)
-                except Exception:
-                    continue
+# Il click imposta il flag e provoca un nuovo run in cui tutti i tab vengono calcolati
+st.button("📄 Genera PDF", key="generate_stats_pdf", on_click=_richiedi_export_pdf)
 
-            for metric in zone_pdf_context.get("team_dif_metrics", []):
-                try:
-                    fig, _ = draw_team_metric_per_zone(
-                        zona_report,
-                        FutsalPitch(),
-                        [metric],
-                        team_key="difesa",
-                        title=f"Difesa - {metric_label(metric)}",
-                        cmap=cm.Blues,
-                        per_side=per_side_team_pdf,
-                    )
-                    fig.set_size_inches(4.0, 3.0)
-                    image_sections.append(
-                        PdfImageSection(
-                            f"Zone Squadra Difesa - {metric_label(metric)}",
-                            figure_to_png_bytes(fig),
-                            max_width=320,
-                        )
-                    )
-                    plt.close(fig)
-                except Exception:
-                    continue
+def genera_pdf_stagione(export_title, table_sections, zone_context, encoding=None):
+    """PDF della stagione: tabelle raccolte dai tab e grafici zonali (eseguito nella coda dei lavori)."""
+    with ambito_partite(zone_context.get("partite", ())):
+        return _genera_pdf_stagione(export_title, table_sections, zone_context, encoding=encoding)
 
-            zona_individuali = zona_report.get("individuali", {})
-            for giocatore, metriche in zone_pdf_context.get("player_metrics", {}).items():
-                for metric in metriche.get("attacco", []):
-                    try:
-                        fig, _ = draw_player_metric_per_zone(
-                            zona_individuali,
-                            FutsalPitch(),
-                            [metric],
-                            chi=giocatore,
-                            title=f"{giocatore} - Attacco {metric_label(metric)}",
-                            cmap=cm.OrRd,
-                            per_side=per_side_player_pdf,
-                        )
-                        fig.set_size_inches(4.0, 3.0)
-                        image_sections.append(
-                            PdfImageSection(
-                                f"Zone {giocatore} Attacco - {metric_label(metric)}",
-                                figure_to_png_bytes(fig),
-                                max_width=320,
-                            )
-                        )
-                        plt.close(fig)
-                    except Exception:
-                        continue
 
-                for metric in metriche.get("difesa", []):
-                    try:
-                        fig, _ = draw_player_metric_per_zone(
-                            zona_individuali,
-                            FutsalPitch(),
-                            [metric],
-                            chi=giocatore,
-                            title=f"{giocatore} - Difesa {metric_label(metric)}",
-                            cmap=cm.BuPu,
-                            per_side=per_side_player_pdf,
-                        )
-                        fig.set_size_inches(4.0, 3.0)
-                        image_sections.append(
-                            PdfImageSection(
-                                f"Zone {giocatore} Difesa - {metric_label(metric)}",
-                                figure_to_png_bytes(fig),
-                                max_width=320,
-                            )
-                        )
-                        plt.close(fig)
-                    except Exception:
-                        continue
+def _genera_pdf_stagione(export_title, table_sections, zone_context, encoding=None):
+    # Le tabelle vengono impaginate solo in scrittura e ogni grafico finisce
+    # subito su file temporaneo: la memoria resta contenuta anche con tutti i giocatori
+    report = StreamingPdfReport(export_title, compact_tables=True)
+    report.add_tables(table_sections)
 
-            pdf_bytes = generate_pdf_report(
-                export_title,
-                table_sections=pdf_table_sections,
-                image_sections=image_sections,
-                compact_tables=True,
-            )
+    for section in iter_zone_image_sections(
+        zone_context,
+        encoding=encoding,
+        team_per_side=zone_context.get("team_per_side", True),
+        player_per_side=zone_context.get("player_per_side", True),
+    ):
+        report.add_image(section)
 
-        st.download_button(
-            "⬇️ Scarica PDF",
-            data=pdf_bytes,
+    try:
+        return report.to_bytes()
+    finally:
+        report.close()
+
+
+if export_pdf:
+    has_zone_pdf_content = bool(zone_pdf_context.get("team_att_metrics") or zone_pdf_context.get("team_dif_metrics") or zone_pdf_context.get("player_metrics"))
+    if pdf_table_sections or has_zone_pdf_content:
+        # Grafici e impaginazione vengono eseguiti nella coda dei lavori: la pagina resta utilizzabile
+        file_timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+        export_title = f"Report Stagione - {categoria_attiva} ({competizioni_label})"
+        job_queue.submit(
+            "pdf_stagione",
+            export_title,
+            genera_pdf_stagione,
+            export_title,
+            list(pdf_table_sections),
+            dict(zone_pdf_context),
+            encoding=profilo_pdf,
+            owner=job_owner,
+            key=("pdf_stagione", reports.fingerprint, profilo_pdf, zone_selection_key(zone_pdf_context)),
+            partite=partite_ids,
             file_name=f"report_stats_{file_timestamp}.pdf",
             mime="application/pdf",
-            key="download_stats_pdf",
         )
-else:
-    st.info("Nessun dato disponibile per l'esportazione PDF.")
+    else:
+        st.info("Nessun dato disponibile per l'esportazione PDF.")
+
+render_pannello_job(job_queue, job_owner, key_prefix="stagione")
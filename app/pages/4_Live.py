@@ -2,14 +2,28 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 
+import time
+
 from futsal_analysis.config_supabase import get_supabase_client
-from futsal_analysis.utils_eventi import (
-    calcola_palle_recuperate_perse,
-    calcola_attacco,
-    calcola_difesa,
-    calcola_report_completo,
+from futsal_analysis.live_feed import (
+    FEED_SUPABASE,
+    INTERVALLO_CONTROLLO,
+    INTERVALLO_VERIFICA,
+    LiveSubscriber,
+    get_change_feed,
+    live_feed_mode,
+)
+from futsal_analysis.live_accumulators import AVVISO, TIRO_LIBERO
+from futsal_analysis.live_session import LIVE_KEY_COLUMN, LiveSessions, live_key_column
+from futsal_analysis.match_index import get_indice_partite
+from futsal_analysis.match_report import (
+    MINUTAGGI_CATEGORIE_VISTE,
+    MINUTAGGI_LABEL_TO_TITLE,
+    format_column_names,
+    format_index_names,
 )
 from futsal_analysis.utils_pdf import PdfTableSection, generate_pdf_report
+from futsal_analysis.utils_time import format_mmss
 
 # Page configuration
 st.set_page_config(
@@ -20,172 +34,266 @@ st.set_page_config(
 
 st.title("⚽ Live")
 
-@st.cache_data(ttl=30)  # Cache for 30 seconds to avoid too many API calls
-def get_live_data():
-    """Fetch live data from Supabase"""
+supabase = get_supabase_client()
+
+def file_name_suffix(key):
+    """Parte del nome file del PDF che identifica la partita"""
+    return "".join(c if c.isalnum() else "_" for c in str(key).lower()) + "_"
+
+
+def carica_categorie_live():
+    """Categorie tra cui scegliere le partite live da seguire (indice condiviso con le altre pagine)"""
+    return list(get_indice_partite(supabase).categorie)
+
+def get_live_sessions():
+    """Sessioni live della sessione Streamlit, una per partita (categoria) seguita"""
+    if "live_sessions" not in st.session_state:
+        session_kwargs = {}
+        if live_feed_mode() == FEED_SUPABASE:
+            # In modalità push la tabella si rilegge solo come verifica periodica
+            session_kwargs["min_interval"] = INTERVALLO_VERIFICA
+        # Senza la colonna categoria nella tabella live si segue una sola partita, senza filtro
+        st.session_state["live_sessions"] = LiveSessions(key_column=live_key_column(supabase), **session_kwargs)
+    return st.session_state["live_sessions"]
+
+def get_live_subscribers():
+    """Iscrizioni al change feed per partita (vuoto se la modalità push è spenta)"""
+    return st.session_state.setdefault("live_subscribers", {})
+
+def get_live_subscriber(key):
+    """Iscrizione della partita al change feed (None se la modalità push è spenta)"""
+    feed = get_change_feed()
+    if feed is None:
+        return None
+    subscribers = get_live_subscribers()
+    if key not in subscribers:
+        live = get_live_sessions().get(key)
+        subscribers[key] = LiveSubscriber(feed, live.table, since_id=live.last_id, filters=live.filters)
+    return subscribers[key]
+
+def close_live_subscriber(key):
+    subscriber = get_live_subscribers().pop(key, None)
+    if subscriber is not None:
+        subscriber.close()
+
+def follow_live_matches(keys):
+    """Smette di seguire le partite non più selezionate"""
+    for key in get_live_sessions().keep(keys):
+        close_live_subscriber(key)
+
+def reset_live_session(key):
+    """Dimentica gli eventi letti e rinnova l'iscrizione al change feed"""
+    get_live_sessions().get(key).reset()
+    close_live_subscriber(key)
+
+def get_live_data(key, force=False):
+    """Fetch only new live events of one match from Supabase and return all its events"""
+    live = get_live_sessions().get(key)
+    subscriber = get_live_subscriber(key)
     try:
-        supabase = get_supabase_client()
-        response = supabase.table("live").select("*").execute()
-        return pd.DataFrame(response.data)
+        # Con l'emulatore locale gli eventi arrivano solo dal feed
+        if subscriber is None or live_feed_mode() == FEED_SUPABASE:
+            live.poll(supabase, force=force)
+        if subscriber is not None:
+            live.ingest(subscriber.drain())
     except Exception as e:
-        st.error(f"Error fetching live data: {e}")
-        return pd.DataFrame()
-
-def preprocess_live_data(df):
-    """
-    Preprocess live data to match the format expected by calcola_report_completo.
-    Handles period division based on 'fine primo tempo' event and removes quartetto column.
-    """
+        st.error(f"Error fetching live data ({key}): {e}")
+    return live.df
+
+def controlla_notifiche():
+    """Riesegue la pagina solo se il change feed ha notificato eventi nuovi"""
+    sessions = get_live_sessions()
+    for key, subscriber in list(get_live_subscribers().items()):
+        if key not in sessions:
+            continue
+        live = sessions.get(key)
+        verifica_scaduta = (
+            live_feed_mode() == FEED_SUPABASE
+            and live.last_poll is not None
+            and time.time() - live.last_poll >= live.min_interval
+        )
+        if subscriber.pending() or verifica_scaduta:
+            st.rerun(scope="app")
+
+
+def render_falli_squadra(key, falli_squadra):
+    """Falli di squadra del tempo in corso, con avvisi al 5° fallo e dal 6° (tiro libero)"""
+    periodo = falli_squadra.periodo or '1T'
+    falli_tempo = falli_squadra.falli(periodo)
+    colonne = st.columns(2)
+    for col, squadra, nome in ((colonne[0], 'Noi', 'Falli Noi'), (colonne[1], 'Loro', 'Falli Avversari')):
+        with col:
+            st.metric(f"{nome} ({periodo})", falli_tempo[squadra])
+            stato = falli_squadra.stato(squadra, periodo)
+            if stato == TIRO_LIBERO:
+                st.error("🚨 Oltre il 5° fallo: ogni fallo è tiro libero")
+            elif stato == AVVISO:
+                st.warning("⚠️ 5 falli: il prossimo è tiro libero")
+
+    # Notifica solo gli allarmi arrivati dall'ultimo rerun (non lo storico al primo caricamento)
+    visti = st.session_state.setdefault("live_allarmi_visti", {})
+    allarmi = falli_squadra.allarmi
+    if key not in visti or visti[key] > len(allarmi):
+        visti[key] = len(allarmi)
+    for allarme in allarmi[visti[key]:]:
+        st.toast(f"{key} - {allarme.messaggio}", icon="🚨" if allarme.livello == TIRO_LIBERO else "⚠️")
+    visti[key] = len(allarmi)
+
+
+def render_live_match(key, live):
+    """Statistiche live di una partita"""
+    df = live.df
     if df.empty:
-        return df
-    
-    df_processed = df.copy()
-    
-    # Remove quartetto column if it exists (will be empty for live data)
-    if 'quartetto' in df_processed.columns:
-        df_processed = df_processed.drop('quartetto', axis=1)
-    
-    # Determine period division based on 'fine primo tempo' event
-    # All events before 'fine primo tempo' are first period
-    # All events after 'fine primo tempo' are second period
-    fine_primo_tempo_index = None
-    
-    # Look for 'fine primo tempo' event
-    if 'evento' in df_processed.columns:
-        fine_primo_mask = df_processed['evento'].str.contains('fine primo tempo', case=False, na=False)
-        if fine_primo_mask.any():
-            fine_primo_tempo_index = df_processed[fine_primo_mask].index[0]
-    
-    # Create Periodo column
-    df_processed['Periodo'] = 'Primo tempo'  # Default to first period
-    
-    # If we found 'fine primo tempo', mark events after it as second period
-    if fine_primo_tempo_index is not None:
-        df_processed.loc[fine_primo_tempo_index + 1:, 'Periodo'] = 'Secondo tempo'
+        st.error("❌ No live data available.")
+        return
+
+    st.success(f"✅ Loaded {len(df)} live events (+{live.last_new_rows} at last update)")
+
+    render_falli_squadra(key, live.stats.falli_squadra)
     
-    return df_processed
+    # Statistiche di squadra aggiornate evento per evento dalla sessione live
+    # (stessi valori di calcola_report_completo, senza rifiltrare tutta la partita)
+    report_live = live.stats.as_report()
 
+    pdf_table_sections = []
 
+    def render_section(title, data_dict, show_title=True, pdf_section_title=None):
+        if show_title:
+            st.markdown(f"**{title}**")
+        try:
+            df_sec = pd.DataFrame(data_dict).fillna(0).astype(int)
+        except Exception:
+            df_sec = pd.DataFrame(data_dict).fillna(0)
 
-# Main app
-def main():
-    # Auto-refresh every 30 seconds
-    if st.button("🔄 Refresh Data"):
-        st.cache_data.clear()
-        st.rerun()
-    
-    # Fetch live data
-    with st.spinner("Loading live data..."):
-        df_raw = get_live_data()
-    
-    if not df_raw.empty:
-        st.success(f"✅ Loaded {len(df_raw)} live events")
-        
-        # Preprocess live data
-        df = preprocess_live_data(df_raw)
-        
-        # Calculate complete report using the same function as Partite page
-        report_eventi = calcola_report_completo(df)
-        
-        # Helper functions for formatting (same as Partite page)
-        pdf_table_sections = []
-
-        def format_column_names(df):
-            """Formatta i nomi delle colonne rimuovendo underscore e capitalizzando"""
-            new_columns = {}
-            for col in df.columns:
-                # Rimuovi underscore e capitalizza ogni parola
-                formatted = col.replace('_', ' ').title().replace(' Per Partita', ' x P')
-                new_columns[col] = formatted
-            return df.rename(columns=new_columns)
-        
-        def format_index_names(df):
-            """Formatta i nomi delle righe rimuovendo underscore e capitalizzando"""
-            new_index = {}
-            for idx in df.index:
-                if isinstance(idx, str):
-                    formatted = idx.replace('_', ' ').title().replace(' Per Partita', ' x P')
-                    new_index[idx] = formatted
-            return df.rename(index=new_index)
-
-        def render_section(title, data_dict, show_title=True, pdf_section_title=None):
-            if show_title:
-                st.markdown(f"**{title}**")
-            try:
-                df_sec = pd.DataFrame(data_dict).fillna(0).astype(int)
-            except Exception:
-                df_sec = pd.DataFrame(data_dict).fillna(0)
-            
-            # Formatta nomi colonne e righe
-            df_sec = format_column_names(df_sec)
-            df_sec = format_index_names(df_sec)
-            
-            st.dataframe(df_sec, use_container_width=True)
-
-            if pdf_section_title:
-                pdf_table_sections.append(PdfTableSection(pdf_section_title, df_sec.copy()))
-
-            return df_sec
-
-        # Sezione Possesso
-        with st.expander("⚽ Possesso", expanded=False):
-            render_section("Attacco", report_eventi['squadra']['attacco'], show_title=False, pdf_section_title="Possesso - Attacco")
-        
-        # Sezione Non Possesso
-        with st.expander("🛡️ Non Possesso", expanded=False):
-            render_section("Difesa", report_eventi['squadra']['difesa'], show_title=False, pdf_section_title="Non Possesso - Difesa")
-        
-        # Sezione Perse/Recuperate
-        with st.expander("🔄 Perse/Recuperate", expanded=False):
-            # Calcola le statistiche per palle perse e recuperate usando la funzione dedicata
-            palle_stats = {}
-            for periodo, data in report_eventi['squadra']['attacco'].items():
-                # Calcola le statistiche per questo periodo
-                if periodo == 'Totale':
-                    df_periodo = df
-                elif periodo == '1T':
-                    df_periodo = df[df['Periodo'] == 'Primo tempo']
-                elif periodo == '2T':
-                    df_periodo = df[df['Periodo'] == 'Secondo tempo']
-                else:
-                    df_periodo = df
-                
-                # Calcola palle perse e ripartenze per la nostra squadra
-                palle_perse = len(df_periodo[(df_periodo['evento'].str.contains('Palla persa', na=False))])
-                ripartenze = len(df_periodo[(df_periodo['evento'].str.contains('Ripartenza', na=False)) & (df_periodo['squadra'] == 'Noi')])
-                palle_recuperate = len(df_periodo[(df_periodo['evento'].str.contains('Palla recuperata', na=False))])
-                ripartenze_loro = len(df_periodo[(df_periodo['evento'].str.contains('Ripartenza', na=False)) & (df_periodo['squadra'] == 'Loro')])
-                
-                palle_stats[periodo] = {
-                    'palle_perse': palle_perse,
-                    'ripartenze': ripartenze,
-                    'palle_recuperate': palle_recuperate,
-                    'ripartenze_loro': ripartenze_loro
-                }
-            
-            render_section("Perse/Recuperate", palle_stats, show_title=False, pdf_section_title="Perse e Recuperate")
-        
-        # Sezione Falli
-        with st.expander("⚠️ Falli", expanded=False):
-            render_section("Falli", report_eventi['squadra']['falli'], show_title=False, pdf_section_title="Falli")
-
-        if pdf_table_sections:
+        # Formatta nomi colonne e righe
+        df_sec = format_column_names(df_sec)
+        df_sec = format_index_names(df_sec)
+
+        st.dataframe(df_sec, use_container_width=True)
+
+        if pdf_section_title:
+            pdf_table_sections.append(PdfTableSection(pdf_section_title, df_sec.copy()))
+
+        return df_sec
+
+    # Sezione Possesso
+    with st.expander("⚽ Possesso", expanded=False):
+        render_section("Attacco", report_live['attacco'], show_title=False, pdf_section_title="Possesso - Attacco")
+
+    # Sezione Non Possesso
+    with st.expander("🛡️ Non Possesso", expanded=False):
+        render_section("Difesa", report_live['difesa'], show_title=False, pdf_section_title="Non Possesso - Difesa")
+
+    # Sezione Perse/Recuperate
+    with st.expander("🔄 Perse/Recuperate", expanded=False):
+        # Palle perse/recuperate e ripartenze per periodo (contatori incrementali)
+        palle_stats = report_live['palle']
+
+        render_section("Perse/Recuperate", palle_stats, show_title=False, pdf_section_title="Perse e Recuperate")
+
+    # Sezione Falli
+    with st.expander("⚠️ Falli", expanded=False):
+        render_section("Falli", report_live['falli'], show_title=False, pdf_section_title="Falli")
+
+    # Sezione Minutaggi (tempo reale, aggiornati evento per evento)
+    with st.expander("⏱️ Minutaggi", expanded=False):
+        minutaggi_live = live.stats.minutaggi
+        if minutaggi_live.in_campo is not None:
+            portiere, movimento = minutaggi_live.in_campo
+            in_campo = ", ".join(movimento) + (f" (portiere {portiere})" if portiere else "")
+            st.markdown(f"**In campo da {format_mmss(minutaggi_live.in_campo_da)}**: {in_campo}")
+            st.dataframe(format_column_names(minutaggi_live.cronometri()), use_container_width=True, hide_index=True)
+
+        minutaggi = minutaggi_live.as_minutaggi(categorie=[key_cat for key_cat, _ in MINUTAGGI_CATEGORIE_VISTE])
+        tabs_periodo = st.tabs([MINUTAGGI_LABEL_TO_TITLE.get(periodo, periodo) for periodo in minutaggi])
+        for tab_periodo, (periodo, categorie) in zip(tabs_periodo, minutaggi.items()):
+            with tab_periodo:
+                for key_cat, titolo in MINUTAGGI_CATEGORIE_VISTE:
+                    if key_cat in categorie and not categorie[key_cat].empty:
+                        st.markdown(f"**{titolo}**")
+                        df_minutaggi = format_column_names(categorie[key_cat])
+                        st.dataframe(df_minutaggi, use_container_width=True, hide_index=True)
+                        # Nel PDF solo i minutaggi della partita intera
+                        if periodo == "totale":
+                            pdf_table_sections.append(PdfTableSection(f"Minutaggi - {titolo} (Totale)", df_minutaggi.copy()))
+
+    if pdf_table_sections:
+        # Il PDF si genera solo su richiesta: ogni evento in arrivo riesegue la pagina.
+        # Resta scaricabile quando arrivano eventi nuovi, finché non viene aggiornato
+        pdf_state_key = f"live_pdf_dati_{key}"
+        pdf_salvato = st.session_state.get(pdf_state_key)
+        aggiornato = pdf_salvato is not None and pdf_salvato["version"] == live.version
+        etichetta = "📄 Genera PDF" if pdf_salvato is None else "📄 Aggiorna PDF"
+        if st.button(etichetta, key=f"live_pdf_genera_{key}"):
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
             file_timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-            pdf_bytes = generate_pdf_report(
-                f"Report Live {timestamp}",
-                table_sections=pdf_table_sections,
-            )
+            pdf_salvato = {
+                "version": live.version,
+                "eventi": len(df),
+                "data": generate_pdf_report(f"Report Live {key} {timestamp}", table_sections=pdf_table_sections),
+                "file_name": f"live_report_{file_name_suffix(key)}{file_timestamp}.pdf",
+            }
+            st.session_state[pdf_state_key] = pdf_salvato
+            aggiornato = True
 
+        if pdf_salvato is not None:
             st.download_button(
                 "📄 Esporta PDF",
-                data=pdf_bytes,
-                file_name=f"live_report_{file_timestamp}.pdf",
+                data=pdf_salvato["data"],
+                file_name=pdf_salvato["file_name"],
                 mime="application/pdf",
+                key=f"live_pdf_{key}",
+                on_click="ignore",
             )
+            if not aggiornato:
+                st.caption(f"PDF generato con {pdf_salvato['eventi']} eventi: aggiornalo per includere i nuovi.")
+
+
+# Main app
+def main():
+    categorie = carica_categorie_live()
+    categoria_default = st.session_state.get('categoria_selezionata')
+    partite_seguite = st.multiselect(
+        "Partite live (categoria)",
+        categorie,
+        default=[categoria_default] if categoria_default in categorie else categorie[:1],
+        key="live_partite_seguite",
+    )
+    if get_live_sessions().key_column is None and len(partite_seguite) > 1:
+        st.warning(
+            f"La tabella live non ha ancora la colonna `{LIVE_KEY_COLUMN}` (vedi ISTRUZIONI_CATEGORIA.md): "
+            f"si può seguire una sola partita, viene mostrata {partite_seguite[0]}."
+        )
+        partite_seguite = partite_seguite[:1]
+    follow_live_matches(partite_seguite)
+    if not partite_seguite:
+        st.info("Seleziona almeno una partita da seguire.")
+        return
+
+    # Il refresh rilegge tutta la tabella (es. eventi corretti o cancellati)
+    refresh = st.button("🔄 Refresh Data")
+    if refresh:
+        for key in partite_seguite:
+            reset_live_session(key)
     
+    # Fetch live data: solo gli eventi con id successivo all'ultimo già letto, partita per partita
+    # (in modalità push, quelli notificati dal change feed)
+    with st.spinner("Loading live data..."):
+        for key in partite_seguite:
+            get_live_data(key, force=refresh)
+
+    if get_live_subscribers():
+        ricevute = sum(sub.received for sub in get_live_subscribers().values())
+        st.caption(f"📡 Aggiornamento automatico attivo ({ricevute} notifiche ricevute)")
+        st.fragment(controlla_notifiche, run_every=INTERVALLO_CONTROLLO)()
+
+    sessions = get_live_sessions()
+    if len(partite_seguite) == 1:
+        render_live_match(partite_seguite[0], sessions.get(partite_seguite[0]))
     else:
-        st.error("❌ No live data available.")
+        for tab, key in zip(st.tabs(partite_seguite), partite_seguite):
+            with tab:
+                render_live_match(key, sessions.get(key))
 
 if __name__ == "__main__":
     main()
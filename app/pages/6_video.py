@@ -1,40 +1,137 @@
+import math
+
 import streamlit as st
+from futsal_analysis.cache_registry import CATEGORIA, registra_invalidatore
 from futsal_analysis.config_supabase import get_supabase_client
+from futsal_analysis.data_access import PARTITE_VIDEO, leggi_pagina_partite
+from futsal_analysis.match_index import get_indice_partite
+from futsal_analysis.video_gallery import miniatura_youtube
 
 st.set_page_config(page_title="Video Partite", layout="wide", page_icon="🎥")
 
+PARTITE_PER_PAGINA = 9
+N_COLS = 3
+
 # --- VERIFICA CATEGORIA SELEZIONATA ---
 supabase = get_supabase_client()
 
 # Se non c'è una categoria in session_state, imposta un default
 if 'categoria_selezionata' not in st.session_state:
-    # Carica le categorie disponibili
-    res_all = supabase.table("partite").select("categoria").execute()
-    categorie_disponibili = sorted(list(set([p.get('categoria', 'Prima Squadra') for p in res_all.data if p.get('categoria')])))
-    st.session_state['categoria_selezionata'] = categorie_disponibili[0] if categorie_disponibili else 'Prima Squadra'
+    # Categorie disponibili dall'indice condiviso (nessuna query se è già in memoria)
+    st.session_state['categoria_selezionata'] = get_indice_partite(supabase).categoria_default()
 
 categoria_attiva = st.session_state['categoria_selezionata']
 
 st.header(f"Tutte le partite disponibili - {categoria_attiva}")
 st.info(f"📂 Categoria attiva: **{categoria_attiva}** (modificabile dalla Homepage)")
 
-# --- Carica partite FILTRATE PER CATEGORIA ---
-res = supabase.table("partite").select("*").eq("categoria", categoria_attiva).order("data", desc=True).execute()
-partite = res.data
+
+# --- Carica una pagina di partite (filtri e paginazione fatti da Supabase) ---
+@st.cache_data(ttl=600)
+def carica_pagina(categoria, competizione, data_da, data_a, pagina):
+    return leggi_pagina_partite(
+        supabase, PARTITE_VIDEO, pagina, PARTITE_PER_PAGINA,
+        categoria=categoria, competizione=competizione, data_da=data_da, data_a=data_a,
+    )
+
+
+def _invalida_pagine(categoria):
+    # La chiave contiene anche filtri e pagina: si scartano tutte le pagine
+    carica_pagina.clear()
+    return 1
+
+
+registra_invalidatore("6_video:partite", _invalida_pagine, ambito=CATEGORIA)
+
+
+def apri_video(partita):
+    st.session_state['video_aperto'] = partita
+
+
+def chiudi_video():
+    st.session_state.pop('video_aperto', None)
+
+
+def cambia_pagina(delta):
+    st.session_state['video_pagina'] += delta
+
+
+# --- Filtri ---
+competizioni = get_indice_partite(supabase).competizioni_di(categoria_attiva)
+col_comp, col_da, col_a = st.columns([2, 1, 1])
+with col_comp:
+    competizione = st.selectbox(
+        "Competizione", ["Tutte", *competizioni],
+        format_func=lambda c: c if c == "Tutte" else c.capitalize(),
+    )
+with col_da:
+    data_da = st.date_input("Dal", value=None, format="DD/MM/YYYY")
+with col_a:
+    data_a = st.date_input("Al", value=None, format="DD/MM/YYYY")
+competizione = None if competizione == "Tutte" else competizione
+
+# Con filtri nuovi si riparte dalla prima pagina
+filtri = (categoria_attiva, competizione, data_da, data_a)
+if st.session_state.get('video_filtri') != filtri:
+    st.session_state['video_filtri'] = filtri
+    st.session_state['video_pagina'] = 0
+    chiudi_video()
+
+partite, totale = carica_pagina(*filtri, st.session_state['video_pagina'])
+n_pagine = max(1, math.ceil(totale / PARTITE_PER_PAGINA))
+if st.session_state['video_pagina'] >= n_pagine:
+    # Partite eliminate nel frattempo: torna all'ultima pagina disponibile
+    st.session_state['video_pagina'] = n_pagine - 1
+    partite, totale = carica_pagina(*filtri, st.session_state['video_pagina'])
 
 if not partite:
     st.warning("Nessuna partita trovata.")
     st.stop()
 
-# --- Griglia partite con video ---
-n_cols = 2  # 2 colonne per non stringere troppo i video
-for i in range(0, len(partite), n_cols):
-    cols = st.columns(n_cols)
-    for j, partita in enumerate(partite[i:i+n_cols]):
-        with cols[j]:
-            st.markdown(f"### {partita['avversario'].title()}")
-            st.write(f"{partita['competizione'].capitalize()} — {partita['data']}")
+# --- Player: solo per la partita aperta ---
+aperta = st.session_state.get('video_aperto')
+if aperta:
+    with st.container(border=True):
+        col_titolo, col_chiudi = st.columns([5, 1])
+        with col_titolo:
+            st.markdown(f"### {aperta['avversario'].title()}")
+            st.write(f"{(aperta.get('competizione') or '').capitalize()} — {aperta['data']}")
+        with col_chiudi:
+            st.button("✖ Chiudi", key="chiudi_video", on_click=chiudi_video, width="stretch")
+        st.video(aperta["yt_link"])
+
+# --- Galleria: solo miniature ---
+for i in range(0, len(partite), N_COLS):
+    cols = st.columns(N_COLS)
+    for j, partita in enumerate(partite[i:i+N_COLS]):
+        with cols[j], st.container(border=True):
+            miniatura = miniatura_youtube(partita.get("yt_link"))
+            if miniatura:
+                st.image(miniatura, width="stretch")
+            elif partita.get("yt_link"):
+                st.caption("🎞️ Anteprima non disponibile")
+            st.markdown(f"**{partita['avversario'].title()}**")
+            st.caption(f"{(partita.get('competizione') or '').capitalize()} — {partita['data']}")
             if partita.get("yt_link"):
-                st.video(partita["yt_link"])
+                st.button(
+                    "▶ Guarda", key=f"apri_video_{partita['id']}",
+                    on_click=apri_video, args=(partita,), width="stretch",
+                )
             else:
                 st.warning("Nessun link YouTube disponibile per questa partita.")
+
+# --- Navigazione tra le pagine ---
+pagina = st.session_state['video_pagina']
+col_prec, col_info, col_succ = st.columns([1, 2, 1])
+with col_prec:
+    st.button("◀ Precedenti", on_click=cambia_pagina, args=(-1,), disabled=pagina == 0, width="stretch")
+with col_info:
+    st.markdown(
+        f"<div style='text-align:center'>Pagina {pagina + 1} di {n_pagine} · {totale} partite</div>",
+        unsafe_allow_html=True,
+    )
+with col_succ:
+    st.button(
+        "Successive ▶", on_click=cambia_pagina, args=(1,),
+        disabled=pagina >= n_pagine - 1, width="stretch",
+    )
@@ -1,104 +1,36 @@
 import streamlit as st
 import pandas as pd
 from supabase import create_client
+from futsal_analysis.cache_registry import invalida_categoria, invalida_partita
 from futsal_analysis.config_supabase import get_supabase_client
+from futsal_analysis.data_access import EVENTI_QUALITA, PARTITE_ADMIN, leggi_eventi, leggi_partite
+from futsal_analysis.ingestion import (
+    backfill_tempi,
+    ingest_eventi_csv,
+    preprocess_eventi,
+    read_eventi_csv,
+    tempi_salvati,
+    to_id_partita,
+)
+from futsal_analysis.match_deletion import conta_eventi, elimina_partita
+from futsal_analysis.match_summary import aggiorna_riepilogo, aggiorna_riepiloghi
+from futsal_analysis.season_import import MANIFEST, importa_stagione, report_import
+from futsal_analysis.data_quality import valida_partita
 
 # === CONFIG ===
 supabase = get_supabase_client()
 
 # === UTILS ===
-def to_id_partita(data, avversario):
-    return f"{data}_{avversario}".replace(" ", "_").replace("/", "-")
-
-
-def parse_data_sicura(data_str):
-    try:
-        return pd.to_datetime(data_str, format="%d/%m/%Y", errors="raise")
-    except Exception:
-        try:
-            return pd.to_datetime(data_str, errors="raise")
-        except:
-            return pd.NaT
-
-
-def preprocess_eventi(df: pd.DataFrame, partita_id: str, categoria: str = None) -> pd.DataFrame:
-    df = df.rename(columns={
-        "Posizione": "posizione",
-        "Position": "posizione",
-        "Data": "data",
-        "Evento": "evento",
-        "Portiere": "portiere",
-        "Quartetto": "quartetto",
-        "Chi": "chi",
-        "Esito": "esito",
-        "Field Position": "dove",
-        "Piede": "piede",
-        "Squadra": "squadra",
-        "Dove": "dove",
-        "Lato": "lato",
-    })
-
-    df["partita_id"] = partita_id
-
-    # Gestione diversa per categorie u15/u17 (CSV semplificato)
-    if categoria and categoria.lower() in ['u15', 'u17']:
-        # Per u15/u17, le colonne mancanti vengono impostate a stringa vuota
-        colonne_manche = ["portiere", "quartetto", "chi", "esito", "piede"]
-        for col in colonne_manche:
-            if col not in df.columns:
-                df[col] = ""
-        
-        # Non processare quartetto per u15/u17
-        split_cols = None
+def mostra_rapporto_qualita(rapporto):
+    """Esito dei controlli di qualità: riepilogo e tabella dei problemi"""
+    if not rapporto.problemi:
+        st.success(f"✅ Nessun problema sui {rapporto.eventi} eventi")
+        return
+    if rapporto.ok:
+        st.warning(f"⚠️ {len(rapporto.problemi)} avvisi sui {rapporto.eventi} eventi")
     else:
-        # Gestione normale per Prima Squadra e U19
-        if "quartetto" in df.columns:
-            # splitto in massimo 5 colonne (0–4)
-            split_cols = df["quartetto"].fillna("").astype(str).str.split(";", expand=True)
-
-            # sostituisco la colonna originale col primo giocatore
-            df["quartetto"] = split_cols[0].str.strip()
-
-        # creo le altre colonne (dal 2° giocatore in poi)
-        for i in range(1, 5):  # dal secondo fino al quinto
-            col_name = f"quartetto_{i}"
-            if split_cols is not None and i < split_cols.shape[1]:
-                df[col_name] = split_cols[i].str.strip()
-            else:
-                df[col_name] = None  # oppure "" se vuoi stringa vuota
-
-    # Conversione data → YYYY-MM-DD
-    if "data" in df.columns:
-        df["data"] = pd.to_datetime(df["data"], format="%d/%m/%Y", errors="coerce").dt.strftime("%Y-%m-%d")
-
-    # 🔑 Qui NON converto più Position a numerico: la tengo come stringa
-    if "posizione" in df.columns:
-        df["posizione"] = df["posizione"].fillna("").astype(str).str.strip()
-
-    colonne_finali = [
-        "posizione", "data", "evento", "chi", "esito", "dove", "lato", "piede", 
-         "portiere", 
-         "quartetto",
-         "quartetto_1", "quartetto_2", "quartetto_3", "quartetto_4",
-         "squadra",
-         "partita_id"
-    ]
-    for col in colonne_finali:
-        if col not in df.columns:
-            df[col] = ""
-
-    df = df[colonne_finali]
-    df = df.fillna("")
-    
-    # Sostituisci anche le stringhe 'nan' con stringhe vuote
-    df = df.replace('nan', '')
-    
-    # ✅ ORDINAMENTO per posizione prima del salvataggio
-    df = df.sort_values("posizione")
-
-    return df
-
-
+        st.error(f"❌ {len(rapporto.errori)} errori e {len(rapporto.problemi) - len(rapporto.errori)} avvisi sui {rapporto.eventi} eventi")
+    st.dataframe(rapporto.to_frame(), use_container_width=True, hide_index=True)
 
 # === STREAMLIT APP ===
 st.set_page_config(page_title="Admin", layout="wide", page_icon="🔧")
@@ -134,11 +66,42 @@ with st.form("nuova_partita"):
                 "yt_link": yt_link
             }).execute()
             st.success(f"✅ Partita '{avversario}' inserita con ID {partita_id} nella categoria '{categoria}'")
+            # Le pagine tengono in cache le letture per categoria: si aggiorna solo questa
+            # (e l'indice, così nuove categorie e competizioni compaiono subito nei menu)
+            invalida_categoria(categoria)
+
+# --- Import stagione: più partite e CSV insieme ---
+with st.expander("📦 Importa stagione (ZIP o cartella con manifest)"):
+    st.caption(
+        f"Un CSV eventi per partita più un `{MANIFEST}` con le colonne "
+        "file, data, avversario, competizione, categoria, yt_link. "
+        "Le partite vengono create (o aggiornate) e gli eventi caricati; ripetere l'import non duplica nulla."
+    )
+    zip_stagione = st.file_uploader("Archivio ZIP", type=["zip"], key="import_stagione_zip")
+    cartella_stagione = st.text_input("...oppure percorso di una cartella sul server", key="import_stagione_cartella")
+    sorgente_stagione = zip_stagione or cartella_stagione.strip()
+    if sorgente_stagione and st.button("Importa stagione"):
+        barra_import = st.progress(0.0, text="Import in corso...")
+
+        def _file_importato(completati, totale, esito):
+            barra_import.progress(completati / max(1, totale), text=f"{completati}/{totale} - {esito.file}")
+
+        try:
+            esiti_import = importa_stagione(supabase, sorgente_stagione, progress=_file_importato)
+        except (ValueError, OSError) as e:
+            st.error(f"❌ Import non riuscito: {e}")
+        else:
+            riusciti = sum(1 for e in esiti_import if e.ok)
+            if riusciti == len(esiti_import):
+                st.success(f"✅ Importati {riusciti} file su {len(esiti_import)}")
+            else:
+                st.warning(f"⚠️ Importati {riusciti} file su {len(esiti_import)}")
+            st.dataframe(report_import(esiti_import), use_container_width=True, hide_index=True)
 
 # --- SEZIONE 2: Upload CSV eventi ---
 st.header("📂 Carica eventi da CSV")
 
-partite = supabase.table("partite").select("id, avversario, data, categoria").order("data", desc=True).execute().data
+partite = leggi_partite(supabase, PARTITE_ADMIN)
 if not partite:
     st.warning("Nessuna partita trovata, crea prima una nuova partita.")
     st.stop()
@@ -153,36 +116,116 @@ if file and partita_scelta:
     partita_info = next((p for p in partite if p['id'] == partita_id), None)
     categoria = partita_info.get('categoria', 'Prima Squadra') if partita_info else 'Prima Squadra'
     
-    # Forza le colonne problematiche a essere stringhe per evitare errori PyArrow
-    dtype_dict = {
-        'Dove': str,
-        'Field Position': str,
-        'Posizione': str,
-        'Position': str,
-        'Chi': str,
-        'Esito': str,
-        'Piede': str,
-        'Squadra': str,
-        'Lato': str
-    }
-    df_raw = pd.read_csv(file, dtype=dtype_dict)
-
-    # ✅ Preprocessing con categoria
-    df = preprocess_eventi(df_raw, partita_id, categoria)
-    eventi_data = df.to_dict(orient="records")
+    # Anteprima: solo le prime righe, il file viene letto a blocchi durante il caricamento
+    df_anteprima = preprocess_eventi(next(read_eventi_csv(file, nrows=200), pd.DataFrame()), partita_id, categoria)
 
     st.write("Anteprima dati preprocessati:")
-    st.dataframe(df.head(20))
+    st.dataframe(df_anteprima.head(20))
+
+    # Controlli sull'intero file, nell'ordine originale delle righe: solo a richiesta, e il
+    # rapporto resta in sessione per questo file (i rerun non rileggono il CSV)
+    with st.expander("🩺 Controllo qualità del file", expanded=True):
+        chiave_qualita = (getattr(file, "file_id", file.name), partita_id)
+        controllato = st.session_state.get("rapporto_qualita")
+        if controllato is None or controllato[0] != chiave_qualita:
+            controllato = None
+            if st.button("Controlla il file", key="controlla_qualita"):
+                df_file = pd.concat(
+                    [preprocess_eventi(chunk, partita_id, categoria, ordina=False) for chunk in read_eventi_csv(file)]
+                )
+                controllato = (chiave_qualita, valida_partita(df_file, categoria))
+                st.session_state["rapporto_qualita"] = controllato
+            else:
+                st.caption("Il controllo legge l'intero file: avvialo prima di caricare gli eventi.")
+        if controllato is not None:
+            mostra_rapporto_qualita(controllato[1])
 
     if st.button("Carica eventi nel DB"):
-        batch_size = 500
-        for i in range(0, len(eventi_data), batch_size):
-            supabase.table("eventi").insert(eventi_data[i:i+batch_size]).execute()
-        st.success(f"✅ Caricati {len(eventi_data)} eventi per la partita {partita_id}")
+        barra = st.progress(0.0, text="Caricamento eventi...")
+        stima_righe = max(1, getattr(file, "size", 0) // 120)
+
+        def _avanzamento(parziale):
+            barra.progress(
+                min(parziale.rows / stima_righe, 1.0),
+                text=f"{parziale.rows} eventi caricati ({parziale.rows_per_second:.0f} righe/s)",
+            )
+
+        # Ricaricare lo stesso file non duplica gli eventi: quelli invariati vengono saltati
+        esito = ingest_eventi_csv(supabase, file, partita_id, categoria, progress=_avanzamento)
+        barra.progress(1.0, text=f"{esito.rows} eventi scritti")
+        if esito.errors:
+            st.error(f"❌ {len(esito.errors)} lotti non caricati dopo {esito.retries} nuovi tentativi: {esito.errors[0]}")
+        if esito.inserted or esito.updated or esito.removed:
+            # Gol, tiri e risultato letti dalla Home senza scaricare gli eventi
+            aggiorna_riepilogo(supabase, partita_id)
+            # Solo le cache di questa partita (letture, report, immagini, PDF)
+            invalida_partita(partita_id)
+        st.success(
+            f"✅ Partita {partita_id}: {esito.inserted} eventi nuovi, {esito.updated} aggiornati, "
+            f"{esito.skipped} invariati (saltati), {esito.removed} eliminati perché non più nel file "
+            f"in {esito.seconds:.1f}s ({esito.rows_per_second:.0f} righe/s)"
+        )
+
+# Partite caricate prima che periodo e tempi venissero salvati con gli eventi
+with st.expander("⏱️ Migra periodo, tempi e riepiloghi delle partite esistenti"):
+    st.caption("Calcola una volta periodo e tempi degli eventi già caricati e il riepilogo di ogni partita (gol, tiri, risultato), così le pagine non li ricalcolano a ogni lettura. Periodo e tempi già migrati vengono saltati.")
+    if st.button("Avvia migrazione"):
+        barra_migrazione = st.progress(0.0, text="Migrazione in corso...")
+        ids_partite = [p['id'] for p in partite]
+        fatte = []
+
+        def _partita_migrata(partita_id, esito):
+            fatte.append(partita_id)
+            barra_migrazione.progress(len(fatte) / max(1, len(ids_partite)), text=f"{partita_id}: {esito.updated} eventi aggiornati")
+
+        if tempi_salvati(supabase):
+            esiti = backfill_tempi(supabase, ids_partite, progress=_partita_migrata)
+        else:
+            # Senza le colonne dei tempi si salvano solo i riepiloghi
+            st.warning("⚠️ La tabella eventi non ha ancora le colonne dei tempi: aggiungile come in ISTRUZIONI_CATEGORIA.md e ripeti la migrazione.")
+            esiti = {}
+        aggiornati = sum(e.updated for e in esiti.values())
+        migrate = sum(1 for e in esiti.values() if e.updated)
+        errori = [f"{pid}: {e.errors[0]}" for pid, e in esiti.items() if e.errors]
+        if errori:
+            st.error("❌ Migrazione non riuscita per: " + "; ".join(errori))
+        riepiloghi_salvati = aggiorna_riepiloghi(supabase, ids_partite)
+        st.success(
+            f"✅ {migrate} partite migrate ({aggiornati} eventi), {len(esiti) - migrate} già a posto; "
+            f"{riepiloghi_salvati} riepiloghi salvati su {len(ids_partite)}"
+        )
+        # Riepiloghi ricalcolati per tutte le partite (e tempi per quelle migrate)
+        for partita_id_migrata in ids_partite:
+            invalida_partita(partita_id_migrata)
+
+# Controllo qualità delle partite già caricate
+with st.expander("🩺 Controllo qualità partite salvate"):
+    partita_verifica = st.selectbox(
+        "Partita da verificare",
+        [f"{p['data']} - {p['avversario']} - {p.get('categoria', 'N/A')} ({p['id']})" for p in partite],
+        key="verifica_partita"
+    )
+    if partita_verifica and st.button("Verifica partita"):
+        partita_id_verifica = partita_verifica.split("(")[-1].strip(")")
+        info_verifica = next((p for p in partite if p['id'] == partita_id_verifica), {})
+        mostra_rapporto_qualita(valida_partita(leggi_eventi(supabase, EVENTI_QUALITA, [partita_id_verifica]), info_verifica.get('categoria')))
 
 # --- SEZIONE 3: Elimina eventi partita ---
 st.header("🗑️ Elimina eventi partita")
 
+if "esito_eliminazione" in st.session_state:
+    avversario_eliminato, esito_elimina = st.session_state.pop("esito_eliminazione")
+    pulite = ", ".join(f"{livello} {n}" for livello, n in esito_elimina.cache.items() if n > 0)
+    if esito_elimina.ok:
+        st.success(
+            f"✅ Eliminati {esito_elimina.eventi} eventi della partita '{avversario_eliminato}' "
+            f"in {esito_elimina.lotti} lotti (partita {esito_elimina.partita})"
+        )
+    else:
+        st.error(f"❌ Errore durante l'eliminazione degli eventi: {'; '.join(esito_elimina.errori)}")
+        st.caption(f"Eliminati {esito_elimina.eventi} eventi: si può ripetere l'eliminazione.")
+    st.caption(f"Cache scartate: {pulite or 'nessuna'}")
+
 # Selectbox per selezionare la partita di cui eliminare gli eventi
 partita_elimina = st.selectbox(
     "Seleziona partita di cui eliminare gli eventi", 
@@ -195,35 +238,42 @@ if partita_elimina:
     
     # Mostra informazioni sulla partita
     partita_info = next((p for p in partite if p['id'] == partita_id_elimina), None)
+    num_eventi = 0
     if partita_info:
         st.info(f"**Partita selezionata:** {partita_info['data']} - {partita_info['avversario']}")
         
         # Conta gli eventi associati a questa partita
         try:
-            eventi_count = supabase.table("eventi").select("id", count="exact").eq("partita_id", partita_id_elimina).execute()
-            num_eventi = eventi_count.count if eventi_count.count else 0
+            num_eventi = conta_eventi(supabase, partita_id_elimina)
             st.warning(f"⚠️ Questa partita ha {num_eventi} eventi associati.")
         except Exception as e:
             st.error(f"Errore nel contare gli eventi: {e}")
-            num_eventi = "sconosciuto"
     
+    # La partita resta nel sistema (si può ricaricare il CSV) a meno di chiedere di toglierla
+    elimina_anche_partita = st.checkbox("Elimina anche la partita", key="elimina_anche_partita")
+
     # Checkbox di conferma
     conferma_elimina = st.checkbox(
-        "Confermo di voler eliminare tutti gli EVENTI di questa partita (la partita rimarrà nel sistema)", 
+        "Confermo di voler eliminare la partita e tutti i suoi eventi" if elimina_anche_partita
+        else "Confermo di voler eliminare tutti gli EVENTI di questa partita (la partita rimarrà nel sistema)", 
         key="conferma_elimina"
     )
     
     # Pulsante di eliminazione
     if conferma_elimina and st.button("🗑️ Elimina tutti gli eventi della partita", type="primary"):
-        try:
-            # Elimina solo tutti gli eventi associati alla partita
-            result_eventi = supabase.table("eventi").delete().eq("partita_id", partita_id_elimina).execute()
-            
-            st.success(f"✅ Eliminati con successo tutti gli eventi della partita '{partita_info['avversario']}' (la partita rimane nel sistema)")
-            st.balloons()
-            
-            # Ricarica la pagina per aggiornare la lista partite
-            st.rerun()
-            
-        except Exception as e:
-            st.error(f"❌ Errore durante l'eliminazione degli eventi: {e}")
+        barra_elimina = st.progress(0.0, text="Eliminazione eventi...")
+
+        def _lotto_eliminato(parziale):
+            barra_elimina.progress(
+                min(parziale.eventi / max(1, num_eventi), 1.0),
+                text=f"{parziale.eventi} eventi eliminati",
+            )
+
+        # Eventi a lotti, poi report, PDF, immagini e letture in cache della partita
+        esito_elimina = elimina_partita(
+            supabase, partita_id_elimina, anche_partita=elimina_anche_partita, progress=_lotto_eliminato
+        )
+
+        # Ricarica la pagina per aggiornare la lista partite (l'esito si mostra dopo il rerun)
+        st.session_state["esito_eliminazione"] = (partita_info['avversario'], esito_elimina)
+        st.rerun()